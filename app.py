@@ -4,10 +4,16 @@ Streamlit web interface for Landing Page Generator
 """
 import streamlit as st
 import json
-from pathlib import Path
 from datetime import datetime
-import os
-from landing_page_generator import LandingPageGenerator, PageConfig
+from client_pool import ClientPool
+from jobs import DONE, FAILED, INTERRUPTED, QUEUED, RUNNING, JobLimitError, JobQueue, owner_id
+from landing_page_generator import LandingPageGenerator, PageConfig, configure_logging, get_pattern_library
+from metrics import PHASES
+from model_profiles import get_model_profiles
+from response_cache import ResponseCache
+from sections import json_default
+
+configure_logging()
 
 # Page config
 st.set_page_config(
@@ -16,18 +22,27 @@ st.set_page_config(
     layout="wide"
 )
 
-# Load configurations
-@st.cache_data
+# Load configurations from the process-wide pattern library (shared with the generator)
 def load_configs():
-    config_dir = Path("config")
-    with open(config_dir / "page_types.json", 'r') as f:
-        page_types = json.load(f)["page_types"]
-    with open(config_dir / "angles.json", 'r') as f:
-        angles = json.load(f)["angles"]
-    return page_types, angles
+    patterns = get_pattern_library()
+    return patterns.page_types["page_types"], patterns.angles["angles"]
 
 PAGE_TYPES, ANGLES = load_configs()
 
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache()
+
+@st.cache_resource
+def get_client_pool():
+    # Shared by every session: one keep-alive client per API key
+    return ClientPool.from_env()
+
+@st.cache_resource
+def get_job_queue():
+    # Shared by every session: generations run here, not in the script thread
+    return JobQueue.from_env()
+
 # Header
 st.title("🚀 Landing Page Generator")
 st.markdown("Create high-converting landing pages using proven patterns from $100M+ in tracked sales")
@@ -48,18 +63,16 @@ if not st.session_state.api_key:
         st.rerun()
     st.stop()  # Stop execution until API key is provided
 
-# Set the API key for this session only
-os.environ["ANTHROPIC_API_KEY"] = st.session_state.api_key
-
 # Sidebar for configuration
 with st.sidebar:
     st.header("Page Configuration")
     
     # Add logout button at the top of sidebar
     if st.button("🔒 Logout / Clear API Key", type="secondary"):
+        # Queued and running jobs keep generating on this key's client after logout
+        jobs_running = any(job.active for job in get_job_queue().jobs(owner_id(st.session_state.api_key)))
+        get_client_pool().discard(st.session_state.api_key, close=not jobs_running)
         st.session_state.api_key = None
-        if "ANTHROPIC_API_KEY" in os.environ:
-            del os.environ["ANTHROPIC_API_KEY"]
         st.rerun()
     
     # Basic Info
@@ -125,6 +138,18 @@ with st.sidebar:
             ["30_day_money_back", "60_day_money_back", "90_day_money_back",
              "lifetime_guarantee", "results_based", "no_guarantee"]
         )
+        
+        model_profile = st.selectbox(
+            "Model Profile",
+            get_model_profiles().names(),
+            help="Which model writes each stage; fast uses a smaller model for refinement and short quiz funnels"
+        )
+        
+        use_cache = st.checkbox(
+            "Reuse cached responses",
+            value=False,
+            help="Return the stored result when the exact same request was generated before"
+        )
 
 # Main content area
 col1, col2 = st.columns([1, 1])
@@ -188,7 +213,7 @@ with st.expander("Add Bonuses (Optional)"):
         with col1:
             bonus_name = st.text_input(f"Bonus {i+1} Name", key=f"bonus_name_{i}")
         with col2:
-            bonus_value = st.number_input(f"Value ($)", min_value=0, value=0, key=f"bonus_value_{i}")
+            bonus_value = st.number_input("Value ($)", min_value=0, value=0, key=f"bonus_value_{i}")
         
         if bonus_name and bonus_value > 0:
             bonuses.append({"name": bonus_name, "value": str(bonus_value)})
@@ -224,77 +249,166 @@ if st.button("🚀 Generate Landing Page", type="primary", use_container_width=T
             pain_points=pain_points,
             unique_mechanism=unique_mechanism if unique_mechanism else None,
             guarantee_type=guarantee_type,
-            bonuses=bonuses if bonuses else None
+            bonuses=bonuses if bonuses else None,
+            model_profile=model_profile
         )
         
         # Check for API key
-        if not os.getenv("ANTHROPIC_API_KEY"):
-            st.error("⚠️ ANTHROPIC_API_KEY not set in environment variables")
-            st.info("Set your API key: `export ANTHROPIC_API_KEY='your-key-here'`")
+        if not st.session_state.api_key:
+            st.error("⚠️ API key not set for this session")
+            st.info("Log out and enter your Anthropic API key")
         else:
             try:
-                # Generate with progress
-                with st.spinner("🤖 Generating your landing page... (this takes 30-60 seconds)"):
-                    generator = LandingPageGenerator()
-                    result = generator.generate_page(config)
-                
-                st.success(f"✅ Generated {config.page_type} for {config.product_name}!")
-                
-                # Display results
-                st.markdown("---")
-                st.subheader("Generated Landing Page")
-                
-                # Tabs for different views
-                tab1, tab2, tab3, tab4 = st.tabs(["📄 Full Page", "📊 Sections", "🔧 JSON", "📈 Analysis"])
-                
-                with tab1:
-                    # Full page view
-                    st.markdown(result["page_content"])
-                    
-                    # Download button
-                    st.download_button(
-                        label="📥 Download as Markdown",
-                        data=result["page_content"],
-                        file_name=f"{product_name.lower().replace(' ', '_')}_{page_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
-                        mime="text/markdown"
-                    )
-                
-                with tab2:
-                    # Sections view
-                    for section_name, content in result["sections"].items():
-                        with st.expander(section_name.replace("_", " ").title()):
-                            st.markdown(content)
-                
-                with tab3:
-                    # JSON view
-                    st.json(result)
-                    
-                    # Download JSON
-                    st.download_button(
-                        label="📥 Download as JSON",
-                        data=json.dumps(result, indent=2),
-                        file_name=f"{product_name.lower().replace(' ', '_')}_{page_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                        mime="application/json"
-                    )
-                
-                with tab4:
-                    # Analysis
-                    st.metric("Word Count", result["word_count"])
-                    st.metric("Sections", len(result["sections"]))
-                    
-                    # Show patterns used
-                    st.subheader("Patterns Applied")
-                    patterns_used = result.get("patterns_used", {})
-                    
-                    if patterns_used.get("effectiveness_multipliers"):
-                        st.markdown("**High-Impact Elements:**")
-                        for mult in patterns_used["effectiveness_multipliers"].get("high_impact", []):
-                            st.markdown(f"- ✅ {mult}")
-                
+                # Generate on the shared worker pool; this session only polls the job
+                # The key goes to this session's client only, never into the shared environment
+                generator = LandingPageGenerator(
+                    api_key=st.session_state.api_key,
+                    client=get_client_pool().get(st.session_state.api_key),
+                    cache=get_response_cache() if use_cache else None
+                )
+                get_job_queue().submit(owner_id(st.session_state.api_key), generator, config)
+                st.info(f"🧾 Queued {config.product_name} - you can keep working while it generates")
+            except JobLimitError as e:
+                st.warning(f"⏳ {e}")
             except Exception as e:
                 st.error(f"❌ Error generating page: {str(e)}")
                 st.info("Check your API key and try again")
 
+def render_result(result):
+    """Show a generated page: full copy, sections, JSON and analysis"""
+    config = result["config"]
+    file_stem = f"{config['product_name'].lower().replace(' ', '_')}_{config['page_type']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    st.success(f"✅ Generated {config['page_type']} for {config['product_name']}!")
+    
+    # Display results
+    st.markdown("---")
+    st.subheader("Generated Landing Page")
+    
+    # Tabs for different views
+    tab1, tab2, tab3, tab4 = st.tabs(["📄 Full Page", "📊 Sections", "🔧 JSON", "📈 Analysis"])
+    
+    with tab1:
+        # Full page view
+        st.markdown(result["page_content"])
+        
+        # Download button
+        st.download_button(
+            label="📥 Download as Markdown",
+            data=result["page_content"],
+            file_name=f"{file_stem}.md",
+            mime="text/markdown"
+        )
+    
+    with tab2:
+        # Sections view
+        for section_name, content in result["sections"].items():
+            with st.expander(section_name.replace("_", " ").title()):
+                st.markdown(content)
+    
+    with tab3:
+        # JSON view
+        st.json(json.dumps(result, default=json_default))
+        
+        # Download JSON
+        st.download_button(
+            label="📥 Download as JSON",
+            data=json.dumps(result, indent=2, default=json_default),
+            file_name=f"{file_stem}.json",
+            mime="application/json"
+        )
+    
+    with tab4:
+        # Analysis
+        st.metric("Word Count", result["word_count"])
+        st.metric("Sections", len(result["sections"]))
+        
+        tokens = result.get("usage", {}).get("total")
+        if tokens:
+            st.metric("Input Tokens", tokens["input_tokens"] + tokens["cache_creation_input_tokens"] + tokens["cache_read_input_tokens"],
+                      help=f"{tokens['cache_read_input_tokens']} read from the prompt cache")
+            st.metric("Output Tokens", tokens["output_tokens"])
+        
+        metrics = result.get("metrics", {})
+        if metrics.get("cost_usd") is not None:
+            st.metric("Estimated Cost", f"${metrics['cost_usd']:.4f}")
+        quality = result.get("quality")
+        if quality:
+            failed = [name for name, check in (quality.get("final") or quality["draft"])["checks"].items()
+                      if check["score"] < 1.0]
+            st.metric("Quality Score", f"{quality['score']:.2f}",
+                      help="Refinement skipped: the draft passed" if not quality["refined"]
+                      else f"Below 1.0 on: {', '.join(failed) or 'nothing'}")
+        for stage, data in metrics.get("stages", {}).items():
+            ttft = f", first token after {data['ttft']:.1f}s" if data.get("ttft") is not None else ""
+            model = f" on {data['model']}" if data.get("model") else ""
+            st.caption(f"{stage}: {sum(data.get(field) or 0 for field in PHASES):.2f}s{ttft}{model}")
+        
+        # Show patterns used
+        st.subheader("Patterns Applied")
+        patterns_used = result.get("patterns_used", {})
+        
+        if patterns_used.get("effectiveness_multipliers"):
+            st.markdown("**High-Impact Elements:**")
+            for mult in patterns_used["effectiveness_multipliers"].get("high_impact", []):
+                st.markdown(f"- ✅ {mult}")
+
+JOB_ICONS = {QUEUED: "⏳", RUNNING: "✍️", DONE: "✅", FAILED: "❌", INTERRUPTED: "⚠️"}
+STAGE_LABELS = {"initial": "Drafting initial copy", "refinement": "Refining for conversion"}
+
+def render_jobs():
+    """This user's generations, polled every second while any is queued or running"""
+    jobs = get_job_queue().jobs(owner_id(st.session_state.api_key))
+    if st.session_state.get("jobs_polling") and not any(job.active for job in jobs):
+        # Everything finished: rerun the whole app to show the newest page and stop polling
+        st.rerun()
+    if not jobs:
+        return
+    
+    st.markdown("---")
+    st.subheader("Your Generations")
+    for job in jobs:
+        col1, col2, col3 = st.columns([3, 3, 1])
+        with col1:
+            st.markdown(f"{JOB_ICONS.get(job.status, '•')} **{job.product}** - {job.page_type.replace('_', ' ')}")
+        with col2:
+            if job.status == RUNNING:
+                st.caption(f"{STAGE_LABELS.get(job.stage, 'Starting')}... ~{job.tokens_so_far} tokens so far")
+            elif job.status == QUEUED:
+                st.caption("Waiting for a free worker")
+            elif job.status == DONE:
+                quality = f", quality {job.quality_score:.2f}" if job.quality_score is not None else ""
+                st.caption(f"{job.tokens_so_far} tokens{quality}")
+            else:
+                st.caption(job.error or job.status)
+        with col3:
+            if job.status == DONE and st.button("Show", key=f"show_{job.id}"):
+                st.session_state.selected_job = job.id
+                st.rerun()
+        if job.status == RUNNING and job.preview():
+            with st.expander("Live preview"):
+                st.markdown(job.preview())
+    if not any(job.active for job in jobs) and st.button("🧹 Clear finished", type="secondary"):
+        get_job_queue().clear(owner_id(st.session_state.api_key))
+        st.session_state.selected_job = None
+        st.rerun()
+
+# Jobs keep running across reruns and refreshes; this session only polls them
+user_jobs = get_job_queue().jobs(owner_id(st.session_state.api_key))
+jobs_active = any(job.active for job in user_jobs)
+if st.session_state.get("jobs_polling") and not jobs_active:
+    # The last running job just finished: show its page
+    st.session_state.selected_job = next((job.id for job in user_jobs if job.status == DONE),
+                                         st.session_state.get("selected_job"))
+st.session_state.jobs_polling = jobs_active
+st.fragment(render_jobs, run_every=1.0 if st.session_state.jobs_polling else None)()
+
+selected_job = get_job_queue().get(st.session_state.get("selected_job") or "")
+if selected_job is not None and selected_job.page_id:
+    try:
+        render_result(get_job_queue().result(selected_job))
+    except KeyError:
+        st.warning("⚠️ This page is no longer in the output store")
+
 # Footer with tips
 with st.expander("💡 Pro Tips for Maximum Conversion"):
     st.markdown("""
@@ -3,128 +3,592 @@
 Batch generation script for creating multiple landing pages
 """
 import json
+import math
 import click
+import threading
+import time
+import itertools
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-import time
-from landing_page_generator import LandingPageGenerator, PageConfig
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from landing_page_generator import (DEFAULT_WORD_COUNTS, LandingPageGenerator, MissingAPIKeyError, PageConfig,
+                                    configure_logging, get_pattern_library)
+from message_batches import MessageBatchRunner
+from metrics import PHASES, JsonlMetricsLog, MultiSink, PrometheusMetrics, serve_metrics
+from model_profiles import DEFAULT_PROFILE, get_model_profiles
+from quality import DEFAULT_QUALITY_THRESHOLD, quality_summary
+from rate_limit import RateLimiter
+from resilience import CircuitBreaker, RetryPolicy
+from router import load_routes
+from run_journal import RunJournal
+from response_cache import ResponseCache
 
-@click.command()
-@click.option('--config', '-c', type=click.Path(exists=True), required=True, help='JSON config file')
-@click.option('--delay', '-d', type=int, default=5, help='Delay between generations (seconds)')
-def batch_generate(config, delay):
-    """Generate multiple landing pages from a configuration file"""
-    
-    # Load batch configuration
-    with open(config, 'r') as f:
-        batch_config = json.load(f)
-    
-    # Extract defaults and pages
+
+REQUIRED_FIELDS = ("page_type", "industry", "product_name", "price_point", "angle", "benefits", "pain_points")
+TEXT_FIELDS = ("page_type", "industry", "product_name", "angle", "product_type", "length", "urgency_level",
+               "voice_tone", "unique_mechanism", "guarantee_type", "model_profile")
+LIST_FIELDS = ("benefits", "pain_points")
+# What build_page_config uses for optional fields a page leaves out
+PAGE_DEFAULTS = {
+    "product_type": "digital",
+    "target_audience": {"awareness_level": "problem_aware", "sophistication": "medium"},
+    "length": "medium",
+    "urgency_level": "medium",
+    "voice_tone": "friendly",
+    "unique_mechanism": None,
+    "guarantee_type": "30_day_money_back",
+    "bonuses": None,
+    "model_profile": None,
+}
+
+
+def validate_pages(pages: List[Dict[str, Any]]) -> List[str]:
+    """Return a readable error for every page with missing or mistyped fields, or an unknown page type,
+    angle, length or model profile.
+
+    A price_point given as a numeric string (as JSON files often have it) is
+    converted to a number in place.
+    """
+    try:
+        profiles = get_model_profiles().names()
+    except (OSError, ValueError) as e:
+        return [f"Invalid model profiles: {e}"]
+    errors = []
+    patterns = get_pattern_library()
+    known = {
+        "page_type": list(patterns.page_types["page_types"]),
+        "angle": list(patterns.angles["angles"]),
+        "length": list(DEFAULT_WORD_COUNTS),
+    }
+    for i, page in enumerate(pages, 1):
+        label = f"Page {i} ({page.get('product_name', 'unnamed')})"
+        missing = [field for field in REQUIRED_FIELDS if field not in page]
+        if missing:
+            errors.append(f"{label}: missing {', '.join(missing)}")
+        for field in TEXT_FIELDS:
+            if page.get(field) is not None and not isinstance(page[field], str):
+                errors.append(f"{label}: {field} must be a string, not {page[field]!r}")
+        for field in LIST_FIELDS:
+            value = page.get(field)
+            if field in page and (not isinstance(value, list) or not value
+                                  or not all(isinstance(item, str) for item in value)):
+                errors.append(f"{label}: {field} must be a non-empty list of strings")
+        if 'target_audience' in page and not isinstance(page['target_audience'], dict):
+            errors.append(f"{label}: target_audience must be an object")
+        for field, names in known.items():
+            if isinstance(page.get(field), str) and page[field] not in names:
+                errors.append(f"{label}: unknown {field} '{page[field]}' (known: {', '.join(names)})")
+        if 'price_point' in page:
+            try:
+                price = float(str(page['price_point']).replace('$', '').replace(',', ''))
+            except ValueError:
+                price = -1.0
+            if price < 0 or not math.isfinite(price) or isinstance(page['price_point'], bool):
+                errors.append(f"{label}: price_point must be a non-negative number, not {page['price_point']!r}")
+            else:
+                page['price_point'] = price
+        if (page.get('model_profile') or DEFAULT_PROFILE) not in profiles:
+            errors.append(f"{label}: unknown model_profile '{page['model_profile']}' (known: {', '.join(profiles)})")
+    return errors
+
+
+def expand_pages(batch_config: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], int]:
+    """Merge the pages with the defaults and expand matrices into variants.
+
+    A `matrix` maps config fields to lists of values, either at the top level
+    (applied to every page, or to the defaults alone when there are no pages)
+    or inside a page (for that page only, overriding the top-level lists).
+    Each page becomes one variant per combination, with the matrix values
+    taking precedence. Variants with identical effective configs (after
+    filling in PAGE_DEFAULTS) are kept once. Returns the pages and the
+    number of duplicates dropped.
+    """
     defaults = batch_config.get('defaults', {})
-    pages = batch_config.get('pages', [])
-    
-    if not pages:
-        print("❌ No pages defined in configuration")
-        return
+    top_matrix = batch_config.get('matrix', {})
+    entries = batch_config.get('pages') or ([{}] if top_matrix else [])
+    pages, seen, duplicates = [], set(), 0
+    for entry in entries:
+        entry = dict(entry)
+        matrix = {**top_matrix, **entry.pop('matrix', {})}
+        for field, values in matrix.items():
+            if not isinstance(values, list) or not values:
+                raise ValueError(f"matrix field '{field}' must be a non-empty list")
+        base = {**defaults, **entry}
+        for combination in itertools.product(*matrix.values()):
+            page = {**base, **dict(zip(matrix, combination))}
+            # An omitted field and its default spelled out make the same page
+            effective = {**PAGE_DEFAULTS, **page}
+            effective['model_profile'] = effective['model_profile'] or DEFAULT_PROFILE
+            key = json.dumps(effective, sort_keys=True)
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            pages.append(page)
+    return pages, duplicates
+
+
+def prefix_key(merged_config: Dict[str, Any]) -> Tuple[str, str, str]:
+    """Pages with the same key share the cached pattern block at the start of their prompts"""
+    # Prompt caches are per model, so pages on different model profiles do not share one
+    return (merged_config.get('page_type'), merged_config.get('angle'),
+            merged_config.get('model_profile') or DEFAULT_PROFILE)
+
+
+def build_page_config(merged_config: Dict[str, Any]) -> PageConfig:
+    """Create a PageConfig from a page entry merged with the batch defaults"""
+    return PageConfig(
+        page_type=merged_config['page_type'],
+        industry=merged_config['industry'],
+        product_name=merged_config['product_name'],
+        product_type=merged_config.get('product_type', PAGE_DEFAULTS['product_type']),
+        price_point=merged_config['price_point'],
+        target_audience=merged_config.get('target_audience', dict(PAGE_DEFAULTS['target_audience'])),
+        angle=merged_config['angle'],
+        length=merged_config.get('length', PAGE_DEFAULTS['length']),
+        urgency_level=merged_config.get('urgency_level', PAGE_DEFAULTS['urgency_level']),
+        voice_tone=merged_config.get('voice_tone', PAGE_DEFAULTS['voice_tone']),
+        specific_benefits=merged_config['benefits'],
+        pain_points=merged_config['pain_points'],
+        unique_mechanism=merged_config.get('unique_mechanism'),
+        guarantee_type=merged_config.get('guarantee_type', PAGE_DEFAULTS['guarantee_type']),
+        bonuses=merged_config.get('bonuses'),
+        model_profile=merged_config.get('model_profile')
+    )
+
+
+def page_id(index: int) -> str:
+    return f"page-{index:05d}"
+
+
+def generate_one(generator: LandingPageGenerator, merged_config: Dict[str, Any],
+                 journal: Optional[RunJournal] = None, pid: Optional[str] = None,
+                 progress: Optional[Dict[str, Any]] = None,
+                 on_drafted: Optional[Callable[[], None]] = None,
+                 before_save: Optional[Callable[[], None]] = None,
+                 store_id: Optional[str] = None) -> Dict[str, Any]:
+    """Generate a single page and return its entry for the batch report.
+
+    With a journal, each finished stage is recorded, and `progress` (the page's
+    replayed journal state) lets a resumed run skip the stages already done.
+    `on_drafted` is called once the draft exists (its prompt prefix is cached).
+    `before_save` is called just before the page is stored and may raise to
+    fail it instead; `store_id` saves it under a fixed id rather than a new one.
+    """
+    progress = progress or {}
     
-    print(f"\n🚀 Batch Landing Page Generator")
-    print(f"📄 Loaded {len(pages)} page configurations")
-    print(f"⏱️  Delay between pages: {delay} seconds\n")
+    def record(state: str, **data):
+        if journal:
+            journal.record(pid, state, **data)
     
-    # Initialize generator
+    started = time.monotonic()
     try:
-        generator = LandingPageGenerator()
-    except ValueError as e:
-        print(f"❌ Error: {e}")
-        print("Make sure ANTHROPIC_API_KEY is set")
-        return
-    
-    # Track results
-    results = []
-    successful = 0
-    failed = 0
-    
-    # Generate each page
-    for i, page_config in enumerate(pages, 1):
-        # Merge with defaults
-        merged_config = {**defaults, **page_config}
+        config = build_page_config(merged_config)
+        relevant_patterns = generator.patterns.get_relevant_patterns(config)
+        usage = dict(progress.get("usage", {}))
+        stages = dict(progress.get("stages", {}))
+        initial_copy = progress.get("initial_copy")
+        final_copy = progress.get("final_copy")
+        quality = progress.get("quality")
         
-        print(f"\n[{i}/{len(pages)}] Generating: {merged_config['product_name']} - {merged_config['page_type']}")
-        
-        try:
-            # Create PageConfig
-            config = PageConfig(
-                page_type=merged_config['page_type'],
-                industry=merged_config['industry'],
-                product_name=merged_config['product_name'],
-                product_type=merged_config.get('product_type', 'digital'),
-                price_point=merged_config['price_point'],
-                target_audience=merged_config.get('target_audience', {
-                    "awareness_level": "problem_aware",
-                    "sophistication": "medium"
-                }),
-                angle=merged_config['angle'],
-                length=merged_config.get('length', 'medium'),
-                urgency_level=merged_config.get('urgency_level', 'medium'),
-                voice_tone=merged_config.get('voice_tone', 'friendly'),
-                specific_benefits=merged_config['benefits'],
-                pain_points=merged_config['pain_points'],
-                unique_mechanism=merged_config.get('unique_mechanism'),
-                guarantee_type=merged_config.get('guarantee_type', '30_day_money_back'),
-                bonuses=merged_config.get('bonuses')
-            )
-            
-            # Generate page
-            result = generator.generate_page(config)
-            
-            results.append({
-                "product": merged_config['product_name'],
-                "type": merged_config['page_type'],
-                "status": "success",
-                "word_count": result['word_count'],
-                "file": f"{config.product_name.lower().replace(' ', '_')}_{config.page_type}_*.md"
-            })
-            
-            successful += 1
-            print(f"✅ Success! Word count: {result['word_count']}")
-            
-        except Exception as e:
-            failed += 1
-            results.append({
-                "product": merged_config['product_name'],
-                "type": merged_config['page_type'],
-                "status": "failed",
-                "error": str(e)
-            })
-            print(f"❌ Failed: {e}")
+        if final_copy is None:
+            if initial_copy is None:
+                initial = generator.draft_page(config, relevant_patterns)
+                initial_copy, usage["initial"], stages["initial"] = initial.text, initial.usage, initial.stage_metrics()
+                record("initial_done", initial_copy=initial_copy, usage=usage, stages=stages)
+            if on_drafted:
+                on_drafted()
+            draft_quality = generator.assess_copy(config, relevant_patterns, initial_copy)
+            if draft_quality.passed:
+                final_copy, quality = initial_copy, quality_summary(draft_quality)
+            else:
+                final = generator.refine(config, initial_copy, draft_quality)
+                final_copy, usage["refinement"], stages["refinement"] = final.text, final.usage, final.stage_metrics()
+                quality = quality_summary(draft_quality, generator.assess_copy(config, relevant_patterns, final_copy))
+            record("refined", final_copy=final_copy, usage=usage, stages=stages, quality=quality)
         
-        # Delay between generations (except for last one)
-        if i < len(pages) and delay > 0:
-            print(f"⏳ Waiting {delay} seconds...")
-            time.sleep(delay)
-    
-    # Summary report
+        if before_save:
+            before_save()
+        result = generator.finish_page(config, relevant_patterns, final_copy, usage, stages=stages, quality=quality,
+                                       page_id=store_id)
+        entry = {
+            "product": merged_config['product_name'],
+            "type": merged_config['page_type'],
+            "status": "success",
+            "word_count": result['word_count'],
+            "tokens": result.get('usage', {}).get('total'),
+            "cost_usd": result['metrics']['cost_usd'],
+            "quality_score": quality["score"] if quality else None,
+            "refined": quality["refined"] if quality else True,
+            "duration_seconds": round(time.monotonic() - started, 2),
+            "model_profile": result['model_profile'],
+            "models": result['models'],
+            "stages": result['metrics']['stages'],
+            "location": result['location']
+        }
+        record("saved", entry=entry)
+        return entry
+    except Exception as e:
+        record("failed", error=str(e))
+        generator.emit_metric({"event": "page", "status": "failed", "product": merged_config.get('product_name'),
+                               "page_type": merged_config.get('page_type'), "error": str(e)})
+        return {
+            "product": merged_config.get('product_name'),
+            "type": merged_config.get('page_type'),
+            "status": "failed",
+            "duration_seconds": round(time.monotonic() - started, 2),
+            "error": str(e)
+        }
+
+
+def run_batch(generator: LandingPageGenerator, merged_configs: List[Dict[str, Any]],
+              concurrency: int = 1, journal: Optional[RunJournal] = None,
+              progress: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Generate all pages keeping up to `concurrency` generations in flight.
+
+    Pages already saved according to `progress` (a replayed journal) are not
+    regenerated. Results are returned in the order of `merged_configs`,
+    regardless of completion order.
+
+    Pages sharing a prompt prefix (see `prefix_key`) fan out from a leader:
+    the first page of each group starts right away, and the rest start
+    together once its draft has written the prefix to the prompt cache, so
+    they read it instead of each paying to write it.
+    """
+    progress = progress or {}
+    total = len(merged_configs)
+    results: List[Dict[str, Any]] = [None] * total
+    print_lock = threading.Lock()
+    done = 0
+
+    pending = []
+    for i, merged in enumerate(merged_configs):
+        page_progress = progress.get(page_id(i), {})
+        if page_progress.get("state") == "saved":
+            results[i] = page_progress["entry"]
+            done += 1
+        else:
+            pending.append((i, merged, page_progress))
+    if done:
+        print(f"⏭️  Skipping {done} pages already saved by this run")
+
+    groups: Dict[Tuple[str, str, str], List[Tuple[int, Dict[str, Any], Dict[str, Any]]]] = {}
+    for page in pending:
+        groups.setdefault(prefix_key(page[1]), []).append(page)
+    if len(groups) < len(pending):
+        print(f"🌿 {len(pending)} pages share {len(groups)} prompt prefixes; each group fans out after its first draft")
+
+    completed: "queue.Queue[Tuple[int, Future]]" = queue.Queue()
+    groups_lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        def submit(page, on_drafted=None):
+            i, merged, page_progress = page
+            future = pool.submit(generate_one, generator, merged, journal, page_id(i), page_progress, on_drafted)
+            future.add_done_callback(lambda f: completed.put((i, f)))
+            return future
+
+        def release(key):
+            # Called when the leader's draft is done, and again (as a no-op) when it finishes or fails
+            with groups_lock:
+                followers = groups.pop(key, [])
+            for page in followers:
+                submit(page)
+
+        for key, members in list(groups.items()):
+            leader = members.pop(0)
+            submit(leader, lambda key=key: release(key)).add_done_callback(lambda f, key=key: release(key))
+
+        for _ in pending:
+            i, future = completed.get()
+            entry = future.result()
+            results[i] = entry
+            with print_lock:
+                done += 1
+                label = f"{entry['product']} - {entry['type']}"
+                if entry['status'] == "success":
+                    print(f"[{done}/{total}] ✅ {label} ({entry['word_count']} words, {entry['duration_seconds']}s)")
+                else:
+                    print(f"[{done}/{total}] ❌ {label}: {entry['error']}")
+
+    return results
+
+
+def stage_totals(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Seconds spent per stage and phase, and cost, summed over all pages"""
+    totals: Dict[str, Dict[str, float]] = {}
+    for entry in results:
+        for stage, data in (entry.get('stages') or {}).items():
+            stage_total = totals.setdefault(stage, {})
+            for field in (*PHASES, "cost_usd", "retries", "hedges"):
+                if data.get(field):
+                    stage_total[field] = round(stage_total.get(field, 0) + data[field], 6)
+    return totals
+
+
+def print_summary(results: List[Dict[str, Any]], elapsed: float):
+    successful = sum(1 for r in results if r['status'] == "success")
     print(f"\n{'='*50}")
-    print(f"BATCH GENERATION COMPLETE")
+    print("BATCH GENERATION COMPLETE")
     print(f"{'='*50}")
     print(f"✅ Successful: {successful}")
-    print(f"❌ Failed: {failed}")
-    print(f"📁 Output directory: generated_pages/")
+    print(f"❌ Failed: {len(results) - successful}")
+    print(f"⏱️  Wall time: {elapsed:.1f} seconds")
+    durations = sorted(r['duration_seconds'] for r in results if r['status'] == "success")
+    if durations:
+        p50, p99 = (durations[min(len(durations) - 1, int(q * len(durations)))] for q in (0.5, 0.99))
+        print(f"⏱️  Page latency: p50 {p50:.1f}s, p99 {p99:.1f}s")
+    skipped = sum(1 for r in results if r['status'] == "success" and not r.get('refined', True))
+    if skipped:
+        print(f"🎯 Refinement skipped for {skipped} page(s) that passed the quality check")
+    profiles: Dict[str, List[Dict[str, Any]]] = {}
+    for r in results:
+        if r['status'] == "success" and r.get('model_profile'):
+            profiles.setdefault(r['model_profile'], []).append(r)
+    if len(profiles) > 1:
+        print("\n🧪 By model profile:")
+        for name, entries in profiles.items():
+            scores = [r['quality_score'] for r in entries if r.get('quality_score') is not None]
+            cost = sum(r.get('cost_usd') or 0 for r in entries)
+            print(f"   {name:<12} {len(entries)} pages, {sum(r['duration_seconds'] for r in entries) / len(entries):.1f}s avg, "
+                  f"${cost / len(entries):.4f}/page, quality {sum(scores) / len(scores) if scores else 0:.2f}")
     
-    # Save batch report
+    totals = stage_totals(results)
+    if totals:
+        print("\n⏱️  Time by stage (summed over pages):")
+        for stage, data in totals.items():
+            phases = ", ".join(f"{phase} {data[field]:.2f}s" for field, phase in PHASES.items() if field in data)
+            if phases:
+                print(f"   {stage:<12} {phases}")
+        retries = sum(data.get('retries', 0) for data in totals.values())
+        hedges = sum(data.get('hedges', 0) for data in totals.values())
+        if retries or hedges:
+            print(f"🔁 API calls retried: {retries:g} | hedged with a duplicate: {hedges:g}")
+        cost = sum(data.get('cost_usd', 0) for data in totals.values())
+        if cost:
+            print(f"💵 Estimated cost: ${cost:.4f}")
+
+
+def save_report(results: List[Dict[str, Any]], **extra) -> Path:
+    """Write the batch report next to the generated pages and return its path"""
+    successful = sum(1 for r in results if r['status'] == "success")
     report = {
         "timestamp": datetime.now().isoformat(),
-        "total_pages": len(pages),
+        "total_pages": len(results),
         "successful": successful,
-        "failed": failed,
+        "failed": len(results) - successful,
+        **extra,
         "results": results
     }
-    
+
     report_path = Path("generated_pages") / f"batch_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    report_path.parent.mkdir(exist_ok=True)
     with open(report_path, 'w') as f:
         json.dump(report, f, indent=2)
+    return report_path
+
+
+# Generator settings shared by batch_generate, the HTTP server (server.py) and queue workers (lease_queue.py)
+GENERATOR_OPTIONS = [
+    click.option('--rpm', type=click.FloatRange(min=0), default=50,
+                 help='Max API requests started per minute (0 disables rate control)'),
+    click.option('--cache/--no-cache', default=False, help='Reuse responses for identical API requests'),
+    click.option('--cache-dir', type=click.Path(file_okay=False), default='.cache/responses', help='Response cache directory'),
+    click.option('--refresh-cache', is_flag=True, help='Bypass cache reads but store fresh responses'),
+    click.option('--quality-threshold', type=click.FloatRange(0, 1), default=DEFAULT_QUALITY_THRESHOLD, show_default=True,
+                 help='Skip refinement for drafts scoring at least this on the local quality check'),
+    click.option('--always-refine', is_flag=True, help='Refine every draft regardless of its quality score'),
+    click.option('--section-concurrency', type=click.IntRange(min=0), default=4, show_default=True,
+                 help='Sections written at once when drafting long advertorials and sales letters (0 drafts them in one call)'),
+    click.option('--targeted-refinement/--full-refinement', default=True,
+                 help='Rewrite only the sections that fail the quality check, or always resend the whole page'),
+    click.option('--routes', 'routes_file', type=click.Path(exists=True, dir_okay=False),
+                 help='JSON list of API keys/models with their own rate limits to spread requests over (replaces --rpm)'),
+    click.option('--max-retries', type=click.IntRange(min=0), default=3, show_default=True,
+                 help='Retries per API call after 429, 529, 5xx or connection errors'),
+    click.option('--hedge-after', type=click.FloatRange(min=0), help='Race a duplicate request against calls slower than this many seconds'),
+    click.option('--hedge-quantile', type=click.FloatRange(0.5, 1, max_open=True),
+                 help='Race a duplicate against calls slower than this quantile of recent calls (e.g. 0.95)'),
+    click.option('--circuit-threshold', type=click.IntRange(min=1), default=5, show_default=True,
+                 help='Consecutive overload errors that pause all calls'),
+    click.option('--circuit-reset', type=click.FloatRange(min=0), default=30, show_default=True,
+                 help='Seconds calls stay paused before a probe call is let through'),
+    click.option('--model-profile', default=DEFAULT_PROFILE, show_default=True,
+                 help='Model, max_tokens and temperature per stage for pages that set no model_profile (e.g. fast)'),
+]
+
+
+def generator_options(command: Callable) -> Callable:
+    """Add the GENERATOR_OPTIONS to a click command; pass them on to `build_generator`"""
+    for option in reversed(GENERATOR_OPTIONS):
+        command = option(command)
+    return command
+
+
+def build_generator(rpm: float, cache: bool, cache_dir: str, refresh_cache: bool, quality_threshold: float,
+                    always_refine: bool, section_concurrency: int, targeted_refinement: bool,
+                    routes_file: Optional[str], max_retries: int, hedge_after: Optional[float],
+                    hedge_quantile: Optional[float], circuit_threshold: int, circuit_reset: float,
+                    model_profile: str, metrics: Optional[Any] = None) -> LandingPageGenerator:
+    """The generator for the GENERATOR_OPTIONS; bad options and config files are usage errors, a missing API key exits"""
+    try:
+        profiles = get_model_profiles().names()
+    except (OSError, ValueError) as e:
+        raise click.UsageError(f"Invalid model profiles: {e}")
+    if model_profile not in profiles:
+        raise click.BadParameter(f"unknown profile (known: {', '.join(profiles)})", param_hint='--model-profile')
+    router = None
+    if routes_file:
+        try:
+            router = load_routes(routes_file)
+        except (ValueError, KeyError, json.JSONDecodeError) as e:
+            raise click.UsageError(f"Invalid routes file: {e}")
+        # The routes carry their own rate limits
+        rpm = 0
+    try:
+        return LandingPageGenerator(
+            rate_limiter=RateLimiter(rpm) if rpm else None,
+            cache=ResponseCache(cache_dir, bypass=refresh_cache) if cache or refresh_cache else None,
+            metrics=metrics,
+            quality_threshold=None if always_refine else quality_threshold,
+            section_concurrency=section_concurrency,
+            targeted_refinement=targeted_refinement,
+            router=router,
+            retry_policy=RetryPolicy(max_retries),
+            breaker=CircuitBreaker(circuit_threshold, circuit_reset),
+            hedge_after=hedge_after,
+            hedge_quantile=hedge_quantile,
+            model_profile=model_profile
+        )
+    except MissingAPIKeyError as e:
+        print(f"❌ Error: {e}")
+        print("Make sure ANTHROPIC_API_KEY is set")
+        raise SystemExit(1)
+    except (OSError, ValueError) as e:
+        raise click.UsageError(f"Could not set up the generator: {e}")
+
+
+@click.command()
+@click.option('--config', '-c', type=click.Path(exists=True), help='JSON config file')
+@click.option('--concurrency', '-n', type=click.IntRange(min=1), default=4, help='Generations kept in flight')
+@click.option('--message-batches', is_flag=True, help='Submit drafts and refinements through the Message Batches API')
+@click.option('--resume-batch', type=click.Path(exists=True, dir_okay=False),
+              help='Resume a Message Batches run from its state file')
+@click.option('--poll-interval', type=click.FloatRange(min=0.1), default=60, help='Seconds between batch status polls')
+@click.option('--resume', 'resume_run', metavar='RUN_ID', help='Resume an interrupted run from its journal')
+@click.option('--metrics-log', type=click.Path(dir_okay=False), help='Append metric events to this JSONL file')
+@click.option('--metrics-port', type=click.IntRange(min=0), help='Serve Prometheus metrics on this port during the run')
+@generator_options
+def batch_generate(config, concurrency, message_batches, resume_batch, poll_interval, resume_run, metrics_log,
+                   metrics_port, **generator_settings):
+    """Generate multiple landing pages from a configuration file"""
+
+    if not config and not resume_batch and not resume_run:
+        raise click.UsageError("Provide --config, --resume RUN_ID, or --resume-batch STATE_FILE")
+
+    pages = []
+    journal = None
+    progress = {}
+    if resume_run:
+        try:
+            journal = RunJournal.open(resume_run)
+        except FileNotFoundError as e:
+            raise click.UsageError(str(e))
+        progress = journal.pages()
+        pages = [progress[pid]["config"] for pid in sorted(progress)]
+    elif config:
+        # Load batch configuration
+        with open(config, 'r') as f:
+            batch_config = json.load(f)
+
+        # Merge pages with the defaults and expand any variant matrix
+        try:
+            pages, duplicates = expand_pages(batch_config)
+        except ValueError as e:
+            print(f"❌ Invalid batch configuration: {e}")
+            raise SystemExit(1)
+        if duplicates:
+            print(f"♊ Dropped {duplicates} duplicate page configurations")
+
+        if not pages:
+            print("❌ No pages defined in configuration")
+            return
+
+        errors = validate_pages(pages)
+        if errors:
+            print("❌ Invalid batch configuration:")
+            for error in errors:
+                print(f"   - {error}")
+            raise SystemExit(1)
+
+    configure_logging()
+    print("\n🚀 Batch Landing Page Generator")
+    if pages:
+        print(f"📄 Loaded {len(pages)} page configurations")
+
+    sinks = []
+    if metrics_log:
+        sinks.append(JsonlMetricsLog(metrics_log))
+    prometheus = PrometheusMetrics() if metrics_port is not None else None
+    if prometheus:
+        sinks.append(prometheus)
     
+    # Initialize generator
+    generator = build_generator(metrics=MultiSink(sinks) if sinks else None, **generator_settings)
+    router, response_cache = generator.router, generator.cache
+    rpm = 0 if router else generator_settings["rpm"]
+    if message_batches or resume_batch:
+        print(f"📦 Mode: Message Batches API (polling every {poll_interval:g}s)\n")
+    elif router:
+        print(f"⚡ Concurrency: {concurrency} | Routing over {len(router.routes)} keys/models\n")
+    else:
+        print(f"⚡ Concurrency: {concurrency} | Rate limit: {f'{rpm:g} requests/min' if rpm else 'off'}\n")
+
+    if response_cache:
+        print(f"♻️  Response cache: {response_cache.cache_dir}{' (refreshing)' if response_cache.bypass else ''}\n")
+
+    if prometheus:
+        metrics_server = serve_metrics(prometheus, metrics_port)
+        print(f"📈 Metrics: http://localhost:{metrics_server.server_address[1]}/metrics\n")
+
+    started = time.monotonic()
+    if message_batches or resume_batch:
+        if resume_batch:
+            runner = MessageBatchRunner.resume(generator, resume_batch, poll_interval)
+        else:
+            runner = MessageBatchRunner.create(generator, [build_page_config(p) for p in pages], poll_interval)
+        print(f"💾 Run state: {runner.state_path} (resume with --resume-batch {runner.state_path})")
+        results = runner.run()
+        extra = {"mode": "message_batches", "batch_ids": runner.batch_ids}
+    else:
+        if journal is None:
+            journal = RunJournal.create()
+            for i, merged in enumerate(pages):
+                journal.record(page_id(i), "queued", config=merged)
+        print(f"🧾 Run ID: {journal.run_id} (resume with --resume {journal.run_id})")
+        results = run_batch(generator, pages, concurrency, journal, progress)
+        extra = {"mode": "concurrent", "run_id": journal.run_id, "concurrency": concurrency, "requests_per_minute": rpm}
+    elapsed = time.monotonic() - started
+
+    # Summary report
+    print_summary(results, elapsed)
+    if router:
+        print("\n🔀 Requests by route:")
+        for route in router.stats():
+            print(f"   {route['route']}: {route['requests']} sent, {route['rate_limited']} rate limited")
+        extra["routes"] = router.stats()
+    if response_cache:
+        cache_stats = response_cache.stats()
+        print(f"♻️  Cache hits: {cache_stats['hits']} | misses: {cache_stats['misses']}")
+        extra["cache"] = cache_stats
+    print("📁 Pages stored in generated_pages/store/ (find them with: python catalog.py query)")
+
+    totals = stage_totals(results)
+    extra["stage_totals"] = totals
+    extra["cost_usd"] = round(sum(data.get('cost_usd', 0) for data in totals.values()), 6)
+    report_path = save_report(results, wall_time_seconds=round(elapsed, 2), **extra)
     print(f"\n📊 Detailed report saved to: {report_path}")
 
 if __name__ == "__main__":
-    batch_generate()
\ No newline at end of file
+    batch_generate()
@@ -0,0 +1,3 @@
+"""
+Offline benchmarks and a local stand-in for the Anthropic API
+"""
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Batch throughput benchmark against the local stub API
+
+Run from the repository root:  python -m benchmarks.bench_batch --pages 20 --latency 0.5
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import click
+
+from benchmarks.stub_server import start_stub_server
+
+
+@click.command()
+@click.option('--pages', type=int, default=20, help='Pages in the synthetic batch')
+@click.option('--latency', type=float, default=0.5, help='Stub seconds per API call')
+@click.option('--concurrency', '-n', type=int, multiple=True, default=[1, 4, 10], help='Concurrency levels to compare')
+def main(pages, latency, concurrency):
+    """Compare batch wall time across concurrency levels"""
+    server = start_stub_server(latency=latency)
+    os.environ["ANTHROPIC_BASE_URL"] = server.url
+    os.environ.setdefault("ANTHROPIC_API_KEY", "stub-key")
+
+    from batch_generate import run_batch
+    from landing_page_generator import LandingPageGenerator
+
+    with open("batch_config_example.json", 'r') as f:
+        example = json.load(f)
+    merged = [{**example["defaults"], **example["pages"][i % len(example["pages"])]} for i in range(pages)]
+
+    cwd = os.getcwd()
+    print(f"\n📊 {pages} pages x 2 calls, {latency}s per call (ideal serial time {pages * 2 * latency:.1f}s)\n")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            shutil.copytree("config", os.path.join(tmp, "config"))
+            os.chdir(tmp)
+            # Created inside the scratch directory so the output store and catalog land there
+            generator = LandingPageGenerator()
+            for n in concurrency:
+                server.reset_stats()
+                started = time.monotonic()
+                results = run_batch(generator, merged, concurrency=n)
+                elapsed = time.monotonic() - started
+                ok = sum(1 for r in results if r["status"] == "success")
+                ideal = -(-pages // n) * 2 * latency
+                print(f"concurrency={n:<3} {elapsed:6.2f}s  (ideal {ideal:.2f}s)  "
+                      f"ok={ok}/{pages}  max in flight={server.max_in_flight}\n")
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
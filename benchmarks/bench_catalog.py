@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Catalog benchmark: indexed lookups over a large page history
+
+Run from the repository root:  python -m benchmarks.bench_catalog --pages 100000
+"""
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import click
+
+from catalog import PageCatalog
+
+PAGE_TYPES = ["sales_page", "advertorial", "quiz_funnel", "vsl_page", "squeeze_page"]
+ANGLES = ["transformation_story", "data_driven", "contrarian", "insider_secret"]
+
+
+@click.command()
+@click.option('--pages', type=int, default=100_000, help='Pages in the catalog')
+@click.option('--products', type=int, default=1000, help='Distinct products')
+@click.option('--queries', type=int, default=200, help='Lookups to time')
+def main(pages, products, queries):
+    """Fill a catalog with a year of pages and time typical lookups"""
+    rng = random.Random(0)
+    now = datetime.now()
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = PageCatalog(str(Path(tmp) / "catalog.sqlite3"))
+        started = time.perf_counter()
+        for n in range(pages):
+            config = {"product_name": f"Product {rng.randrange(products)}", "page_type": rng.choice(PAGE_TYPES),
+                      "angle": rng.choice(ANGLES), "industry": "fitness", "n": n}
+            result = {"config": config, "word_count": 1500,
+                      "generated_at": (now - timedelta(minutes=rng.randrange(525600))).isoformat(),
+                      "usage": {"total": {"input_tokens": 3000, "output_tokens": 4000}}}
+            catalog.register(result, {"id": f"page-{n:07d}", "shard": "shard-000001.jsonl.gz",
+                                      "offset": n * 4000, "length": 4000})
+        fill = time.perf_counter() - started
+
+        timings, matches = [], 0
+        for _ in range(queries):
+            started = time.perf_counter()
+            rows = catalog.query(product=f"Product {rng.randrange(products)}", page_type="advertorial",
+                                 since=now - timedelta(days=30))
+            timings.append((time.perf_counter() - started) * 1000)
+            matches += len(rows)
+
+        print(f"\n🗂️  {pages:,} pages cataloged in {fill:.1f}s ({pages / fill:,.0f} registrations/s)")
+        print(f"'advertorials for product X in the last month': "
+              f"median {statistics.median(timings):.3f} ms, max {max(timings):.3f} ms "
+              f"({matches / queries:.1f} rows on average)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Prompt construction benchmark: memoized fragments vs the plain templates
+
+Run from the repository root:  python -m benchmarks.bench_prompts --configs 100000
+"""
+import itertools
+import time
+
+import click
+
+from landing_page_generator import PageConfig, PromptEngine, get_pattern_library
+
+LENGTHS = ["short", "medium", "long"]
+URGENCY_LEVELS = ["low", "medium", "high"]
+VOICE_TONES = ["professional", "casual", "urgent", "friendly", "authoritative",
+               "conversational", "inspirational", "direct", "empathetic"]
+
+
+def config_permutations(patterns, products: int):
+    """Yield planner-style permutations of products, page types, angles and tone settings"""
+    page_types = list(patterns.page_types["page_types"])
+    angles = list(patterns.angles["angles"])
+    for n, page_type, angle, length, urgency, tone in itertools.product(
+            range(products), page_types, angles, LENGTHS, URGENCY_LEVELS, VOICE_TONES):
+        yield PageConfig(
+            page_type=page_type,
+            industry="fitness",
+            product_name=f"Product {n}",
+            product_type="digital",
+            price_point=97 + n,
+            target_audience={"awareness_level": "problem_aware", "sophistication": "medium", "segment": n % 5},
+            angle=angle,
+            length=length,
+            urgency_level=urgency,
+            voice_tone=tone,
+            specific_benefits=[f"Benefit {n}.{i}" for i in range(5)],
+            pain_points=[f"Pain point {n}.{i}" for i in range(5)],
+            unique_mechanism=f"Mechanism {n}" if n % 2 else None
+        )
+
+
+def build_all(engine: PromptEngine, patterns, configs):
+    started = time.perf_counter()
+    prompts = [engine.build_master_prompt(c, patterns.get_relevant_patterns(c)) for c in configs]
+    return prompts, time.perf_counter() - started
+
+
+@click.command()
+@click.option('--configs', 'count', type=int, default=100_000, help='Number of configs to build prompts for')
+def main(count):
+    """Build prompts for many configs with and without fragment memoization"""
+    patterns = get_pattern_library()
+    per_product = len(patterns.page_types["page_types"]) * len(patterns.angles["angles"]) * \
+        len(LENGTHS) * len(URGENCY_LEVELS) * len(VOICE_TONES)
+    configs = list(itertools.islice(config_permutations(patterns, -(-count // per_product)), count))
+
+    reference, plain_time = build_all(PromptEngine(patterns, memoize=False), patterns, configs)
+    memoized, memo_time = build_all(PromptEngine(patterns), patterns, configs)
+
+    mismatches = sum(1 for a, b in zip(reference, memoized) if a != b)
+    print(f"\n🧪 Built prompts for {len(configs):,} configs")
+    print(f"plain templates    {plain_time:7.2f}s  ({plain_time / len(configs) * 1e6:6.1f} µs/prompt)")
+    print(f"memoized fragments {memo_time:7.2f}s  ({memo_time / len(configs) * 1e6:6.1f} µs/prompt)")
+    print(f"speedup            {plain_time / memo_time:7.1f}x")
+    print(f"byte-identical     {'yes' if not mismatches else f'NO ({mismatches} mismatches)'}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Section extraction benchmark: line-splitting dict vs the offset-based index
+
+Run from the repository root:  python -m benchmarks.bench_sections --words 6000
+"""
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+import click
+
+from benchmarks.stub_server import build_page_text
+from sections import SectionIndex
+
+
+def split_sections(content: str) -> Dict[str, str]:
+    """The previous extractor, kept as the reference implementation"""
+    sections = {}
+    current_section = "intro"
+    current_content = []
+    for line in content.split('\n'):
+        if line.startswith('###'):
+            if current_content:
+                sections[current_section] = '\n'.join(current_content).strip()
+            current_section = line.replace('#', '').strip().lower().replace(' ', '_')
+            current_content = []
+        else:
+            current_content.append(line)
+    if current_content:
+        sections[current_section] = '\n'.join(current_content).strip()
+    return sections
+
+
+def measure(extract: Callable[[str], object], text: str, runs: int):
+    """Bytes retained by one extraction and mean seconds per extraction"""
+    tracemalloc.start()
+    sections = extract(text)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    started = time.perf_counter()
+    for _ in range(runs):
+        extract(text)
+    return sections, retained, (time.perf_counter() - started) / runs
+
+
+@click.command()
+@click.option('--words', type=int, default=6000, help='Words of copy in the page')
+@click.option('--runs', type=int, default=200, help='Extractions to time')
+def main(words, runs):
+    """Compare memory and time of both section extractors on one long page"""
+    text = build_page_text(words).replace("\n\n", "\n\n" + "\n".join(["line"] * 5) + "\n")
+    page_bytes = len(text.encode("utf-8"))
+
+    legacy, legacy_bytes, legacy_time = measure(split_sections, text, runs)
+    indexed, index_bytes, index_time = measure(SectionIndex.scan, text, runs)
+
+    streamed = SectionIndex()
+    for i in range(0, len(text), 64):
+        streamed.feed(text[i:i + 64])
+    streamed.close()
+
+    same = dict(indexed) == legacy and dict(streamed.sections()) == legacy
+    print(f"\n📄 {words:,}-word page ({page_bytes / 1024:.0f} KiB, {len(legacy)} sections)")
+    print(f"{'':18} {'extra memory':>14} {'stored result':>14} {'time':>10}")
+    for name, extra, elapsed in (("split + join", legacy_bytes, legacy_time),
+                                 ("offset index", index_bytes, index_time)):
+        print(f"{name:18} {extra / 1024:11.1f} KiB {(page_bytes + extra) / 1024:10.1f} KiB "
+              f"{elapsed * 1e3:7.3f} ms")
+    print(f"identical sections (scan and streamed): {'yes' if same else 'NO'}")
+    if not same:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+CLI startup benchmark: --help and config validation must not pay for the API client stack
+
+Run from the repository root:  python -m benchmarks.bench_startup --budget-ms 250
+"""
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import click
+
+SCENARIOS = {
+    "generate_cli --help": ["generate_cli.py", "--help"],
+    "batch_generate --help": ["batch_generate.py", "--help"],
+    "batch_generate invalid config": ["batch_generate.py", "--config", "{invalid_config}"],
+}
+
+
+def time_command(args, runs: int) -> float:
+    """Median wall time of running `python <args>` in milliseconds"""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *args], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+@click.command()
+@click.option('--runs', type=int, default=7, help='Runs per scenario (median is reported)')
+@click.option('--budget-ms', type=float, default=250, help='Fail if any scenario exceeds this median')
+def main(runs, budget_ms):
+    """Measure CLI startup paths that should never import anthropic"""
+    leaked = subprocess.run(
+        [sys.executable, "-c", "import sys, generate_cli, batch_generate; print('anthropic' in sys.modules)"],
+        capture_output=True, text=True
+    ).stdout.strip()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        invalid_config = Path(tmp) / "invalid.json"
+        invalid_config.write_text(json.dumps({"pages": [{"product_name": "Missing Fields"}]}))
+
+        baseline = time_command(["-c", "pass"], runs)
+        print(f"\n⏱️  CLI startup (median of {runs} runs, budget {budget_ms:g} ms)\n")
+        print(f"{'python -c pass (interpreter floor)':<36} {baseline:7.1f} ms")
+
+        over_budget = False
+        for name, args in SCENARIOS.items():
+            args = [a.format(invalid_config=invalid_config) for a in args]
+            median = time_command(args, runs)
+            over_budget |= median > budget_ms
+            print(f"{name:<36} {median:7.1f} ms {'❌' if median > budget_ms else '✅'}")
+
+    print(f"\nanthropic imported by CLI modules: {leaked}")
+    if over_budget or leaked != "False":
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Output store benchmark: write throughput and scan time as the store grows
+
+Run from the repository root:  python -m benchmarks.bench_store --pages 100000
+"""
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import click
+
+from benchmarks.stub_server import build_page_text
+from output_store import OutputStore
+from sections import SectionIndex
+
+
+def make_result(n: int, text: str):
+    return {
+        "config": {"product_name": f"Product {n % 500}", "page_type": "sales_page", "angle": "transformation"},
+        "generated_at": datetime.now().isoformat(),
+        "page_content": text,
+        "patterns_used": {},
+        "word_count": len(text.split()),
+        "sections": SectionIndex.scan(text)
+    }
+
+
+@click.command()
+@click.option('--pages', type=int, default=20000, help='Pages to write')
+@click.option('--checkpoints', type=int, default=5, help='Times to report throughput and scan cost')
+@click.option('--words', type=int, default=600, help='Words per page')
+def main(pages, checkpoints, words):
+    """Append pages to a fresh store and report how costs change with its size"""
+    text = build_page_text(words)
+    step = max(1, pages // checkpoints)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = OutputStore(tmp, shard_max_bytes=16 * 1024 * 1024)
+        print(f"\n🗄️  Writing {pages:,} pages of {words} words\n")
+        print(f"{'pages':>9} {'writes/s':>10} {'files':>7} {'listdir':>10} {'index load':>11} {'random get':>11}")
+        written = 0
+        while written < pages:
+            batch = min(step, pages - written)
+            started = time.perf_counter()
+            for n in range(written, written + batch):
+                location = store.put(make_result(n, text))
+            rate = batch / (time.perf_counter() - started)
+            written += batch
+
+            started = time.perf_counter()
+            files = len(os.listdir(tmp))
+            listdir = time.perf_counter() - started
+            started = time.perf_counter()
+            fresh = OutputStore(tmp)
+            count = len(fresh)
+            index_load = time.perf_counter() - started
+            started = time.perf_counter()
+            fresh.get(location["id"])
+            get = time.perf_counter() - started
+            assert count == written
+            print(f"{written:>9,} {rate:>10,.0f} {files:>7} {listdir * 1e3:>8.2f}ms "
+                  f"{index_load * 1e3:>9.1f}ms {get * 1e3:>9.2f}ms")
+
+        size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+        print(f"\n💾 {size / 1024 / 1024:.1f} MiB on disk ({size / pages / 1024:.1f} KiB per page, "
+              f"{len(text.encode('utf-8')) * 2 / 1024:.1f} KiB raw page + sections)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Anthropic messages endpoint, for offline testing and benchmarks
+
+Point the generator at it with ANTHROPIC_BASE_URL=http://127.0.0.1:<port>
+"""
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import click
+
+SECTION_TITLES = [
+    "Headline", "Subheadline", "Opening Hook", "Problem Agitation", "Solution Reveal",
+    "Offer Stack", "Guarantee", "Testimonials", "FAQ", "Call To Action"
+]
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of the stub API"""
+    latency: float = 1.0  # seconds before a response is complete (median for random distributions)
+    ttft: float = 0.2  # seconds before the first streamed chunk
+    words: int = 600  # words of generated copy per response
+    chunk_words: int = 20  # words per streamed text delta
+    batch_latency: float = 2.0  # seconds a message batch stays in_progress
+    latency_dist: str = "fixed"  # fixed, uniform, exponential or lognormal
+    latency_spread: float = 0.5  # uniform: +/- fraction of latency; lognormal: sigma
+    tokens_per_second: float = 0.0  # if set, latency is ttft + output tokens / rate instead
+    error_rate_429: float = 0.0  # fraction of message requests rejected as rate limited
+    error_rate_529: float = 0.0  # fraction of message requests rejected as overloaded
+    retry_after: float = 0.5  # retry-after header sent with injected errors
+    rpm_per_key: float = 0.0  # if set, each API key may start this many requests per minute (burst of a tenth)
+    seed: Optional[int] = None
+
+
+def build_page_text(words: int) -> str:
+    """Build a deterministic markdown page of roughly `words` words"""
+    per_section = max(1, words // len(SECTION_TITLES))
+    parts = []
+    for i, title in enumerate(SECTION_TITLES):
+        body = " ".join(f"word{i}_{j}" for j in range(per_section))
+        parts.append(f"### {title}\n\n{body}\n")
+    return "\n".join(parts)
+
+
+class StubAPIServer(ThreadingHTTPServer):
+    """Threaded HTTP server that records request statistics"""
+    daemon_threads = True
+
+    def __init__(self, address, config: StubConfig):
+        super().__init__(address, StubAPIHandler)
+        self.config = config
+        self.lock = threading.Lock()
+        self.requests: List[Dict[str, Any]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.prompt_cache = set()
+        self.errors = {429: 0, 529: 0}
+        self.rng = random.Random(config.seed)
+        self.key_buckets: Dict[str, List[float]] = {}  # api key -> [tokens, last refill]
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def usage_for(self, request: Dict[str, Any], text: str) -> Dict[str, int]:
+        """Approximate token usage (4 chars per token), simulating prompt caching of system blocks"""
+        system = request.get("system") or []
+        if isinstance(system, str):
+            system = [{"type": "text", "text": system}]
+        prefix, cacheable = "", ""
+        for block in system:
+            prefix += block.get("text", "")
+            if block.get("cache_control"):
+                cacheable = prefix
+
+        cache_read = cache_creation = 0
+        if cacheable:
+            key = hashlib.sha256(f"{request.get('model')}:{cacheable}".encode("utf-8")).hexdigest()
+            with self.lock:
+                hit = key in self.prompt_cache
+                self.prompt_cache.add(key)
+            if hit:
+                cache_read = len(cacheable) // 4
+            else:
+                cache_creation = len(cacheable) // 4
+
+        uncached_chars = len(prefix) - len(cacheable) + len(json.dumps(request.get("messages", [])))
+        return {
+            "input_tokens": uncached_chars // 4,
+            "output_tokens": len(text) // 4,
+            "cache_creation_input_tokens": cache_creation,
+            "cache_read_input_tokens": cache_read
+        }
+
+    def sample_latency(self, output_tokens: int) -> float:
+        """Seconds a response should take under the configured distribution"""
+        config = self.config
+        if config.tokens_per_second:
+            return config.ttft + output_tokens / config.tokens_per_second
+        with self.lock:
+            if config.latency_dist == "uniform":
+                return max(0.0, self.rng.uniform(config.latency * (1 - config.latency_spread),
+                                                 config.latency * (1 + config.latency_spread)))
+            if config.latency_dist == "exponential":
+                return self.rng.expovariate(1 / config.latency) if config.latency else 0.0
+            if config.latency_dist == "lognormal":
+                return self.rng.lognormvariate(math.log(config.latency), config.latency_spread) if config.latency else 0.0
+        return config.latency
+
+    def pick_error(self) -> Optional[int]:
+        """Status code of an injected error for this request, if any"""
+        with self.lock:
+            roll = self.rng.random()
+            if roll < self.config.error_rate_429:
+                status = 429
+            elif roll < self.config.error_rate_429 + self.config.error_rate_529:
+                status = 529
+            else:
+                return None
+            self.errors[status] += 1
+            return status
+
+    def take_request(self, api_key: str) -> Tuple[Optional[float], Dict[str, str]]:
+        """Charge one request to a key's rate limit: (retry-after if over it, rate-limit headers)"""
+        rpm = self.config.rpm_per_key
+        if not rpm:
+            return None, {}
+        capacity = max(1.0, rpm / 10)
+        with self.lock:
+            now = time.monotonic()
+            bucket = self.key_buckets.setdefault(api_key, [capacity, now])
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rpm / 60)
+            bucket[1] = now
+            retry_after = None
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+            else:
+                retry_after = (1 - bucket[0]) * 60 / rpm
+                self.errors[429] += 1
+            headers = {
+                "anthropic-ratelimit-requests-limit": f"{rpm:g}",
+                "anthropic-ratelimit-requests-remaining": str(int(bucket[0])),
+                "anthropic-ratelimit-requests-reset": _iso(time.time() + (capacity - bucket[0]) * 60 / rpm)
+            }
+        if retry_after is not None:
+            headers["retry-after"] = f"{retry_after:.3f}"
+        return retry_after, headers
+
+    def make_message(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a messages API response body for `request`"""
+        text = build_page_text(self.config.words)
+        return {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model", "stub"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": self.usage_for(request, text)
+        }
+
+    def reset_stats(self):
+        with self.lock:
+            self.requests = []
+            self.max_in_flight = 0
+            self.errors = {429: 0, 529: 0}
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class StubAPIHandler(BaseHTTPRequestHandler):
+    """Handles the messages and message batches endpoints with canned copy"""
+    server: StubAPIServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("content-length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_event(self, event: str, payload: Dict[str, Any]):
+        data = f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream_message(self, message: Dict[str, Any], latency: float, headers: Optional[Dict[str, str]] = None):
+        """Send a message as server-sent events, pacing chunks over `latency` seconds"""
+        config = self.server.config
+        text = message["content"][0]["text"]
+        words = text.split(" ")
+        chunks = [" ".join(words[i:i + config.chunk_words]) for i in range(0, len(words), config.chunk_words)]
+        chunks = [c + " " for c in chunks[:-1]] + chunks[-1:]
+        interval = max(0.0, latency - config.ttft) / max(1, len(chunks))
+
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("transfer-encoding", "chunked")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        time.sleep(config.ttft)
+        usage = message["usage"]
+        self._send_event("message_start", {
+            "type": "message_start",
+            "message": {**message, "content": [], "stop_reason": None,
+                        "usage": {**usage, "output_tokens": 1}}
+        })
+        self._send_event("content_block_start", {
+            "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}
+        })
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(interval)
+            self._send_event("content_block_delta", {
+                "type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}
+            })
+        self._send_event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._send_event("message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+            "usage": {"output_tokens": usage["output_tokens"]}
+        })
+        self._send_event("message_stop", {"type": "message_stop"})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _not_found(self):
+        self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+    def do_POST(self):
+        request = self._read_json()
+        path = self.path.split("?")[0]
+        if path == "/v1/messages/batches":
+            self._create_batch(request)
+        elif path == "/v1/messages":
+            self._create_message(request)
+        else:
+            self._not_found()
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if parts[:3] != ["v1", "messages", "batches"] or len(parts) not in (4, 5):
+            self._not_found()
+            return
+        batch = self.server.batches.get(parts[3])
+        if batch is None:
+            self._not_found()
+        elif len(parts) == 4:
+            self._send_json(200, self._batch_object(batch))
+        elif parts[4] == "results" and self._batch_object(batch)["processing_status"] == "ended":
+            body = "".join(json.dumps(line) + "\n" for line in batch["results"]).encode("utf-8")
+            self.send_response(200)
+            self.send_header("content-type", "application/binary")
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._not_found()
+
+    def _create_message(self, request: Dict[str, Any]):
+        server = self.server
+        status = server.pick_error()
+        if status:
+            error_type = "rate_limit_error" if status == 429 else "overloaded_error"
+            self._send_json(status, {"type": "error", "error": {"type": error_type, "message": "injected by stub"}},
+                            {"retry-after": f"{server.config.retry_after:g}"})
+            return
+        retry_after, limit_headers = server.take_request(self.headers.get("x-api-key", ""))
+        if retry_after is not None:
+            self._send_json(429, {"type": "error", "error": {"type": "rate_limit_error",
+                                                             "message": "per-key rate limit exceeded"}}, limit_headers)
+            return
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.requests.append({"started": time.monotonic(), "model": request.get("model")})
+        try:
+            message = server.make_message(request)
+            latency = server.sample_latency(message["usage"]["output_tokens"])
+            if request.get("stream"):
+                self._stream_message(message, latency, limit_headers)
+            else:
+                time.sleep(latency)
+                self._send_json(200, message, limit_headers)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _create_batch(self, request: Dict[str, Any]):
+        """Accept a batch; it reports `ended` once `batch_latency` seconds have passed"""
+        server = self.server
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        results = [
+            {"custom_id": item["custom_id"],
+             "result": {"type": "succeeded", "message": server.make_message(item["params"])}}
+            for item in request.get("requests", [])
+        ]
+        with server.lock:
+            server.batches[batch_id] = {
+                "id": batch_id,
+                "created": time.time(),
+                "ends": time.time() + server.config.batch_latency,
+                "results": results
+            }
+        self._send_json(200, self._batch_object(server.batches[batch_id]))
+
+    def _batch_object(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        ended = time.time() >= batch["ends"]
+        count = len(batch["results"])
+        return {
+            "id": batch["id"],
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {"processing": 0 if ended else count, "succeeded": count if ended else 0,
+                               "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": _iso(batch["created"]),
+            "expires_at": _iso(batch["created"] + 86400),
+            "ended_at": _iso(batch["ends"]) if ended else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"{self.server.url}/v1/messages/batches/{batch['id']}/results" if ended else None
+        }
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, **config) -> StubAPIServer:
+    """Start the stub API on a background thread and return the server"""
+    server = StubAPIServer((host, port), StubConfig(**config))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', help='Interface to bind')
+@click.option('--port', '-p', type=int, default=8765, help='Port to listen on')
+@click.option('--latency', type=float, default=1.0, help='Seconds per response')
+@click.option('--ttft', type=float, default=0.2, help='Seconds before the first streamed chunk')
+@click.option('--words', type=int, default=600, help='Words of copy per response')
+@click.option('--latency-dist', type=click.Choice(['fixed', 'uniform', 'exponential', 'lognormal']), default='fixed',
+              help='Distribution of response latency around --latency')
+@click.option('--latency-spread', type=float, default=0.5, help='Uniform +/- fraction, or lognormal sigma')
+@click.option('--tokens-per-second', type=float, default=0.0, help='Derive latency from output tokens instead')
+@click.option('--error-rate-429', type=float, default=0.0, help='Fraction of requests rejected with 429')
+@click.option('--error-rate-529', type=float, default=0.0, help='Fraction of requests rejected with 529')
+@click.option('--rpm-per-key', type=float, default=0.0, help='Requests per minute allowed per API key (0: unlimited)')
+def main(host, port, latency, ttft, words, latency_dist, latency_spread, tokens_per_second,
+         error_rate_429, error_rate_529, rpm_per_key):
+    """Run the stub Anthropic API in the foreground"""
+    server = StubAPIServer((host, port), StubConfig(
+        latency=latency, ttft=ttft, words=words, latency_dist=latency_dist, latency_spread=latency_spread,
+        tokens_per_second=tokens_per_second, error_rate_429=error_rate_429, error_rate_529=error_rate_529,
+        rpm_per_key=rpm_per_key
+    ))
+    print(f"🧪 Stub Anthropic API listening on {server.url}")
+    print(f"   export ANTHROPIC_BASE_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
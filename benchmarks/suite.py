@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite: page latency, throughput and memory against the stub API
+
+Run from the repository root:
+    python -m benchmarks.suite                          # all scenarios, results saved
+    python -m benchmarks.suite -s batch_100 --scale 0.2 --compare latest
+
+Each scenario runs in its own subprocess (so peak RSS is per scenario) against
+a stub server in this process. Results are written to benchmarks/results/ as
+<timestamp>_<commit>.json so runs can be compared across commits.
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import click
+
+from benchmarks.stub_server import start_stub_server
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+
+# pages and concurrency at --scale 1
+SCENARIOS = {
+    "single_page": {"pages": 20, "concurrency": 1},
+    "single_page_stream": {"pages": 20, "concurrency": 1},
+    "batch_100": {"pages": 100, "concurrency": 8},
+    "batch_1000": {"pages": 1000, "concurrency": 16},
+    "streamlit": {"pages": 5, "concurrency": 1},
+    "server": {"pages": 100, "concurrency": 8},
+    "distributed": {"pages": 100, "concurrency": 8},
+}
+
+# Worker processes the distributed scenario splits its concurrency over
+DISTRIBUTED_WORKERS = 4
+
+# Metrics compared across runs, and whether bigger is better
+COMPARED = {"p50": False, "p95": False, "p99": False, "pages_per_minute": True, "peak_rss_mb": False}
+
+
+def percentile(values: List[float], pct: int) -> Optional[float]:
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def example_pages(count: int) -> List[Dict[str, Any]]:
+    with open(REPO_ROOT / "batch_config_example.json", 'r') as f:
+        example = json.load(f)
+    return [{**example["defaults"], **example["pages"][i % len(example["pages"])],
+             "product_name": f"Bench Product {i}"} for i in range(count)]
+
+
+# --- scenarios (run inside the child process, cwd is a scratch directory) ---
+
+def run_single(pages: List[Dict[str, Any]], concurrency: int, stream: bool = False) -> Dict[str, Any]:
+    from batch_generate import build_page_config
+    from landing_page_generator import LandingPageGenerator
+
+    generator = LandingPageGenerator()
+    latencies, ttfts, ok = [], [], 0
+    for merged in pages:
+        config = build_page_config(merged)
+        started = time.perf_counter()
+        try:
+            if stream:
+                first = None
+                for event in generator.stream_page(config):
+                    if event.type == "text" and first is None:
+                        first = time.perf_counter() - started
+                ttfts.append(first)
+            else:
+                generator.generate_page(config)
+            ok += 1
+        except Exception as e:
+            print(f"page failed: {e}", file=sys.stderr)
+        latencies.append(time.perf_counter() - started)
+    return {"latencies": latencies, "ttft": ttfts, "ok": ok}
+
+
+def run_batch_scenario(pages: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    from batch_generate import run_batch
+    from landing_page_generator import LandingPageGenerator
+
+    generator = LandingPageGenerator()
+    results = run_batch(generator, pages, concurrency=concurrency)
+    return {
+        "latencies": [r["duration_seconds"] for r in results],
+        "ok": sum(1 for r in results if r["status"] == "success")
+    }
+
+
+def run_streamlit(pages: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    from streamlit.testing.v1 import AppTest
+
+    latencies, ok = [], 0
+    for merged in pages:
+        at = AppTest.from_file(str(REPO_ROOT / "app.py"), default_timeout=300)
+        at.session_state["api_key"] = os.environ["ANTHROPIC_API_KEY"]
+        at.run()
+        at.sidebar.text_input[0].set_value(merged["product_name"])
+        for i in range(3):
+            at.text_input(key=f"benefit_{i}").set_value(merged["benefits"][i])
+            at.text_input(key=f"pain_{i}").set_value(merged["pain_points"][i])
+        button = next(b for b in at.button if b.label.startswith("🚀"))
+        started = time.perf_counter()
+        button.click().run()
+        # The page generates on the app's job queue; rerun the script as its poll would until it shows
+        while not at.exception and not any("Generated" in s.value for s in at.success):
+            if time.perf_counter() - started > 300:
+                break
+            time.sleep(0.05)
+            at.run()
+        latencies.append(time.perf_counter() - started)
+        if not at.exception and any("Generated" in s.value for s in at.success):
+            ok += 1
+    return {"latencies": latencies, "ok": ok}
+
+
+def run_server_scenario(pages: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    import http.client
+    from jobs import JobQueue
+    from landing_page_generator import LandingPageGenerator
+    from metrics import PrometheusMetrics
+    from server import start_server
+
+    metrics = PrometheusMetrics()
+    queue = JobQueue(workers=concurrency, per_user=None)
+    server = start_server(LandingPageGenerator(metrics=metrics), queue, port=0, metrics=metrics)
+    host, port = server.server_address[:2]
+
+    def post(merged: Dict[str, Any], stream: bool) -> Tuple[float, Optional[float], bool]:
+        connection = http.client.HTTPConnection(host, port, timeout=300)
+        started = time.perf_counter()
+        connection.request("POST", "/generate", body=json.dumps(merged),
+                           headers={"content-type": "application/json",
+                                    "accept": "text/event-stream" if stream else "application/json"})
+        response = connection.getresponse()
+        first, ok = None, response.status == 200
+        if stream:
+            # Server-sent events until the server closes the stream
+            for line in response:
+                if line.startswith(b"event: text") and first is None:
+                    first = time.perf_counter() - started
+                elif line.startswith(b"event: error"):
+                    ok = False
+        else:
+            response.read()
+        connection.close()
+        return time.perf_counter() - started, first, ok
+
+    # Half the clients stream, half wait for the JSON result
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda item: post(item[1], item[0] % 2 == 0), enumerate(pages)))
+    connection = http.client.HTTPConnection(host, port)
+    connection.request("GET", "/healthz")
+    healthy = json.loads(connection.getresponse().read())["status"] == "ok"
+    server.shutdown()
+    queue.shutdown()
+    return {"latencies": [latency for latency, _, _ in outcomes],
+            "ttft": [first for _, first, _ in outcomes if first is not None],
+            "ok": sum(1 for _, _, ok in outcomes if ok) if healthy else 0}
+
+
+def run_distributed(pages: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    from lease_queue import LeaseQueue
+
+    queue = LeaseQueue(lease_seconds=10)
+    run_id = queue.create_run(pages)
+    per_worker = max(1, concurrency // DISTRIBUTED_WORKERS)
+    # Peak RSS is this coordinator's; each worker is its own process
+    workers = [subprocess.Popen([sys.executable, str(REPO_ROOT / "lease_queue.py"), "--lease", "10", "worker", run_id,
+                                 "-n", str(per_worker), "--rpm", "0", "--worker-id", f"bench-{i}"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+               for i in range(DISTRIBUTED_WORKERS)]
+    for process in workers:
+        process.wait()
+    results = queue.results(run_id)
+    return {
+        "latencies": [r["duration_seconds"] for r in results],
+        "ok": sum(1 for r in results if r["status"] == "success")
+    }
+
+
+RUNNERS = {
+    "single_page": run_single,
+    "single_page_stream": lambda pages, concurrency: run_single(pages, concurrency, stream=True),
+    "batch_100": run_batch_scenario,
+    "batch_1000": run_batch_scenario,
+    "streamlit": run_streamlit,
+    "server": run_server_scenario,
+    "distributed": run_distributed,
+}
+
+
+def run_child(name: str, scale: float) -> Dict[str, Any]:
+    spec = SCENARIOS[name]
+    pages = example_pages(max(1, round(spec["pages"] * scale)))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # The generator and app read config/ relative to the working directory
+        shutil.copytree(REPO_ROOT / "config", Path(tmp) / "config")
+        os.chdir(tmp)
+        try:
+            started = time.perf_counter()
+            outcome = RUNNERS[name](pages, spec["concurrency"])
+            elapsed = time.perf_counter() - started
+        finally:
+            os.chdir(cwd)
+    return {"pages": len(pages), "concurrency": spec["concurrency"], "elapsed": elapsed,
+            "peak_rss_mb": peak_rss_mb(), **outcome}
+
+
+# --- parent: stub server, result files, comparison ---
+
+def summarize(raw: Dict[str, Any], server_errors: Dict[int, int]) -> Dict[str, Any]:
+    latencies = raw["latencies"]
+    summary = {
+        "pages": raw["pages"],
+        "ok": raw["ok"],
+        "concurrency": raw["concurrency"],
+        "wall_seconds": round(raw["elapsed"], 3),
+        "pages_per_minute": round(raw["ok"] / raw["elapsed"] * 60, 1) if raw["elapsed"] else None,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "peak_rss_mb": raw["peak_rss_mb"],
+        "injected_errors": {str(status): count for status, count in server_errors.items()}
+    }
+    if raw.get("ttft"):
+        summary["ttft_p50"] = percentile([t for t in raw["ttft"] if t is not None], 50)
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in summary.items()}
+
+
+def git_revision() -> str:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return revision + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def load_baseline(compare: str) -> Optional[Dict[str, Any]]:
+    if compare == "latest":
+        runs = sorted(RESULTS_DIR.glob("*.json"))
+        if not runs:
+            return None
+        compare = str(runs[-1])
+    with open(compare, 'r') as f:
+        baseline = json.load(f)
+    baseline["path"] = compare
+    return baseline
+
+
+def compare_runs(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float) -> int:
+    """Print metric deltas against a baseline run; returns the number of regressions"""
+    print(f"\n📉 Compared with {baseline['path']} ({baseline['revision']})\n")
+    regressions = 0
+    for name, scenario in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = before.get(metric), scenario.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = "❌" if worse > tolerance else "  "
+            regressions += worse > tolerance
+            print(f"{flag} {name:<20} {metric:<17} {old:>10.3f} -> {new:>10.3f} ({change:+.1%})")
+    return regressions
+
+
+@click.command()
+@click.option('--scenario', '-s', 'names', type=click.Choice(list(SCENARIOS)), multiple=True,
+              help='Scenarios to run (default: all)')
+@click.option('--scale', type=float, default=1.0, help='Multiply every scenario\'s page count')
+@click.option('--latency', type=float, default=0.2, help='Median stub seconds per API call')
+@click.option('--latency-dist', type=click.Choice(['fixed', 'uniform', 'exponential', 'lognormal']),
+              default='lognormal', help='Stub latency distribution')
+@click.option('--latency-spread', type=float, default=0.5, help='Uniform +/- fraction, or lognormal sigma')
+@click.option('--tokens-per-second', type=float, default=0.0, help='Derive stub latency from output tokens')
+@click.option('--error-rate-429', type=float, default=0.02, help='Fraction of calls rejected with 429')
+@click.option('--error-rate-529', type=float, default=0.01, help='Fraction of calls rejected with 529')
+@click.option('--words', type=int, default=600, help='Words of copy per stub response')
+@click.option('--compare', help='Baseline result file, or "latest"')
+@click.option('--tolerance', type=float, default=0.10, help='Relative change counted as a regression')
+@click.option('--save/--no-save', default=True, help='Write results to benchmarks/results/')
+@click.option('--child', hidden=True)
+def main(names, scale, latency, latency_dist, latency_spread, tokens_per_second, error_rate_429,
+         error_rate_529, words, compare, tolerance, save, child):
+    """Run benchmark scenarios against a local stub API and report latency percentiles"""
+    if child:
+        print(json.dumps(run_child(child, scale)))
+        return
+
+    stub_config = {"latency": latency, "latency_dist": latency_dist, "latency_spread": latency_spread,
+                   "tokens_per_second": tokens_per_second, "error_rate_429": error_rate_429,
+                   "error_rate_529": error_rate_529, "words": words, "ttft": min(0.2, latency / 2), "seed": 0}
+    baseline = load_baseline(compare) if compare else None
+    server = start_stub_server(**stub_config)
+    env = {**os.environ, "ANTHROPIC_BASE_URL": server.url, "ANTHROPIC_API_KEY": "stub-key",
+           "PYTHONPATH": os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get("PYTHONPATH")]))}
+
+    run = {"timestamp": datetime.now().isoformat(), "revision": git_revision(), "python": sys.version.split()[0],
+           "scale": scale, "stub": stub_config, "scenarios": {}}
+    print(f"\n🏁 Benchmark suite @ {run['revision']} (stub {latency_dist} {latency}s, "
+          f"{error_rate_429:.0%} 429s, {error_rate_529:.0%} 529s)\n")
+    print(f"{'scenario':<20} {'pages':>6} {'p50':>7} {'p95':>7} {'p99':>7} {'pages/min':>10} {'peak RSS':>9}")
+    try:
+        for name in names or SCENARIOS:
+            server.reset_stats()
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.suite", "--child", name, "--scale", str(scale)],
+                cwd=REPO_ROOT, env=env, capture_output=True, text=True
+            )
+            if completed.returncode:
+                print(f"{name:<20} ❌ failed\n{completed.stderr[-2000:]}")
+                continue
+            summary = summarize(json.loads(completed.stdout.strip().splitlines()[-1]), dict(server.errors))
+            run["scenarios"][name] = summary
+            failed = f" ({summary['pages'] - summary['ok']} failed)" if summary["ok"] < summary["pages"] else ""
+            print(f"{name:<20} {summary['pages']:>6} {summary['p50']:>6.2f}s {summary['p95']:>6.2f}s "
+                  f"{summary['p99']:>6.2f}s {summary['pages_per_minute']:>10.1f} "
+                  f"{summary['peak_rss_mb'] or 0:>6.0f} MB{failed}")
+    finally:
+        server.shutdown()
+
+    if save and run["scenarios"]:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        path = RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{run['revision']}.json"
+        with open(path, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"\n💾 Results saved to {path.relative_to(REPO_ROOT)}")
+
+    if baseline and compare_runs(baseline, run, tolerance):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+SQLite catalog of generated pages, for finding past pages without reading the store
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import click
+
+logger = logging.getLogger(__name__)
+
+CATALOG_PATH = Path("generated_pages") / "catalog.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id TEXT PRIMARY KEY,
+    product TEXT NOT NULL,
+    page_type TEXT NOT NULL,
+    angle TEXT,
+    industry TEXT,
+    word_count INTEGER,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    cache_read_input_tokens INTEGER,
+    cache_creation_input_tokens INTEGER,
+    generated_at TEXT NOT NULL,
+    cataloged_at TEXT NOT NULL,
+    shard TEXT,
+    offset INTEGER,
+    length INTEGER,
+    config_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_product ON pages (product, page_type, generated_at);
+CREATE INDEX IF NOT EXISTS pages_page_type ON pages (page_type, generated_at);
+CREATE INDEX IF NOT EXISTS pages_angle ON pages (angle, generated_at);
+CREATE INDEX IF NOT EXISTS pages_generated_at ON pages (generated_at);
+CREATE INDEX IF NOT EXISTS pages_config_hash ON pages (config_hash);
+"""
+
+COLUMNS = ("id", "product", "page_type", "angle", "industry", "word_count", "input_tokens", "output_tokens",
+           "cache_read_input_tokens", "cache_creation_input_tokens", "generated_at", "cataloged_at",
+           "shard", "offset", "length", "config_hash")
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """Stable hash of a page config, for finding pages generated from the same inputs"""
+    canonical = json.dumps(config, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class PageCatalog:
+    """Indexed table of every saved page: what it is, what it cost, and where it is stored"""
+
+    def __init__(self, path: str = str(CATALOG_PATH)):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            # WAL lets readers query while a batch run is writing
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # The catalog can be rebuilt from the store, so commits need not wait for fsync
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def register(self, result: Dict[str, Any], location: Dict[str, Any]):
+        """Add (or replace) the catalog entry for a saved page"""
+        config = result["config"]
+        tokens = result.get("usage", {}).get("total", {})
+        row = {
+            "id": location["id"],
+            "product": config["product_name"],
+            "page_type": config["page_type"],
+            "angle": config.get("angle"),
+            "industry": config.get("industry"),
+            "word_count": result.get("word_count"),
+            "input_tokens": tokens.get("input_tokens"),
+            "output_tokens": tokens.get("output_tokens"),
+            "cache_read_input_tokens": tokens.get("cache_read_input_tokens"),
+            "cache_creation_input_tokens": tokens.get("cache_creation_input_tokens"),
+            "generated_at": result["generated_at"],
+            "cataloged_at": datetime.now().isoformat(),
+            "shard": location.get("shard"),
+            "offset": location.get("offset"),
+            "length": location.get("length"),
+            "config_hash": config_hash(config)
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO pages ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                [row[column] for column in COLUMNS]
+            )
+
+    def query(self, product: Optional[str] = None, page_type: Optional[str] = None, angle: Optional[str] = None,
+              industry: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None,
+              config: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Pages matching all given filters, newest first"""
+        filters = {"product": product, "page_type": page_type, "angle": angle, "industry": industry,
+                   "config_hash": config_hash(config) if config is not None else None}
+        clauses = [f"{column} = ?" for column, value in filters.items() if value is not None]
+        params: List[Any] = [value for value in filters.values() if value is not None]
+        if since:
+            clauses.append("generated_at >= ?")
+            params.append(since.isoformat())
+        if until:
+            clauses.append("generated_at < ?")
+            params.append(until.isoformat())
+
+        sql = "SELECT * FROM pages"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY generated_at DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def get(self, page_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM pages WHERE id = ?", (page_id,)).fetchone()
+        return dict(row) if row else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_catalogs: Dict[Path, PageCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(path: str = str(CATALOG_PATH)) -> PageCatalog:
+    """Process-wide PageCatalog for `path`"""
+    key = Path(path).resolve()
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = PageCatalog(path)
+        return _catalogs[key]
+
+
+@click.group()
+@click.option('--catalog', 'path', type=click.Path(dir_okay=False), default=str(CATALOG_PATH), help='Catalog database')
+@click.pass_context
+def main(ctx, path):
+    """Find generated pages"""
+    ctx.obj = path
+
+
+@main.command()
+@click.option('--product', help='Product name (exact)')
+@click.option('--page-type', help='Page type, e.g. advertorial')
+@click.option('--angle', help='Marketing angle')
+@click.option('--industry', help='Industry')
+@click.option('--since', type=click.DateTime(), help='Generated on or after this date')
+@click.option('--until', type=click.DateTime(), help='Generated before this date')
+@click.option('--last-days', type=click.FloatRange(min=0), help='Generated within the last N days')
+@click.option('--limit', type=click.IntRange(min=1), default=50, help='Max pages to list')
+@click.option('--json', 'as_json', is_flag=True, help='Print rows as JSON lines')
+@click.pass_obj
+def query(path, product, page_type, angle, industry, since, until, last_days, limit, as_json):
+    """List pages matching the filters, newest first"""
+    if last_days is not None:
+        since = datetime.now() - timedelta(days=last_days)
+    rows = PageCatalog(path).query(product=product, page_type=page_type, angle=angle, industry=industry,
+                                   since=since, until=until, limit=limit)
+    if as_json:
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+        return
+    if not rows:
+        print("No matching pages")
+        return
+    for row in rows:
+        tokens = (row["input_tokens"] or 0) + (row["output_tokens"] or 0)
+        print(f"{row['generated_at'][:19]}  {row['id']}")
+        print(f"    {row['product']} | {row['page_type']} | {row['angle']} | "
+              f"{row['word_count']} words | {tokens} tokens | {row['shard']} @ {row['offset']}")
+    print(f"\n📄 {len(rows)} page(s)")
+
+
+@main.command()
+@click.option('--store', 'store_root', type=click.Path(file_okay=False), default=None, help='Output store directory')
+@click.pass_obj
+def rebuild(path, store_root):
+    """Catalog every page in the output store (for pages saved before the catalog existed)"""
+    from output_store import STORE_DIR, OutputStore
+    store = OutputStore(store_root or str(STORE_DIR))
+    catalog = PageCatalog(path)
+    count = 0
+    for page_id in store.ids():
+        location = store.location(page_id)
+        catalog.register(store.read(location), location)
+        count += 1
+    print(f"✅ Cataloged {count} pages")
+
+
+if __name__ == "__main__":
+    main()
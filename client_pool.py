@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Long-lived Anthropic clients keyed by API key, with keep-alive connection pools
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Connections kept per client, and seconds an idle one stays open for reuse
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+# Long pages stream for minutes; this bounds each read, not the whole response
+DEFAULT_READ_TIMEOUT = 600.0
+DEFAULT_MAX_CLIENTS = 64
+
+
+def _key_id(api_key: str) -> str:
+    """Pool key for an API key, so the pool's index does not hold the key itself"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+class ClientPool:
+    """One `anthropic.Anthropic` client per API key, reused across requests and threads.
+
+    Every client keeps its HTTP connections alive between calls, so repeat
+    generations skip TCP and TLS setup. The least recently used client is
+    dropped once more than `max_clients` keys are in use.
+    """
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 max_keepalive: int = DEFAULT_MAX_KEEPALIVE,
+                 keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 max_clients: int = DEFAULT_MAX_CLIENTS):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_clients = max_clients
+        self._clients: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ClientPool":
+        """Pool sized by the LPG_HTTP_* environment variables, where set"""
+        return cls(
+            max_connections=int(os.getenv("LPG_HTTP_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+            max_keepalive=int(os.getenv("LPG_HTTP_MAX_KEEPALIVE", DEFAULT_MAX_KEEPALIVE)),
+            keepalive_expiry=float(os.getenv("LPG_HTTP_KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY)),
+            connect_timeout=float(os.getenv("LPG_HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)),
+            read_timeout=float(os.getenv("LPG_HTTP_READ_TIMEOUT", DEFAULT_READ_TIMEOUT)),
+            max_clients=int(os.getenv("LPG_HTTP_MAX_CLIENTS", DEFAULT_MAX_CLIENTS))
+        )
+
+    def _create(self, api_key: str) -> Any:
+        import anthropic
+        import httpx
+        http_client = anthropic.DefaultHttpxClient(
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_keepalive,
+                                keepalive_expiry=self.keepalive_expiry),
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+        )
+        return anthropic.Anthropic(api_key=api_key, http_client=http_client)
+
+    def get(self, api_key: str) -> Any:
+        """The client for `api_key`, created on first use"""
+        key = _key_id(api_key)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+            client = self._clients[key] = self._create(api_key)
+            while len(self._clients) > self.max_clients:
+                # Not closed here: a session may still be streaming on it
+                self._clients.popitem(last=False)
+        logger.info(f"Created API client ({len(self._clients)} in pool)")
+        return client
+
+    def discard(self, api_key: str, close: bool = True):
+        """Forget the client for `api_key` (e.g. on logout), closing it unless calls may still be using it.
+
+        Clients made with `with_options` share this client's connections, so
+        pass close=False while any job of the key is running; the client is
+        then closed when the last reference to it goes away.
+        """
+        with self._lock:
+            client = self._clients.pop(_key_id(api_key), None)
+        if client is not None and close:
+            client.close()
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), OrderedDict()
+        for client in clients:
+            client.close()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+_pool: Optional[ClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_client_pool() -> ClientPool:
+    """Process-wide ClientPool, configured from the environment"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ClientPool.from_env()
+        return _pool
@@ -4,14 +4,14 @@ Demo script to show how the Landing Page Generator works (no API key required)
 """
 import json
 from pathlib import Path
-from landing_page_generator import PatternLibrary, PromptEngine, PageConfig
+from landing_page_generator import PromptEngine, PageConfig, get_pattern_library
 
 def main():
     print("\n🚀 Landing Page Generator Demo")
     print("="*50)
     
     # Load pattern library
-    patterns = PatternLibrary()
+    patterns = get_pattern_library()
     prompt_engine = PromptEngine(patterns)
     
     # Example configuration
@@ -2,18 +2,41 @@
 """
 Simple CLI interface for generating landing pages
 """
-import json
+import sys
 import click
-from pathlib import Path
-from landing_page_generator import LandingPageGenerator, PageConfig
+from typing import Callable, Sequence
+from landing_page_generator import LandingPageGenerator, MissingAPIKeyError, PageConfig, configure_logging, get_pattern_library
+from metrics import PHASES
+from model_profiles import DEFAULT_PROFILE, get_model_profiles
+from quality import DEFAULT_QUALITY_THRESHOLD
+from response_cache import ResponseCache
 
-# Load configuration options
-CONFIG_DIR = Path("config")
-with open(CONFIG_DIR / "page_types.json", 'r') as f:
-    PAGE_TYPES = list(json.load(f)["page_types"].keys())
+class LazyChoice(click.Choice):
+    """click.Choice whose options are loaded from the pattern library on first use"""
+    
+    def __init__(self, load: Callable[[], Sequence[str]]):
+        self._load = load
+        self._choices = None
+        super().__init__([])
+    
+    @property
+    def choices(self) -> Sequence[str]:
+        if self._choices is None:
+            try:
+                self._choices = list(self._load())
+            except (OSError, ValueError) as e:
+                raise click.UsageError(f"Could not load the choices: {e}")
+        return self._choices
+    
+    @choices.setter
+    def choices(self, value):
+        # click.Choice.__init__ assigns the (empty) placeholder list; the loader wins
+        pass
 
-with open(CONFIG_DIR / "angles.json", 'r') as f:
-    ANGLES = list(json.load(f)["angles"].keys())
+# Configuration options, read from the shared pattern library only when needed
+PAGE_TYPES = LazyChoice(lambda: get_pattern_library().page_types["page_types"].keys())
+ANGLES = LazyChoice(lambda: get_pattern_library().angles["angles"].keys())
+MODEL_PROFILES = LazyChoice(lambda: get_model_profiles().names())
 
 INDUSTRIES = [
     "fitness", "health", "beauty", "dating", "finance", "investing",
@@ -26,18 +49,50 @@ VOICE_TONES = [
     "conversational", "inspirational", "direct", "empathetic"
 ]
 
+STAGE_LABELS = {
+    "initial": "✍️  Drafting initial copy",
+    "refinement": "🔧 Refining for conversion"
+}
+
+def stream_to_terminal(generator: LandingPageGenerator, config: PageConfig):
+    """Print the page as it streams in and return the final result"""
+    result = None
+    for event in generator.stream_page(config):
+        if event.type == "stage_start":
+            print(f"\n{STAGE_LABELS[event.stage]}...\n{'-'*50}")
+        elif event.type == "text":
+            sys.stdout.write(event.text)
+            sys.stdout.flush()
+        elif event.type == "stage_end":
+            print(f"\n{'-'*50}")
+        elif event.type == "quality":
+            verdict = "good enough, skipping refinement" if event.result["passed"] else "refining"
+            print(f"\n🎯 Draft quality {event.result['score']:.2f}: {verdict}")
+        elif event.type == "done":
+            result = event.result
+    return result
+
 @click.command()
 @click.option('--product-name', prompt='Product name', help='Name of your product/service')
-@click.option('--page-type', type=click.Choice(PAGE_TYPES), prompt='Page type', help='Type of landing page')
+@click.option('--page-type', type=PAGE_TYPES, prompt='Page type', help='Type of landing page')
 @click.option('--industry', type=click.Choice(INDUSTRIES), prompt='Industry', help='Your industry')
 @click.option('--price', type=float, prompt='Price point ($)', help='Product price')
-@click.option('--angle', type=click.Choice(ANGLES), prompt='Marketing angle', help='Story angle to use')
+@click.option('--angle', type=ANGLES, prompt='Marketing angle', help='Story angle to use')
 @click.option('--urgency', type=click.Choice(['low', 'medium', 'high']), default='medium', prompt='Urgency level')
 @click.option('--length', type=click.Choice(['short', 'medium', 'long']), default='medium', prompt='Page length')
 @click.option('--voice', type=click.Choice(VOICE_TONES), default='friendly', prompt='Voice tone')
+@click.option('--cache/--no-cache', default=False, help='Reuse responses for identical API requests')
+@click.option('--refresh-cache', is_flag=True, help='Bypass cache reads but store fresh responses')
+@click.option('--stream/--no-stream', default=True, help='Print the copy as it is generated')
+@click.option('--quality-threshold', type=click.FloatRange(0, 1), default=DEFAULT_QUALITY_THRESHOLD, show_default=True,
+              help='Skip refinement when the draft scores at least this on the local quality check')
+@click.option('--always-refine', is_flag=True, help='Refine the draft regardless of its quality score')
+@click.option('--model-profile', type=MODEL_PROFILES, default=DEFAULT_PROFILE, show_default=True,
+              help='Model, max_tokens and temperature per stage (fast uses a smaller model where it can)')
 def generate(**kwargs):
     """Generate a high-converting landing page using proven patterns"""
     
+    configure_logging()
     print("\n🚀 Generating your landing page...\n")
     
     # Collect benefits
@@ -83,21 +138,54 @@ def generate(**kwargs):
         unique_mechanism=unique_mechanism
     )
     
+    # Set up the generator
+    try:
+        response_cache = None
+        if kwargs['cache'] or kwargs['refresh_cache']:
+            response_cache = ResponseCache(bypass=kwargs['refresh_cache'])
+        quality_threshold = None if kwargs['always_refine'] else kwargs['quality_threshold']
+        generator = LandingPageGenerator(cache=response_cache, quality_threshold=quality_threshold,
+                                         model_profile=kwargs['model_profile'])
+    except MissingAPIKeyError as e:
+        print(f"\n❌ Error: {e}")
+        print("\nMake sure you have set the ANTHROPIC_API_KEY environment variable")
+        return
+    except (OSError, ValueError) as e:
+        print(f"\n❌ Invalid configuration: {e}")
+        return
+    
     # Generate the page
     try:
-        generator = LandingPageGenerator()
-        result = generator.generate_page(config)
+        if kwargs['stream']:
+            result = stream_to_terminal(generator, config)
+        else:
+            result = generator.generate_page(config)
         
         print(f"\n✅ Success! Generated {config.page_type} for {config.product_name}")
         print(f"📝 Word count: {result['word_count']}")
-        print(f"💾 Saved to: generated_pages/")
-        print(f"\n📄 Files created:")
-        print(f"   - Markdown: {config.product_name.lower().replace(' ', '_')}_{config.page_type}_*.md")
-        print(f"   - JSON: {config.product_name.lower().replace(' ', '_')}_{config.page_type}_*.json")
+        quality = result.get('quality')
+        if quality:
+            print(f"🎯 Quality score: {quality['score']:.2f}{'' if quality['refined'] else ' (refinement skipped)'}")
+        tokens = result.get('usage', {}).get('total')
+        if tokens:
+            print(f"🧮 Tokens: {tokens['input_tokens']} in ({tokens['cache_read_input_tokens']} cached) / {tokens['output_tokens']} out")
+        metrics = result.get('metrics', {})
+        stages = metrics.get('stages', {})
+        if stages:
+            timings = ", ".join(f"{stage} {sum(data.get(field, 0) for field in PHASES):.2f}s"
+                                for stage, data in stages.items())
+            print(f"⏱️  Time: {timings}")
+        if result.get('models'):
+            print(f"🤖 Models ({result['model_profile']}): "
+                  + ", ".join(f"{stage} {model}" for stage, model in result['models'].items()))
+        if metrics.get('cost_usd') is not None:
+            print(f"💵 Estimated cost: ${metrics['cost_usd']:.4f}")
+        location = result['location']
+        print(f"💾 Saved as {location['id']} in {generator.store.root / location['shard']}")
+        print(f"📄 Export Markdown: python output_store.py export {location['id']}")
         
     except Exception as e:
         print(f"\n❌ Error: {e}")
-        print("\nMake sure you have set the ANTHROPIC_API_KEY environment variable")
 
 if __name__ == "__main__":
     generate()
\ No newline at end of file
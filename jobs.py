@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Background generation jobs: a process-wide worker pool with progress, per-user limits and a persistent job log
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from output_store import get_output_store
+
+logger = logging.getLogger(__name__)
+
+JOBS_LOG = Path("generated_pages") / "jobs" / "jobs.jsonl"
+DEFAULT_WORKERS = 8
+DEFAULT_PER_USER = 3
+# Finished jobs kept in memory (and listed); older ones are forgotten, their pages stay in the store
+DEFAULT_KEEP_FINISHED = 1000
+CHARS_PER_TOKEN = 4
+# Characters of the stage being written that a progress view gets
+PREVIEW_CHARS = 2000
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+INTERRUPTED = "interrupted"  # running when the process stopped
+ACTIVE = (QUEUED, RUNNING)
+
+
+class JobLimitError(RuntimeError):
+    """The user already has as many jobs queued or running as allowed"""
+
+
+def owner_id(api_key: str) -> str:
+    """Stable id for the owner of an API key, so jobs survive a page refresh without storing the key"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+
+@dataclass
+class Job:
+    """One page generation and its progress"""
+    id: str
+    owner: str
+    product: str
+    page_type: str
+    status: str = QUEUED
+    stage: Optional[str] = None  # initial or refinement while running
+    streamed_chars: int = 0  # copy streamed so far, over all stages
+    output_tokens: Optional[int] = None  # actual output tokens, once done
+    quality_score: Optional[float] = None
+    page_id: Optional[str] = None  # id of the result in the output store, once done
+    error: Optional[str] = None
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    _chunks: List[str] = field(default_factory=list, repr=False)  # the current stage's text, not persisted
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE
+
+    @property
+    def tokens_so_far(self) -> int:
+        """Output tokens, estimated from the streamed text until the job is done"""
+        return self.output_tokens if self.output_tokens is not None else self.streamed_chars // CHARS_PER_TOKEN
+
+    def preview(self, chars: int = PREVIEW_CHARS) -> str:
+        """The end of the text streamed so far in the current stage"""
+        return "".join(self._chunks)[-chars:]
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("_chunks")
+        return data
+
+
+class JobQueue:
+    """Runs generations on a shared worker pool so no UI session waits on one.
+
+    Each user (API key, or client of the generation server) may have
+    `per_user` jobs queued or running at once; None lifts the cap.
+    Job records are appended to a JSONL log on every status or stage change,
+    so the job list survives reruns and restarts; jobs still active when the
+    process stopped come back as interrupted. Results live in the output
+    store, referenced by `page_id`. Only the `keep_finished` most recently
+    finished jobs are kept; None keeps them all.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, per_user: Optional[int] = DEFAULT_PER_USER,
+                 log_path: Path = JOBS_LOG, keep_finished: Optional[int] = DEFAULT_KEEP_FINISHED):
+        self.workers = workers
+        self.per_user = per_user
+        self.log_path = Path(log_path)
+        self.keep_finished = keep_finished
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lpg-job")
+        self._lock = threading.Lock()
+        # Guards job progress; notified on every change so followers need not poll
+        self._changed = threading.Condition()
+        self._jobs: Dict[str, Job] = self._load()
+        self._evict()
+
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        """Queue sized by LPG_JOB_WORKERS and LPG_JOBS_PER_USER, where set"""
+        return cls(workers=int(os.getenv("LPG_JOB_WORKERS", DEFAULT_WORKERS)),
+                   per_user=int(os.getenv("LPG_JOBS_PER_USER", DEFAULT_PER_USER)))
+
+    def _load(self) -> Dict[str, Job]:
+        """Replay the job log into the latest record of each job"""
+        jobs: Dict[str, Job] = {}
+        if not self.log_path.exists():
+            return jobs
+        known = {f.name for f in fields(Job)} - {"_chunks"}
+        with open(self.log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("removed"):
+                    jobs.pop(record["id"], None)
+                    continue
+                jobs[record["id"]] = Job(**{key: value for key, value in record.items() if key in known})
+        for job in jobs.values():
+            if job.active:
+                job.status = INTERRUPTED
+                job.error = "The server stopped before this job finished"
+        return jobs
+
+    def _save(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+    def submit(self, owner: str, generator: Any, config: Any) -> Job:
+        """Queue a page for `generator.stream_page(config)`; raises JobLimitError over the per-user cap"""
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job.owner == owner and job.active)
+            if self.per_user is not None and active >= self.per_user:
+                raise JobLimitError(f"{active} pages are already generating; wait for one to finish")
+            job = Job(uuid.uuid4().hex[:12], owner, config.product_name, config.page_type)
+            self._jobs[job.id] = job
+        self._save(job.to_dict())
+        self._pool.submit(self._run, job, generator, config)
+        logger.info(f"Queued job {job.id} ({job.product} - {job.page_type})")
+        return job
+
+    def _update(self, job: Job, **changes):
+        with self._changed:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            self._changed.notify_all()
+    
+    def _run(self, job: Job, generator: Any, config: Any):
+        self._update(job, status=RUNNING, started_at=datetime.now().isoformat())
+        self._save(job.to_dict())
+        try:
+            for event in generator.stream_page(config):
+                if event.type == "stage_start":
+                    # A new list, so followers still reading the last stage's keep theirs intact
+                    self._update(job, stage=event.stage, _chunks=[])
+                    self._save(job.to_dict())
+                elif event.type == "text":
+                    with self._changed:
+                        job._chunks.append(event.text)
+                        job.streamed_chars += len(event.text)
+                        self._changed.notify_all()
+                elif event.type == "quality":
+                    self._update(job, quality_score=event.result["score"])
+                elif event.type == "done":
+                    result = event.result
+                    self._update(job, page_id=result["location"]["id"],
+                                 quality_score=result.get("quality", {}).get("score", job.quality_score),
+                                 output_tokens=result.get("usage", {}).get("total", {}).get("output_tokens"))
+            status, error = DONE, None
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            status, error = FAILED, str(e)
+        self._update(job, status=status, error=error, stage=None, _chunks=[], finished_at=datetime.now().isoformat())
+        self._save(job.to_dict())
+        self._evict()
+    
+    def _evict(self):
+        """Forget the oldest finished jobs beyond `keep_finished`"""
+        if self.keep_finished is None:
+            return
+        with self._lock:
+            finished = [job for job in self._jobs.values() if not job.active]
+            excess = len(finished) - self.keep_finished
+            if excess <= 0:
+                return
+            finished.sort(key=lambda job: job.finished_at or job.created_at)
+            evicted = [job.id for job in finished[:excess]]
+            for job_id in evicted:
+                del self._jobs[job_id]
+        for job_id in evicted:
+            self._save({"id": job_id, "removed": True})
+    
+    def wait(self, job: Job, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes; returns False if it is still active after `timeout` seconds"""
+        with self._changed:
+            return self._changed.wait_for(lambda: not job.active, timeout)
+    
+    def follow(self, job: Job, keepalive: Optional[float] = None) -> Iterator[Tuple[str, Any]]:
+        """A job's progress as it happens, as ("stage", name) and ("text", chunk) pairs, until it finishes.
+
+        Every chunk streamed after the call is yielded once, in order, along
+        with the current stage's text so far. With `keepalive`, ("keepalive",
+        None) is yielded after that many seconds without progress.
+        """
+        chunks, sent, stage = None, 0, None
+        while True:
+            with self._changed:
+                progressed = self._changed.wait_for(
+                    lambda: job._chunks is not chunks or len(chunks) > sent or not job.active, keepalive)
+                current, current_stage, active = job._chunks, job.stage, job.active
+                available = len(chunks) if chunks is not None else 0
+            if not progressed:
+                yield "keepalive", None
+                continue
+            # Lists are replaced, never cleared, when a stage ends, so the last stage's tail is still here
+            for text in (chunks or [])[sent:available]:
+                yield "text", text
+            sent = available
+            if current is not chunks:
+                chunks, sent = current, 0
+                if current_stage is not None and current_stage != stage:
+                    yield "stage", current_stage
+                stage = current_stage
+            elif not active:
+                return
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def jobs(self, owner: str) -> List[Job]:
+        """A user's jobs, newest first"""
+        with self._lock:
+            owned = [job for job in self._jobs.values() if job.owner == owner]
+        return sorted(owned, key=lambda job: job.created_at, reverse=True)
+
+    def counts(self) -> Dict[str, int]:
+        """Jobs of all users by status"""
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in (QUEUED, RUNNING, DONE, FAILED, INTERRUPTED)}
+    
+    def result(self, job: Job) -> Dict[str, Any]:
+        """The stored page a finished job produced"""
+        if job.page_id is None:
+            raise KeyError(f"Job {job.id} has no result")
+        return get_output_store().get(job.page_id)
+
+    def clear(self, owner: str) -> int:
+        """Forget a user's finished jobs (their pages stay in the store); returns how many"""
+        with self._lock:
+            finished = [job.id for job in self._jobs.values() if job.owner == owner and not job.active]
+            for job_id in finished:
+                del self._jobs[job_id]
+        for job_id in finished:
+            self._save({"id": job_id, "removed": True})
+        return len(finished)
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
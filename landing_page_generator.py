@@ -5,19 +5,68 @@ Landing Page Generator - Creates high-converting landing pages using proven patt
 import os
 import json
 import logging
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, Generator, Iterator, List, Optional, Any, Tuple
 from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
-import anthropic
+from functools import lru_cache
+from rate_limit import RateLimiter
+from router import Router, estimate_tokens, retry_after_seconds
+from resilience import RATE_LIMITED, CircuitBreaker, LatencyTracker, RetryPolicy, failure_reason
+from response_cache import ResponseCache
+from catalog import PageCatalog, get_catalog
+from client_pool import get_client_pool
+from metrics import MetricsSink, estimate_cost, page_metrics
+from model_profiles import DEFAULT_PROFILE, OPUS, ModelProfiles, StageModel, get_model_profiles
+from quality import DEFAULT_QUALITY_THRESHOLD, QualityReport, quality_summary, score_copy, section_issues, urgency_range
+from output_store import OutputStore, get_output_store
+from sections import HEADING, SectionIndex, Sections, section_heading
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# anthropic (and its httpx/pydantic stack) is imported when a generator is
+# created, so CLI startup, --help and config validation stay fast
 logger = logging.getLogger(__name__)
 
+def configure_logging(level: int = logging.INFO):
+    """Configure logging for command line entry points"""
+    logging.basicConfig(
+        level=level,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+DEFAULT_MODEL = OPUS  # Claude Opus 4 - most capable model
+
+# Word targets for page types that do not define their own (mid-points of the prompt's ranges)
+DEFAULT_WORD_COUNTS = {"short": 1750, "medium": 3500, "long": 5000}
+
+# Long pages of these types are drafted as an outline plus concurrently written sections
+SECTIONED_PAGE_TYPES = ("advertorial", "sales_letter")
+# Fixed word budgets for short structure elements (any "*_headline" counts as a headline);
+# the rest of a page's word count is split across its body sections
+SHORT_SECTION_WORDS = {
+    "headline": 25, "subheadline": 40, "cta_button": 30, "video_embed": 50,
+    "urgency_text": 60, "urgency_element": 60, "email_capture": 80, "cta_section": 120, "ps_section": 100,
+}
+MIN_SECTION_WORDS = 100
+
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+def section_word_budgets(structure: List[str], word_count: int) -> Dict[str, int]:
+    """Words to ask for per structure element: short elements get a fixed budget, body sections share the rest"""
+    short = {element: SHORT_SECTION_WORDS.get(element, SHORT_SECTION_WORDS["headline"]
+                                              if element.endswith("_headline") else None)
+             for element in structure}
+    short = {element: words for element, words in short.items() if words is not None}
+    body = [element for element in structure if element not in short]
+    per_body = max(MIN_SECTION_WORDS, (word_count - sum(short.values())) // max(1, len(body)))
+    return {element: short.get(element, per_body) for element in structure}
+
+def usage_to_dict(usage: Any) -> Dict[str, int]:
+    """Convert an API usage object into plain token counts"""
+    return {field: getattr(usage, field, None) or 0 for field in USAGE_FIELDS}
+
 @dataclass
 class PageConfig:
     """Configuration for generating a landing page"""
@@ -36,24 +85,111 @@ class PageConfig:
     unique_mechanism: Optional[str] = None
     guarantee_type: Optional[str] = "30_day_money_back"
     bonuses: Optional[List[Dict[str, str]]] = None
+    model_profile: Optional[str] = None  # fast, default, ...; the generator's profile when unset
+
+@dataclass
+class StreamEvent:
+    """Progress event yielded by LandingPageGenerator.stream_page"""
+    type: str  # stage_start, text, section, stage_end, quality, done
+    stage: Optional[str] = None  # initial, refinement
+    text: str = ""  # text delta, a completed section's text, or the full stage copy on stage_end
+    result: Optional[Dict[str, Any]] = None  # the result on done, the draft's quality report on quality
+    section: Optional[str] = None  # section name on section events
+
+@dataclass
+class Completion:
+    """Text, token usage and timing of a single Claude call"""
+    text: str
+    usage: Dict[str, int]
+    from_cache: bool = False
+    model: str = DEFAULT_MODEL
+    seconds: float = 0.0  # wall time of the API call
+    ttft: Optional[float] = None  # seconds until the first text arrived
+    wait_seconds: float = 0.0  # time spent waiting on the rate limiter
+    prompt_seconds: float = 0.0  # time spent building the prompt
+    retries: int = 0  # failed attempts before this one succeeded
+    hedges: int = 0  # slow calls raced against a duplicate request
+    parts: Optional[Dict[str, Dict[str, Any]]] = None  # model, calls, tokens and cost per part of a combined stage
+    
+    def cost_usd(self) -> Optional[float]:
+        if not self.parts:
+            return estimate_cost(self.model, self.usage)
+        costs = [part["cost_usd"] for part in self.parts.values() if part["cost_usd"] is not None]
+        return round(sum(costs), 6) if costs else None
+    
+    def cost_by_model(self) -> Dict[str, float]:
+        """Estimated cost per model, each call priced with the model that served it"""
+        if not self.parts:
+            cost = estimate_cost(self.model, self.usage)
+            return {self.model: cost} if cost is not None else {}
+        costs: Dict[str, float] = {}
+        for part in self.parts.values():
+            for model, cost in part.get("cost_by_model", {}).items():
+                costs[model] = round(costs.get(model, 0.0) + cost, 6)
+        return costs
+    
+    def stage_metrics(self) -> Dict[str, Any]:
+        """Timing, tokens and cost of this call, as recorded per stage in results"""
+        metrics = {
+            "model": self.model,
+            "from_cache": self.from_cache,
+            "prompt_seconds": round(self.prompt_seconds, 4),
+            "wait_seconds": round(self.wait_seconds, 4),
+            "seconds": round(self.seconds, 4),
+            "ttft": round(self.ttft, 4) if self.ttft is not None else None,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            **self.usage,
+            "cost_usd": self.cost_usd()
+        }
+        if self.parts:
+            metrics["parts"] = self.parts
+            metrics["cost_by_model"] = self.cost_by_model()
+        return metrics
 
 class PatternLibrary:
     """Loads and manages the pattern library"""
     
-    def __init__(self, config_dir: str = "config"):
+    CONFIG_FILES = ("page_types.json", "angles.json", "pattern_rules.json")
+    ANALYSIS_FILES = ("copy_swipe_file.json", "conversion_formulas.json")
+    
+    def __init__(self, config_dir: str = "config", analysis_dir: str = "../output"):
         self.config_dir = Path(config_dir)
+        self.analysis_dir = Path(analysis_dir)
+        # Record mtimes before reading so a write during loading marks us stale
+        self.source_mtimes = self._source_mtimes()
         self.page_types = self._load_json("page_types.json")
         self.angles = self._load_json("angles.json")
         self.pattern_rules = self._load_json("pattern_rules.json")
         
         # Load analysis patterns if available
-        analysis_dir = Path("../output")
-        if analysis_dir.exists():
-            self.copy_swipes = self._load_json("copy_swipe_file.json", analysis_dir)
-            self.conversion_formulas = self._load_json("conversion_formulas.json", analysis_dir)
+        if self.analysis_dir.exists():
+            self.copy_swipes = self._load_json("copy_swipe_file.json", self.analysis_dir)
+            self.conversion_formulas = self._load_json("conversion_formulas.json", self.analysis_dir)
         else:
             self.copy_swipes = {}
             self.conversion_formulas = {}
+        
+        # Precompute the relevant patterns for every known (page_type, angle) pair
+        self._relevant: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for page_type in self.page_types.get("page_types", {}):
+            for angle in self.angles.get("angles", {}):
+                self._relevant[(page_type, angle)] = self._build_relevant_patterns(page_type, angle)
+    
+    def _source_mtimes(self) -> Dict[Path, Optional[float]]:
+        paths = [self.config_dir / name for name in self.CONFIG_FILES]
+        paths += [self.analysis_dir / name for name in self.ANALYSIS_FILES]
+        mtimes = {}
+        for path in paths:
+            try:
+                mtimes[path] = path.stat().st_mtime
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+    
+    def is_stale(self) -> bool:
+        """Whether any source file was modified, created or removed since loading"""
+        return self._source_mtimes() != self.source_mtimes
     
     def _load_json(self, filename: str, directory: Optional[Path] = None) -> Dict:
         """Load JSON configuration file"""
@@ -71,17 +207,30 @@ class PatternLibrary:
         """Get the structure for a specific page type"""
         return self.page_types.get("page_types", {}).get(page_type, {}).get("structure", [])
     
+    def get_word_count(self, page_type: str, length: str) -> int:
+        """Target word count for a page type and length"""
+        word_counts = self.page_types.get("page_types", {}).get(page_type, {}).get("word_count", {})
+        return word_counts.get(length, DEFAULT_WORD_COUNTS.get(length, DEFAULT_WORD_COUNTS["medium"]))
+    
     def get_angle_elements(self, angle: str) -> Dict[str, Any]:
         """Get elements for a specific angle"""
         return self.angles.get("angles", {}).get(angle, {})
     
     def get_relevant_patterns(self, config: PageConfig) -> Dict[str, Any]:
         """Get patterns relevant to the configuration"""
+        key = (config.page_type, config.angle)
+        patterns = self._relevant.get(key)
+        if patterns is None:
+            patterns = self._relevant[key] = self._build_relevant_patterns(*key)
+        # Callers may add keys to the dict they get back; the shared entry stays untouched
+        return dict(patterns)
+    
+    def _build_relevant_patterns(self, page_type: str, angle: str) -> Dict[str, Any]:
         patterns = {
-            "page_structure": self.get_page_structure(config.page_type),
-            "angle_elements": self.get_angle_elements(config.angle),
+            "page_structure": self.get_page_structure(page_type),
+            "angle_elements": self.get_angle_elements(angle),
             "universal_patterns": self.pattern_rules.get("universal_patterns", {}),
-            "page_rules": self.pattern_rules.get("page_specific_rules", {}).get(config.page_type, {}),
+            "page_rules": self.pattern_rules.get("page_specific_rules", {}).get(page_type, {}),
             "effectiveness_multipliers": self.pattern_rules.get("effectiveness_multipliers", {})
         }
         
@@ -93,23 +242,184 @@ class PatternLibrary:
         
         return patterns
 
+_registry: Dict[Tuple[Path, Path], PatternLibrary] = {}
+_registry_checked: Dict[Tuple[Path, Path], float] = {}
+_registry_lock = threading.Lock()
+
+# Seconds between mtime checks of a shared library's source files
+REVALIDATE_INTERVAL = 1.0
+
+def get_pattern_library(config_dir: str = "config", analysis_dir: str = "../output") -> PatternLibrary:
+    """Return the process-wide PatternLibrary for a config directory.
+
+    The library is loaded once and shared by every caller. It is reloaded only
+    when one of its source files changes, checked at most once per
+    REVALIDATE_INTERVAL.
+    """
+    key = (Path(config_dir).resolve(), Path(analysis_dir).resolve())
+    with _registry_lock:
+        library = _registry.get(key)
+        now = time.monotonic()
+        if library is not None and now - _registry_checked[key] < REVALIDATE_INTERVAL:
+            return library
+        _registry_checked[key] = now
+        if library is None or library.is_stale():
+            if library is not None:
+                logger.info(f"Pattern library changed on disk, reloading {config_dir}")
+            library = _registry[key] = PatternLibrary(config_dir, analysis_dir)
+        return library
+
+# Fragments of the product prompt that depend only on a few config fields.
+# They are cached because planning tools build prompts for many permutations.
+
+PRODUCT_PROMPT_TAIL = """ and highly compelling.
+
+Format the output with clear section headers using ### for each major section."""
+
+@lru_cache(maxsize=1024)
+def _context_fragment(angle: str, length: str, voice_tone: str) -> str:
+    return f"""
+- Angle: {angle}
+- Length: {length}
+- Voice/Tone: {voice_tone}
+
+KEY BENEFITS TO EMPHASIZE:
+"""
+
+@lru_cache(maxsize=1024)
+def _requirements_fragment(urgency_level: str, voice_tone: str, length: str, guarantee_type: str) -> str:
+    return f"""SPECIFIC REQUIREMENTS:
+- Urgency Level: {urgency_level} (include {urgency_range(urgency_level)} urgency elements)
+- Include specific numbers and timeframes
+- Write in {voice_tone} tone
+- Length: {length} ({"1500-2000" if length == "short" else "3000-4000" if length == "medium" else "5000+"} words)
+- Include {guarantee_type.replace("_", " ")} guarantee
+
+Now create the complete landing page following the structure and patterns provided. Make it specific to """
+
+@lru_cache(maxsize=4096)
+def _bullet_list(items: Tuple[str, ...]) -> str:
+    return chr(10).join([f'- {item}' for item in items])
+
+@lru_cache(maxsize=4096)
+def _audience_json_cached(items: Tuple[Tuple[str, type, Any], ...]) -> str:
+    return json.dumps({key: value for key, _, value in items})
+
+def _audience_json(target_audience: Dict[str, Any]) -> str:
+    try:
+        # The value type is part of the key so that e.g. 1 and True are not conflated
+        return _audience_json_cached(tuple((key, type(value), value) for key, value in target_audience.items()))
+    except TypeError:
+        # Unhashable (nested) values
+        return json.dumps(target_audience)
+
 class PromptEngine:
     """Builds prompts for Claude API based on patterns and configuration"""
     
-    def __init__(self, patterns: PatternLibrary):
+    # Pattern blocks kept per engine; a library reload produces new keys, so old ones age out
+    PATTERN_BLOCK_CACHE_SIZE = 256
+    
+    def __init__(self, patterns: PatternLibrary, memoize: bool = True):
         self.patterns = patterns
+        self.memoize = memoize
+        self._pattern_blocks: Dict[Tuple, Tuple[List[Any], str]] = {}
     
     def build_master_prompt(self, config: PageConfig, relevant_patterns: Dict[str, Any]) -> str:
-        """Build the master prompt for page generation"""
+        """Build the master prompt for page generation as a single string"""
+        pattern_block, product_prompt = self.build_prompt_parts(config, relevant_patterns)
+        return f"{pattern_block}\n\n{product_prompt}"
+    
+    def build_prompt_parts(self, config: PageConfig, relevant_patterns: Dict[str, Any]) -> Tuple[str, str]:
+        """Build the master prompt as (pattern block, product prompt).
+
+        The pattern block depends only on the page type and angle, so it can be
+        sent as a cached system prefix shared by every page in a batch with the
+        same (page_type, angle); the product prompt carries everything else.
+        """
+        return (
+            self.build_pattern_block(config.page_type, relevant_patterns),
+            self.build_product_prompt(config)
+        )
+    
+    def build_pattern_block(self, page_type: str, relevant_patterns: Dict[str, Any]) -> str:
+        """Build the static instructions and patterns for a (page_type, angle) pair"""
+        if not self.memoize:
+            return self._render_pattern_block(page_type, relevant_patterns)
+        
+        # get_relevant_patterns hands out the same nested objects for a (page_type, angle)
+        # pair, so their identities make a cheap key. The entry keeps references to them
+        # so the ids cannot be reused by other objects while the entry is cached.
+        key = (page_type, tuple((name, id(value)) for name, value in relevant_patterns.items()))
+        entry = self._pattern_blocks.get(key)
+        if entry is None:
+            if len(self._pattern_blocks) >= self.PATTERN_BLOCK_CACHE_SIZE:
+                self._pattern_blocks.clear()
+            entry = (list(relevant_patterns.values()), self._render_pattern_block(page_type, relevant_patterns))
+            self._pattern_blocks[key] = entry
+        return entry[1]
+    
+    def _render_pattern_block(self, page_type: str, relevant_patterns: Dict[str, Any]) -> str:
+        angle_elements = relevant_patterns['angle_elements']
+        universal = relevant_patterns['universal_patterns']
         
-        prompt = f"""You are an expert copywriter creating a {config.page_type} landing page.
+        return f"""You are an expert copywriter creating a {page_type} landing page.
 
 You have access to proven patterns from analyzing high-converting pages:
 - Page structure elements to include
 - Psychological triggers that convert
 - Specific formulas and templates that work
 
-CONTEXT:
+PROVEN PATTERNS TO USE:
+
+1. Page Structure (include all these sections, in this order, each under this exact ### heading):
+{chr(10).join([f'- {section_heading(section)}' for section in relevant_patterns['page_structure']])}
+
+2. Angle Elements:
+- Emotional Arc: {angle_elements.get('emotional_arc', [])}
+- Key Elements: {angle_elements.get('key_elements', [])}
+
+3. Universal Patterns:
+- Use 2-3 psychological triggers from: {universal.get('psychological_triggers', {}).get('mandatory', [])}
+- Follow trust sequence: {universal.get('trust_sequence', [])}
+- Apply value stacking formula with 10-15x value
+
+4. Effectiveness Multipliers to Include:
+{chr(10).join([f'- {mult}' for mult in relevant_patterns['effectiveness_multipliers'].get('high_impact', [])])}
+
+PATTERN REFERENCE:
+{self._format_reference(relevant_patterns)}
+
+EXAMPLES OF HIGH-CONVERTING ELEMENTS:
+{self._format_examples(relevant_patterns)}"""
+    
+    def build_product_prompt(self, config: PageConfig) -> str:
+        """Build the per-product part of the master prompt.
+
+        Assembled from memoized fragments; produces exactly the same text as
+        the plain template in `_render_product_prompt`.
+        """
+        if not self.memoize:
+            return self._render_product_prompt(config)
+        
+        return "".join((
+            "CONTEXT:\n- Product: ", config.product_name, " (", str(config.product_type),
+            ")\n- Price: $", str(config.price_point),
+            "\n- Industry: ", str(config.industry),
+            "\n- Target Audience: ", _audience_json(config.target_audience),
+            _context_fragment(config.angle, config.length, config.voice_tone),
+            _bullet_list(tuple(map(str, config.specific_benefits))),
+            "\n\nPAIN POINTS TO ADDRESS:\n",
+            _bullet_list(tuple(map(str, config.pain_points))),
+            "\n\n",
+            "UNIQUE MECHANISM: " + config.unique_mechanism if config.unique_mechanism else "",
+            "\n\n",
+            _requirements_fragment(config.urgency_level, config.voice_tone, config.length, config.guarantee_type),
+            config.product_name,
+            PRODUCT_PROMPT_TAIL
+        ))
+    
+    def _render_product_prompt(self, config: PageConfig) -> str:
+        return f"""CONTEXT:
 - Product: {config.product_name} ({config.product_type})
 - Price: ${config.price_point}
 - Industry: {config.industry}
@@ -126,38 +436,48 @@ PAIN POINTS TO ADDRESS:
 
 {"UNIQUE MECHANISM: " + config.unique_mechanism if config.unique_mechanism else ""}
 
-PROVEN PATTERNS TO USE:
-
-1. Page Structure (include all these sections):
-{chr(10).join([f'- {section}' for section in relevant_patterns['page_structure']])}
-
-2. Angle Elements:
-- Emotional Arc: {relevant_patterns['angle_elements'].get('emotional_arc', [])}
-- Key Elements: {relevant_patterns['angle_elements'].get('key_elements', [])}
-
-3. Universal Patterns:
-- Use 2-3 psychological triggers from: {relevant_patterns['universal_patterns'].get('psychological_triggers', {}).get('mandatory', [])}
-- Follow trust sequence: {relevant_patterns['universal_patterns'].get('trust_sequence', [])}
-- Apply value stacking formula with 10-15x value
-
-4. Effectiveness Multipliers to Include:
-{chr(10).join([f'- {mult}' for mult in relevant_patterns['effectiveness_multipliers'].get('high_impact', [])])}
-
 SPECIFIC REQUIREMENTS:
-- Urgency Level: {config.urgency_level} (include {"2-3" if config.urgency_level == "high" else "1-2"} urgency elements)
+- Urgency Level: {config.urgency_level} (include {urgency_range(config.urgency_level)} urgency elements)
 - Include specific numbers and timeframes
 - Write in {config.voice_tone} tone
 - Length: {config.length} ({"1500-2000" if config.length == "short" else "3000-4000" if config.length == "medium" else "5000+"} words)
 - Include {config.guarantee_type.replace("_", " ")} guarantee
 
-EXAMPLES OF HIGH-CONVERTING ELEMENTS:
-{self._format_examples(relevant_patterns)}
-
 Now create the complete landing page following the structure and patterns provided. Make it specific to {config.product_name} and highly compelling.
 
 Format the output with clear section headers using ### for each major section."""
-
-        return prompt
+    
+    def _format_reference(self, patterns: Dict[str, Any]) -> str:
+        """Format the page rules, formulas and templates that back the patterns above"""
+        lines = []
+        universal = patterns['universal_patterns']
+        
+        if patterns.get("page_rules"):
+            lines.append("Rules for this page type:")
+            lines.extend(f"- {key.replace('_', ' ')}: {value}" for key, value in patterns["page_rules"].items())
+        
+        if universal.get("headline_formulas"):
+            lines.append("\nHeadline formulas:")
+            for name, formula in universal["headline_formulas"].items():
+                lines.append(f"- {name.replace('_', ' ')}: {formula.get('template', '')}")
+                lines.extend(f'  e.g. "{example}"' for example in formula.get("examples", []))
+        
+        if patterns['angle_elements'].get("example_headlines"):
+            lines.append("\nHeadline templates for this angle:")
+            lines.extend(f"- {headline}" for headline in patterns['angle_elements']["example_headlines"])
+        
+        if universal.get("emotional_journey_map"):
+            lines.append("\nEmotional journey map:")
+            lines.extend(f"- {stage}: {' -> '.join(steps)}" for stage, steps in universal["emotional_journey_map"].items())
+        
+        value_stack = universal.get("value_stacking_formula", {})
+        if value_stack:
+            lines.append("\nValue stack:")
+            lines.append(f"- Components: {', '.join(value_stack.get('structure', []))}")
+            lines.append(f"- Rule: {value_stack.get('multiplier_rule', '')}")
+            lines.append(f"- Presentation: {value_stack.get('presentation', '')}")
+        
+        return "\n".join(lines) if lines else "Use the patterns listed above."
     
     def _format_examples(self, patterns: Dict[str, Any]) -> str:
         """Format examples from pattern library"""
@@ -175,6 +495,43 @@ Format the output with clear section headers using ### for each major section.""
         
         return "\n".join(examples) if examples else "Use proven formulas from the patterns provided."
     
+    def build_outline_prompt(self, product_prompt: str, structure: List[str]) -> str:
+        """Build the prompt for the shared outline of a page drafted section by section"""
+        return f"""{product_prompt}
+
+Do not write the page yet. First write its outline, with one heading per section, exactly as written and in this order:
+{chr(10).join(f'- {section_heading(section)}' for section in structure)}
+
+Under each heading give 2-4 bullets: the points the section makes, the specific names, numbers and claims it uses, and how it leads into the next section. The sections will be written separately from this outline, so keep every name, figure and story detail consistent."""
+    
+    def build_section_prompt(self, product_prompt: str, outline: str, structure: List[str],
+                             section: str, words: int) -> str:
+        """Build the prompt for writing one section of a page from its outline"""
+        position = structure.index(section) + 1
+        return f"""{product_prompt}
+
+The page is being written one section at a time from this shared outline:
+
+{outline}
+
+Instead of the complete page, write only section {position} of {len(structure)}, "{section.replace('_', ' ')}", in about {words} words. Follow the outline so the section joins seamlessly with the ones before and after it. Start with the heading "{section_heading(section)}" and do not write any other section."""
+    
+    def build_section_refinement_prompt(self, config: PageConfig, section: str, body: str,
+                                        fixes: List[str], sections: List[str]) -> str:
+        """Build the prompt for refining one section of a draft against the checklist items it fails"""
+        return f"""Review and enhance one section of a {config.page_type.replace('_', ' ')} for {config.product_name} (${config.price_point}) for maximum conversion.
+
+The page's sections, in order: {', '.join(sections)}
+
+SECTION "{section.replace('_', ' ')}":
+
+{body}
+
+FIXES NEEDED:
+{chr(10).join(f'- {fix}' for fix in fixes)}
+
+Enhance the section while keeping its role in the page, its {config.voice_tone} voice and roughly its length. Return only the rewritten section body, without its heading."""
+    
     def build_refinement_prompt(self, initial_copy: str, config: PageConfig) -> str:
         """Build prompt for refining the generated copy"""
         
@@ -192,19 +549,74 @@ ENHANCEMENT CHECKLIST:
 7. Make guarantee more compelling and risk-free
 8. Ensure social proof is specific and believable
 
-Enhance the copy while maintaining the same structure and voice. Make it impossible to resist."""
+Enhance the copy while maintaining the same structure, ### headings and voice. Make it impossible to resist."""
+
+class MissingAPIKeyError(ValueError):
+    """No API key was given and ANTHROPIC_API_KEY is not set"""
 
 class LandingPageGenerator:
     """Main generator class that orchestrates the page creation"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, rate_limiter: Optional[RateLimiter] = None,
+                 cache: Optional[ResponseCache] = None, config_dir: str = "config",
+                 store: Optional[OutputStore] = None, catalog: Optional[PageCatalog] = None,
+                 metrics: Optional[MetricsSink] = None,
+                 quality_threshold: Optional[float] = DEFAULT_QUALITY_THRESHOLD,
+                 section_concurrency: int = 4, targeted_refinement: bool = True,
+                 client: Optional[Any] = None, router: Optional[Router] = None,
+                 retry_policy: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None,
+                 hedge_after: Optional[float] = None, hedge_quantile: Optional[float] = None,
+                 model_profile: str = DEFAULT_PROFILE):
         self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
-        if not self.api_key:
-            raise ValueError("Anthropic API key required. Set ANTHROPIC_API_KEY environment variable.")
+        if client is None and router is None and not self.api_key:
+            raise MissingAPIKeyError("Anthropic API key required. Set ANTHROPIC_API_KEY environment variable.")
         
-        self.client = anthropic.Anthropic(api_key=self.api_key)
-        self.patterns = PatternLibrary()
+        # A pooled client keeps its connections alive across generators for the same key
+        if client is None:
+            client = get_client_pool().get(self.api_key) if self.api_key else router.routes[0].client
+        self.client = client
+        # Retries happen in _stream_claude, which honors retry-after and feeds the circuit breaker
+        self._api_client = client.with_options(max_retries=0)
+        self.config_dir = config_dir
         self.prompt_engine = PromptEngine(self.patterns)
+        self.rate_limiter = rate_limiter
+        # Spreads calls over several keys and models; without one, every call uses self.client
+        self.router = router
+        self.cache = cache
+        self.store = store if store is not None else get_output_store()
+        self.catalog = catalog if catalog is not None else get_catalog()
+        self.metrics = metrics
+        # Drafts scoring at least this skip refinement; None always refines
+        self.quality_threshold = quality_threshold
+        # Sections written at once when drafting long pages section by section; 0 disables it
+        self.section_concurrency = section_concurrency
+        # Refine only the sections that fail the quality checklist, when the page allows it
+        self.targeted_refinement = targeted_refinement
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        # Stops calls to an endpoint that keeps failing with overload errors, so a batch backs off together
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        # Collected calls still running after hedge_after seconds (or the hedge_quantile of recent
+        # calls of the same size) are raced against a duplicate request
+        self.hedge_after = hedge_after
+        self.hedge_quantile = hedge_quantile
+        self._call_latency: Dict[Tuple[str, int], LatencyTracker] = {}
+        # Model, max_tokens and temperature per stage, for pages that do not name a profile
+        self.model_profile = model_profile
+        self.model_profiles.resolve(model_profile, "initial")
+    
+    @property
+    def patterns(self) -> PatternLibrary:
+        """The shared pattern library, reloaded when its files change"""
+        return get_pattern_library(self.config_dir)
+    
+    @property
+    def model_profiles(self) -> ModelProfiles:
+        """The built-in model profiles plus any in config/model_profiles.json"""
+        return get_model_profiles(self.config_dir)
+    
+    def stage_model(self, config: PageConfig, stage: str) -> StageModel:
+        """Model, max_tokens and temperature for one stage of a page"""
+        return self.model_profiles.resolve(config.model_profile or self.model_profile, stage, config)
     
     def generate_page(self, config: PageConfig) -> Dict[str, Any]:
         """Generate a complete landing page"""
@@ -213,93 +625,586 @@ class LandingPageGenerator:
         # Get relevant patterns
         relevant_patterns = self.patterns.get_relevant_patterns(config)
         
-        # Build initial prompt
-        initial_prompt = self.prompt_engine.build_master_prompt(config, relevant_patterns)
-        
         # Generate initial copy
         logger.info("Generating initial copy...")
-        initial_copy = self._call_claude(initial_prompt, max_tokens=8000)
+        initial = self.draft_page(config, relevant_patterns)
+        usage = {"initial": initial.usage}
+        stages = {"initial": initial.stage_metrics()}
+        final_copy, final_quality = initial.text, None
         
-        # Refine for maximum conversion
-        logger.info("Refining for conversion...")
+        # Refine for maximum conversion, unless the draft already passes the checklist
+        draft_quality = self.assess_copy(config, relevant_patterns, initial.text)
+        if draft_quality.passed:
+            logger.info(f"Draft scored {draft_quality.score:.2f}; skipping refinement")
+        else:
+            logger.info(f"Draft scored {draft_quality.score:.2f}; refining for conversion...")
+            final = self.refine(config, initial.text, draft_quality)
+            usage["refinement"], stages["refinement"] = final.usage, final.stage_metrics()
+            final_copy = final.text
+            final_quality = self.assess_copy(config, relevant_patterns, final.text)
+        
+        # Structure and save the output
+        return self.finish_page(config, relevant_patterns, final_copy, usage, stages=stages,
+                                quality=quality_summary(draft_quality, final_quality))
+    
+    def assess_copy(self, config: PageConfig, relevant_patterns: Dict[str, Any], text: str,
+                    sections: Optional[Sections] = None) -> QualityReport:
+        """Score copy against the refinement checklist"""
+        return score_copy(text, config, relevant_patterns.get("page_structure", []), self.quality_threshold, sections)
+    
+    def draft_page(self, config: PageConfig, relevant_patterns: Dict[str, Any]) -> Completion:
+        """Generate the initial copy (first stage)"""
+        if self.drafts_by_section(config, relevant_patterns):
+            return self._drain(self._stream_sectioned_draft("initial", config, relevant_patterns))
+        started = time.perf_counter()
+        # A cacheable pattern block plus the per-product part
+        pattern_block, product_prompt = self.prompt_engine.build_prompt_parts(config, relevant_patterns)
+        prompt_seconds = time.perf_counter() - started
+        completion = self._complete(product_prompt, self.stage_model(config, "initial"), system=pattern_block)
+        completion.prompt_seconds = prompt_seconds
+        return completion
+    
+    def drafts_by_section(self, config: PageConfig, relevant_patterns: Dict[str, Any]) -> bool:
+        """Whether the draft is written as an outline plus concurrent sections"""
+        return (self.section_concurrency > 0 and config.length == "long"
+                and config.page_type in SECTIONED_PAGE_TYPES and bool(relevant_patterns.get("page_structure")))
+    
+    def refine(self, config: PageConfig, initial_copy: str, draft_quality: QualityReport,
+               sections: Optional[Sections] = None) -> Completion:
+        """Refine a draft (second stage): only its failing sections when possible, else the whole page"""
+        sections = sections if sections is not None else self._extract_sections(initial_copy)
+        fixes = self.section_fixes(config, initial_copy, draft_quality, sections)
+        if fixes:
+            return self._drain(self._stream_section_refinement("refinement", config, initial_copy, sections, fixes))
+        return self.refine_page(config, initial_copy)
+    
+    def section_fixes(self, config: PageConfig, text: str, report: QualityReport,
+                      sections: Sections) -> Optional[Dict[str, List[str]]]:
+        """The checklist fixes per failing section, or None to refine the whole page"""
+        if not self.targeted_refinement:
+            return None
+        return section_issues(text, sections, config, report) or None
+    
+    def refine_page(self, config: PageConfig, initial_copy: str) -> Completion:
+        """Refine the whole initial copy for conversion"""
+        started = time.perf_counter()
         refinement_prompt = self.prompt_engine.build_refinement_prompt(initial_copy, config)
-        final_copy = self._call_claude(refinement_prompt, max_tokens=8000)
+        prompt_seconds = time.perf_counter() - started
+        completion = self._complete(refinement_prompt, self.stage_model(config, "refinement"))
+        completion.prompt_seconds = prompt_seconds
+        return completion
+    
+    def finish_page(self, config: PageConfig, relevant_patterns: Dict[str, Any], final_copy: str,
+                    usage: Optional[Dict[str, Dict[str, int]]] = None,
+                    sections: Optional[Sections] = None,
+                    stages: Optional[Dict[str, Dict[str, Any]]] = None,
+                    quality: Optional[Dict[str, Any]] = None,
+                    page_id: Optional[str] = None) -> Dict[str, Any]:
+        """Build the result for the final copy and save it.
+
+        `stages` holds each stage's `Completion.stage_metrics()`; they are stored
+        in `result["metrics"]` along with the time spent saving, and sent to the
+        metrics sink. `result["models"]` records the model that ran each stage
+        (or part of one). `quality` is the `quality_summary` of the copy.
+        Saving under an existing `page_id` replaces that page.
+        """
+        result = self._build_result(config, relevant_patterns, final_copy, usage, sections)
+        if quality is not None:
+            result["quality"] = quality
+        stages = dict(stages or {})
+        result["model_profile"] = config.model_profile or self.model_profile
+        result["models"] = {part: data["model"] for stage, stage_data in stages.items()
+                            for part, data in (stage_data.get("parts") or {stage: stage_data}).items()
+                            if data.get("model")}
+        result["metrics"] = page_metrics(stages)
+        
+        started = time.perf_counter()
+        result["location"] = self._save_output(result, config, page_id)
+        stages["save"] = {"write_seconds": round(time.perf_counter() - started, 4)}
+        result["metrics"] = page_metrics(stages)
+        
+        self.emit_metric({
+            "event": "page",
+            "status": "success",
+            "page_id": result["location"]["id"],
+            "product": config.product_name,
+            "page_type": config.page_type,
+            **result["metrics"]
+        })
+        return result
+    
+    def emit_metric(self, event: Dict[str, Any]):
+        """Send an event to the metrics sink, if one is configured"""
+        if self.metrics:
+            try:
+                self.metrics.record(event)
+            except Exception as e:
+                logger.warning(f"Metrics sink failed: {e}")
+    
+    def stream_page(self, config: PageConfig) -> Iterator[StreamEvent]:
+        """Generate a landing page, yielding text chunks as they arrive.
+
+        Yields `stage_start`, `text`, `section` and `stage_end` events for the
+        "initial" and "refinement" stages, then a final `done` event carrying the
+        same result dict `generate_page` returns. A `section` event is sent as
+        soon as the next heading (or the end of the stage) closes that section.
+        A `quality` event carries the draft's score; refinement is skipped (no
+        "refinement" events) when the draft passes.
+        """
+        logger.info(f"Streaming {config.page_type} for {config.product_name}")
+        relevant_patterns = self.patterns.get_relevant_patterns(config)
+        
+        if self.drafts_by_section(config, relevant_patterns):
+            initial, sections = yield from self._relay_stage(
+                "initial", self._stream_sectioned_draft("initial", config, relevant_patterns))
+        else:
+            started = time.perf_counter()
+            pattern_block, product_prompt = self.prompt_engine.build_prompt_parts(config, relevant_patterns)
+            prompt_seconds = time.perf_counter() - started
+            initial, sections = yield from self._stream_stage("initial", product_prompt,
+                                                              self.stage_model(config, "initial"), system=pattern_block)
+            initial.prompt_seconds = prompt_seconds
+        usage = {"initial": initial.usage}
+        stages = {"initial": initial.stage_metrics()}
+        final_copy, final_quality = initial.text, None
+        
+        draft_quality = self.assess_copy(config, relevant_patterns, initial.text, sections)
+        yield StreamEvent("quality", "initial", result=draft_quality.to_dict())
+        if not draft_quality.passed:
+            fixes = self.section_fixes(config, initial.text, draft_quality, sections)
+            if fixes:
+                final, sections = yield from self._relay_stage(
+                    "refinement", self._stream_section_refinement("refinement", config, initial.text, sections, fixes))
+            else:
+                started = time.perf_counter()
+                refinement_prompt = self.prompt_engine.build_refinement_prompt(initial.text, config)
+                prompt_seconds = time.perf_counter() - started
+                final, sections = yield from self._stream_stage("refinement", refinement_prompt,
+                                                                self.stage_model(config, "refinement"))
+                final.prompt_seconds = prompt_seconds
+            usage["refinement"], stages["refinement"] = final.usage, final.stage_metrics()
+            final_copy = final.text
+            final_quality = self.assess_copy(config, relevant_patterns, final.text, sections)
         
-        # Structure the output
+        result = self.finish_page(config, relevant_patterns, final_copy, usage, sections, stages=stages,
+                                  quality=quality_summary(draft_quality, final_quality))
+        yield StreamEvent("done", result=result)
+    
+    def _stream_stage(self, stage: str, prompt: str, stage_model: StageModel,
+                      system: Optional[str] = None) -> Generator[StreamEvent, None, Tuple[Completion, Sections]]:
+        """Stream one generation stage as events and return its completion and sections"""
+        return (yield from self._relay_stage(stage, self._stream_claude(stage, prompt, stage_model, system=system)))
+    
+    def _relay_stage(self, stage: str, stream: Generator[StreamEvent, None, Completion]
+                     ) -> Generator[StreamEvent, None, Tuple[Completion, Sections]]:
+        """Pass a stage's text events on, adding section events, and return its completion and sections"""
+        yield StreamEvent("stage_start", stage)
+        index = SectionIndex()
+        while True:
+            try:
+                event = next(stream)
+            except StopIteration as stop:
+                completion = stop.value
+                break
+            yield event
+            for name, text in index.feed(event.text):
+                yield StreamEvent("section", stage, text, section=name)
+        for name, text in index.close():
+            yield StreamEvent("section", stage, text, section=name)
+        yield StreamEvent("stage_end", stage, completion.text)
+        return completion, index.sections(completion.text)
+    
+    def _build_result(self, config: PageConfig, relevant_patterns: Dict[str, Any], final_copy: str,
+                      usage: Optional[Dict[str, Dict[str, int]]] = None,
+                      sections: Optional[Sections] = None) -> Dict[str, Any]:
+        """Structure the generated copy into the result dict"""
         result = {
             "config": config.__dict__,
             "generated_at": datetime.now().isoformat(),
             "page_content": final_copy,
             "patterns_used": relevant_patterns,
             "word_count": len(final_copy.split()),
-            "sections": self._extract_sections(final_copy)
+            "sections": sections if sections is not None else self._extract_sections(final_copy)
         }
-        
-        # Save output
-        self._save_output(result, config)
-        
+        if usage:
+            total = {field: sum(stage.get(field, 0) for stage in usage.values()) for field in USAGE_FIELDS}
+            result["usage"] = {**usage, "total": total}
         return result
     
+    def _build_request(self, prompt: str, stage_model: StageModel, system: Optional[str] = None) -> Dict[str, Any]:
+        request = {
+            "model": stage_model.model,
+            "max_tokens": stage_model.max_tokens,
+            "temperature": stage_model.temperature,
+            "messages": [{
+                "role": "user",
+                "content": prompt
+            }]
+        }
+        if system:
+            # Mark the shared prefix for prompt caching; later pages with the same
+            # page type and angle read it from the cache instead of paying full price
+            request["system"] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+        return request
+    
+    def _cache_lookup(self, request: Dict[str, Any]) -> Tuple[Optional[str], Optional[Completion]]:
+        """Return the cache key for a request and the cached completion, if any"""
+        if not self.cache:
+            return None, None
+        cache_key = self.cache.make_key(request)
+        cached = self.cache.get(cache_key)
+        if not cached:
+            return cache_key, None
+        logger.info("Using cached response")
+        # A cached response costs no tokens
+        return cache_key, Completion(cached["text"], {field: 0 for field in USAGE_FIELDS}, from_cache=True,
+                                     model=cached.get("model", request["model"]))
+    
+    def _cache_store(self, cache_key: Optional[str], completion: Completion, model: str):
+        if cache_key:
+            self.cache.put(cache_key, {
+                "text": completion.text,
+                "model": model,
+                "usage": completion.usage,
+                "cached_at": datetime.now().isoformat()
+            })
+    
+    def _throttle(self) -> float:
+        """Wait for the rate limiter; returns the seconds waited"""
+        if not self.rate_limiter:
+            return 0.0
+        waited = self.rate_limiter.acquire()
+        if waited:
+            logger.debug(f"Rate limiter delayed request by {waited:.1f}s")
+        return waited
+    
     def _call_claude(self, prompt: str, max_tokens: int = 4000) -> str:
         """Call Claude API"""
-        try:
-            response = self.client.messages.create(
-                model="claude-opus-4-20250514",  # Claude Opus 4 - most capable model
-                max_tokens=max_tokens,
-                temperature=0.7,
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }]
-            )
-            return response.content[0].text
-        except Exception as e:
-            logger.error(f"Claude API error: {e}")
-            raise
+        return self._complete(prompt, StageModel(DEFAULT_MODEL, max_tokens)).text
     
-    def _extract_sections(self, content: str) -> Dict[str, str]:
-        """Extract sections from generated content"""
-        sections = {}
-        current_section = "intro"
-        current_content = []
-        
-        for line in content.split('\n'):
-            if line.startswith('###'):
-                if current_content:
-                    sections[current_section] = '\n'.join(current_content).strip()
-                current_section = line.replace('#', '').strip().lower().replace(' ', '_')
-                current_content = []
-            else:
-                current_content.append(line)
+    def _complete(self, prompt: str, stage_model: StageModel, system: Optional[str] = None) -> Completion:
+        """Call Claude API, serving identical requests from the response cache when enabled.
+
+        Uses the streaming endpoint and collects the whole response, which costs
+        the same and lets the completion record its time to first token. With
+        hedging on, a call still running past the hedge threshold is raced
+        against a duplicate request and the first to finish wins.
+        """
+        threshold = self.hedge_threshold(stage_model)
+        if threshold is None:
+            return self._drain(self._stream_claude("call", prompt, stage_model, system, restartable=True))
+        return self._hedged_complete(threshold, prompt, stage_model, system)
+    
+    def hedge_threshold(self, stage_model: StageModel) -> Optional[float]:
+        """Seconds after which a call gets a duplicate, or None to never hedge"""
+        if self.hedge_after is not None:
+            return self.hedge_after
+        if self.hedge_quantile is None:
+            return None
+        return self._latency_tracker(stage_model).threshold()
+    
+    def _latency_tracker(self, stage_model: StageModel) -> LatencyTracker:
+        """Recent call latencies for one model and size of call"""
+        key = (stage_model.model, stage_model.max_tokens)
+        return self._call_latency.setdefault(key, LatencyTracker(self.hedge_quantile))
+    
+    def _hedged_complete(self, threshold: float, prompt: str, stage_model: StageModel,
+                         system: Optional[str]) -> Completion:
+        """Send a call, and a duplicate if it has not finished after `threshold` seconds; the first to finish wins"""
+        cancels = [threading.Event(), threading.Event()]
         
-        if current_content:
-            sections[current_section] = '\n'.join(current_content).strip()
+        def call(i: int) -> Optional[Completion]:
+            stream = self._stream_claude("call", prompt, stage_model, system, restartable=True)
+            return self._drain(stream, cancels[i])
         
-        return sections
+        started = time.perf_counter()
+        pool = ThreadPoolExecutor(max_workers=2)
+        try:
+            futures = [pool.submit(call, 0)]
+            if not wait(futures, timeout=threshold).done:
+                logger.info(f"Call still running after {threshold:.1f}s; hedging with a duplicate request")
+                futures.append(pool.submit(call, 1))
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for i, future in enumerate(futures):
+                    if future not in done or future.exception() is not None:
+                        continue
+                    # The loser stops at its next streamed chunk and closes its connection
+                    cancels[1 - i].set()
+                    completion = future.result()
+                    if len(futures) > 1:
+                        completion.hedges = 1
+                        completion.seconds = max(completion.seconds,
+                                                 time.perf_counter() - started - completion.wait_seconds)
+                        self.emit_metric({"event": "hedge", "winner": "hedge" if i else "primary"})
+                    return completion
+            if len(futures) > 1:
+                self.emit_metric({"event": "hedge", "winner": "none"})
+            return futures[0].result()
+        finally:
+            pool.shutdown(wait=False)
+    
+    @staticmethod
+    def _drain(stream: Generator[StreamEvent, None, Completion],
+               cancelled: Optional[threading.Event] = None) -> Optional[Completion]:
+        """Run a streaming call to completion, discarding its events; None if `cancelled` is set first"""
+        while True:
+            if cancelled is not None and cancelled.is_set():
+                stream.close()
+                return None
+            try:
+                next(stream)
+            except StopIteration as stop:
+                return stop.value
     
-    def _save_output(self, result: Dict[str, Any], config: PageConfig):
-        """Save generated page to file"""
-        output_dir = Path("generated_pages")
-        output_dir.mkdir(exist_ok=True)
+    def _stream_sectioned_draft(self, stage: str, config: PageConfig, relevant_patterns: Dict[str, Any]
+                                ) -> Generator[StreamEvent, None, Completion]:
+        """Draft a long page as a shared outline, then all its sections concurrently.
+
+        Sections are written `section_concurrency` at a time and stitched in
+        page order; text events carry each section as soon as every section
+        before it is done, so latency approaches outline + slowest section
+        rather than one long call. Each section's call retries transient
+        failures on its own (see RetryPolicy) without redoing the others.
+        """
+        started = time.perf_counter()
+        pattern_block, product_prompt = self.prompt_engine.build_prompt_parts(config, relevant_patterns)
+        structure = relevant_patterns["page_structure"]
+        outline_prompt = self.prompt_engine.build_outline_prompt(product_prompt, structure)
+        prompt_seconds = time.perf_counter() - started
+        outline = self._complete(outline_prompt, self.stage_model(config, "outline"), system=pattern_block)
+        budgets = section_word_budgets(structure, self.patterns.get_word_count(config.page_type, config.length))
+        logger.info(f"Outline ready; writing {len(structure)} sections of ~{max(budgets.values())} words or fewer")
+        section_model = self.stage_model(config, "section")
+        
+        def write(section: str) -> Completion:
+            prompt = self.prompt_engine.build_section_prompt(product_prompt, outline.text, structure, section,
+                                                             budgets[section])
+            return self._complete_section(section, prompt, section_model, system=pattern_block)
         
-        filename = f"{config.product_name.lower().replace(' ', '_')}_{config.page_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        texts: List[str] = []
+        parts: List[Completion] = []
+        ttft = None
+        pool = ThreadPoolExecutor(max_workers=min(self.section_concurrency, len(structure)))
+        try:
+            futures = [pool.submit(write, section) for section in structure]
+            for section, future in zip(structure, futures):
+                part = future.result()
+                text = part.text.strip()
+                # Each part is known to be this element, so it gets the heading the quality check looks for
+                if text.startswith("#"):
+                    text = text.partition("\n")[2].strip()
+                text = f"{section_heading(section)}\n\n{text}"
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                yield StreamEvent("text", stage, ("\n\n" if texts else "") + text)
+                texts.append(text)
+                parts.append(part)
+        finally:
+            # On failure (or an abandoned stream) do not start sections nobody will use
+            pool.shutdown(wait=True, cancel_futures=True)
         
-        # Save full JSON
-        with open(output_dir / f"{filename}.json", 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        return self._combine_calls("\n\n".join(texts), [outline], parts, started, prompt_seconds, ttft,
+                                   serial_part="outline", parallel_part="section")
+    
+    def _stream_section_refinement(self, stage: str, config: PageConfig, text: str, sections: Sections,
+                                   fixes: Dict[str, List[str]]) -> Generator[StreamEvent, None, Completion]:
+        """Rewrite only the sections in `fixes`, concurrently, and splice them back into the page.
+
+        Text events carry the page in order: untouched stretches right away,
+        each rewritten section once it (and everything before it) is done.
+        """
+        started = time.perf_counter()
+        names = list(sections)
+        prompts = {name: self.prompt_engine.build_section_refinement_prompt(config, name, sections[name], issues, names)
+                   for name, issues in fixes.items()}
+        prompt_seconds = time.perf_counter() - started
+        logger.info(f"Refining {len(fixes)} of {len(names)} sections: {', '.join(fixes)}")
         
-        # Save markdown version
-        with open(output_dir / f"{filename}.md", 'w', encoding='utf-8') as f:
-            f.write(f"# {config.product_name} - {config.page_type.replace('_', ' ').title()}\n\n")
-            f.write(f"Generated: {result['generated_at']}\n\n")
-            f.write("---\n\n")
-            f.write(result['page_content'])
+        pieces: List[str] = []
+        parts: List[Completion] = []
+        ttft = None
+        cursor = 0
+        pool = ThreadPoolExecutor(max_workers=max(1, min(self.section_concurrency, len(fixes))))
+        try:
+            refinement_model = self.stage_model(config, "refinement")
+            futures = {name: pool.submit(self._complete_section, name, prompt, refinement_model)
+                       for name, prompt in prompts.items()}
+            for start, end, name in sorted((*sections.span(name), name) for name in fixes):
+                # Keep the heading and the whitespace around the body; replace only the body
+                raw = text[start:end]
+                body = raw.strip()
+                lead = raw[:len(raw) - len(raw.lstrip())]
+                trail = raw[len(lead) + len(body):]
+                if text[cursor:start] + lead:
+                    pieces.append(text[cursor:start] + lead)
+                    yield StreamEvent("text", stage, pieces[-1])
+                part = futures[name].result()
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                rewritten = part.text.strip()
+                if rewritten.startswith(HEADING):
+                    # The section came back with its heading despite the instructions
+                    rewritten = rewritten.partition("\n")[2].strip()
+                pieces.append((rewritten or body) + trail)
+                yield StreamEvent("text", stage, pieces[-1])
+                parts.append(part)
+                cursor = end
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        if text[cursor:]:
+            pieces.append(text[cursor:])
+            yield StreamEvent("text", stage, pieces[-1])
         
-        logger.info(f"Saved to: {output_dir / filename}")
+        return self._combine_calls("".join(pieces), [], parts, started, prompt_seconds, ttft, parallel_part="refinement")
+    
+    def _complete_section(self, section: str, prompt: str, stage_model: StageModel,
+                          system: Optional[str] = None) -> Completion:
+        """One section's call; transient failures were already retried by _stream_claude's RetryPolicy"""
+        try:
+            return self._complete(prompt, stage_model, system=system)
+        except Exception as e:
+            logger.warning(f"Section {section} failed: {e}")
+            raise
+    
+    @staticmethod
+    def _combine_calls(text: str, serial: List[Completion], parallel: List[Completion], started: float,
+                       prompt_seconds: float, ttft: Optional[float], serial_part: str = "serial",
+                       parallel_part: str = "parallel") -> Completion:
+        """One stage's Completion from calls made one after another, then concurrently.
+
+        Its model is the one that wrote the concurrent part; `parts` records the
+        model, tokens and cost of each part, as the two may use different models,
+        and the cost per model, as the calls within a part (e.g. over routes) may too.
+        """
+        calls = serial + parallel
+        parts = {}
+        for name, group in ((serial_part, serial), (parallel_part, parallel)):
+            if group:
+                usage = {field: sum(call.usage.get(field, 0) for call in group) for field in USAGE_FIELDS}
+                by_model: Dict[str, float] = {}
+                for call in group:
+                    for model, cost in call.cost_by_model().items():
+                        by_model[model] = by_model.get(model, 0.0) + cost
+                parts[name] = {"model": group[-1].model, "calls": len(group), **usage,
+                               "cost_usd": round(sum(by_model.values()), 6) if by_model else None,
+                               "cost_by_model": {model: round(cost, 6) for model, cost in by_model.items()}}
+        # Concurrent calls wait on the rate limiter at the same time; count only the longest wait
+        wait_seconds = sum(call.wait_seconds for call in serial) + max((call.wait_seconds for call in parallel), default=0.0)
+        return Completion(
+            text,
+            {field: sum(call.usage.get(field, 0) for call in calls) for field in USAGE_FIELDS},
+            from_cache=all(call.from_cache for call in calls),
+            model=calls[-1].model if calls else DEFAULT_MODEL,
+            seconds=max(0.0, time.perf_counter() - started - prompt_seconds - wait_seconds),
+            ttft=ttft,
+            wait_seconds=wait_seconds,
+            prompt_seconds=prompt_seconds,
+            retries=sum(call.retries for call in calls),
+            hedges=sum(call.hedges for call in calls),
+            parts=parts
+        )
+    
+    def _stream_claude(self, stage: str, prompt: str, stage_model: StageModel, system: Optional[str] = None,
+                       restartable: bool = False) -> Generator[StreamEvent, None, Completion]:
+        """Call Claude's streaming endpoint, yielding text events as deltas arrive.
+
+        Transient failures (429, 529, 5xx, dropped connections) are retried
+        with jittered exponential backoff that honors retry-after. A call that
+        fails after streaming text is retried only if `restartable`, i.e. the
+        caller collects the text instead of showing it as it arrives.
+        """
+        request = self._build_request(prompt, stage_model, system)
+        cache_key, cached = self._cache_lookup(request)
+        if cached:
+            yield StreamEvent("text", stage, cached.text)
+            return cached
+
+        waited = self._throttle()
+        estimate = estimate_tokens(request) if self.router else 0
+        retries = 0
+        while True:
+            breaker_wait, probe = self.breaker.wait()
+            waited += breaker_wait
+            client, route, attempt = self._api_client, None, request
+            if self.router:
+                route, route_wait = self.router.acquire(estimate)
+                waited += route_wait
+                # A route pinned to a model overrides the stage's, for this attempt only
+                client, attempt = route.client, {**request, "model": route.model or request["model"]}
+            started = time.perf_counter()
+            ttft = None
+            try:
+                with client.messages.stream(**attempt) as stream:
+                    for text in stream.text_stream:
+                        if ttft is None:
+                            ttft = time.perf_counter() - started
+                        yield StreamEvent("text", stage, text)
+                    message = stream.get_final_message()
+                    headers = stream.response.headers
+            except GeneratorExit:
+                # The caller stopped reading (e.g. a hedged call that lost the race)
+                if route is not None:
+                    self.router.release(route)
+                # A cancelled call says nothing about the endpoint; only free the probe slot if it held it
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            except Exception as e:
+                reason = failure_reason(e)
+                response = getattr(e, "response", None)
+                headers = response.headers if response is not None else None
+                if route is not None and reason == RATE_LIMITED:
+                    self.router.rate_limited(route, headers)
+                elif route is not None:
+                    self.router.release(route, headers)
+                if self.breaker.record_failure(reason, probe):
+                    self.emit_metric({"event": "circuit", "state": CircuitBreaker.OPEN, "stage": stage})
+                self.emit_metric({"event": "api_error", "error": type(e).__name__, "stage": stage})
+                if reason is None or retries >= self.retry_policy.max_retries or (ttft is not None and not restartable):
+                    logger.error(f"Claude API error: {e}")
+                    raise
+                retries += 1
+                # A rate-limited route cools down in the router, so the retry can go to another route at once
+                if route is not None and reason == RATE_LIMITED:
+                    delay = 0.0
+                else:
+                    delay = self.retry_policy.delay(retries, retry_after_seconds(headers))
+                logger.warning(f"Claude API {reason} error ({type(e).__name__}); "
+                               f"retry {retries}/{self.retry_policy.max_retries} in {delay:.1f}s")
+                self.emit_metric({"event": "retry", "reason": reason, "stage": stage})
+                time.sleep(delay)
+                waited += delay
+                continue
+            if route is not None:
+                self.router.release(route, headers, message.usage.input_tokens + message.usage.output_tokens - estimate)
+            self.breaker.record_success(probe)
+            break
 
+        completion = Completion(message.content[0].text, usage_to_dict(message.usage), model=message.model,
+                                seconds=time.perf_counter() - started, ttft=ttft, wait_seconds=waited,
+                                retries=retries)
+        if self.hedge_quantile is not None:
+            self._latency_tracker(stage_model).observe(completion.seconds)
+        self._cache_store(cache_key, completion, message.model)
+        return completion
+    
+    def _extract_sections(self, content: str) -> Sections:
+        """Extract sections from generated content (as offsets; text is sliced on access)"""
+        return SectionIndex.scan(content)
+    
+    def _save_output(self, result: Dict[str, Any], config: PageConfig,
+                     page_id: Optional[str] = None) -> Dict[str, Any]:
+        """Append the generated page to the output store, catalog it, and return its location"""
+        location = self.store.put(result, page_id)
+        self.catalog.register(result, location)
+        logger.info(f"Saved to: {self.store.root / location['shard']} ({location['id']})")
+        return location
 
 def main():
     """Example usage"""
+    configure_logging()
     
     # Example configuration for LooksCode quiz funnel
     config = PageConfig(
@@ -350,7 +1255,7 @@ def main():
     
     print(f"\nGenerated {config.page_type} for {config.product_name}")
     print(f"Word count: {result['word_count']}")
-    print(f"Saved to: generated_pages/")
+    print(f"Saved as: {result['location']['id']} (export with: python output_store.py export {result['location']['id']})")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Distributed batch runs: a shared SQLite queue that worker processes on any number of machines lease pages from
+
+    python lease_queue.py submit -c batch_config.json --wait    # coordinator: queue the pages, then report
+    python lease_queue.py worker RUN_ID -n 4                    # on every node, as many as you like
+    python lease_queue.py status RUN_ID
+    python lease_queue.py report RUN_ID
+
+Workers hold a lease on each page they generate and renew it by heartbeat;
+a page whose lease expires (its worker died or hung) goes back on the queue
+and resumes from its last finished stage. Point every process at the same
+--db on a filesystem with working file locks, with roughly synchronized clocks.
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import click
+
+from batch_generate import (build_generator, expand_pages, generate_one, generator_options, page_id, print_summary,
+                            save_report, stage_totals, validate_pages)
+from landing_page_generator import LandingPageGenerator, configure_logging
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DB = Path("generated_pages") / "queue.db"
+DEFAULT_LEASE_SECONDS = 120.0
+# Leases a page may lose before it is failed instead of re-queued, so one page cannot crash every worker
+DEFAULT_MAX_ATTEMPTS = 3
+
+QUEUED = "queued"
+LEASED = "leased"
+SAVED = "saved"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY, created_at REAL NOT NULL, total INTEGER NOT NULL, source TEXT
+);
+CREATE TABLE IF NOT EXISTS pages (
+    run_id TEXT NOT NULL, page_id TEXT NOT NULL, position INTEGER NOT NULL, config TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued', worker TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0,
+    progress TEXT, entry TEXT, updated_at REAL,
+    PRIMARY KEY (run_id, page_id)
+);
+CREATE INDEX IF NOT EXISTS pages_by_state ON pages (run_id, state, position);
+CREATE TABLE IF NOT EXISTS workers (
+    run_id TEXT NOT NULL, worker TEXT NOT NULL, started_at REAL NOT NULL, heartbeat_at REAL NOT NULL,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (run_id, worker)
+);
+"""
+
+
+class LeaseQueue:
+    """Pages of batch runs in a SQLite database, leased to workers for a limited time.
+
+    Every write a worker makes about a page (stage progress, the final entry)
+    only applies while it still holds that page's lease, so a worker that lost
+    its lease to expiry cannot overwrite the work of the one that took over.
+    The page itself goes to the output store, outside the queue; `run_worker`
+    renews the lease just before storing it and stores it under an id fixed
+    per queue item, so a late duplicate replaces the page rather than adding one.
+    """
+
+    def __init__(self, path: Path = QUEUE_DB, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Transactions are begun explicitly; the lock keeps the worker's threads off each other's
+        self._db = sqlite3.connect(str(self.path), timeout=60, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two workers cannot lease the same page
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def create_run(self, pages: List[Dict[str, Any]], source: Optional[str] = None) -> str:
+        """Queue merged page configs as a new run and return its id"""
+        now = time.time()
+        run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.urandom(3).hex()}"
+        with self._transaction() as db:
+            db.execute("INSERT INTO runs VALUES (?, ?, ?, ?)", (run_id, now, len(pages), source))
+            db.executemany(
+                "INSERT INTO pages (run_id, page_id, position, config, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, page_id(i), i, json.dumps(page, ensure_ascii=False), now) for i, page in enumerate(pages)])
+        return run_id
+
+    def run(self, run_id: str) -> sqlite3.Row:
+        rows = self._query("SELECT * FROM runs WHERE run_id = ?", (run_id,))
+        if not rows:
+            raise KeyError(f"No run {run_id} in {self.path}")
+        return rows[0]
+
+    def _requeue_expired(self, db: sqlite3.Connection, run_id: str, now: float) -> int:
+        expired = db.execute("SELECT page_id, config, attempts, worker FROM pages WHERE run_id = ? AND state = ? "
+                             "AND lease_expires < ?", (run_id, LEASED, now)).fetchall()
+        for row in expired:
+            if row["attempts"] >= self.max_attempts:
+                config = json.loads(row["config"])
+                entry = {"product": config.get("product_name"), "type": config.get("page_type"), "status": "failed",
+                         "duration_seconds": 0, "error": f"lease expired {row['attempts']} times"}
+                db.execute("UPDATE pages SET state = ?, entry = ?, worker = NULL, lease_expires = NULL, updated_at = ? "
+                           "WHERE run_id = ? AND page_id = ?", (FAILED, json.dumps(entry), now, run_id, row["page_id"]))
+            else:
+                db.execute("UPDATE pages SET state = ?, worker = NULL, lease_expires = NULL, updated_at = ? "
+                           "WHERE run_id = ? AND page_id = ?", (QUEUED, now, run_id, row["page_id"]))
+            logger.warning(f"Lease of {row['page_id']} held by {row['worker']} expired")
+        return len(expired)
+
+    def requeue_expired(self, run_id: str) -> int:
+        """Put pages whose leases expired back on the queue; returns how many"""
+        with self._transaction() as db:
+            return self._requeue_expired(db, run_id, time.time())
+
+    def _touch_worker(self, db: sqlite3.Connection, run_id: str, worker: str, now: float, done: int = 0):
+        db.execute("INSERT INTO workers (run_id, worker, started_at, heartbeat_at, pages_done) VALUES (?, ?, ?, ?, ?) "
+                   "ON CONFLICT (run_id, worker) DO UPDATE SET heartbeat_at = excluded.heartbeat_at, "
+                   "pages_done = pages_done + excluded.pages_done", (run_id, worker, now, now, done))
+
+    def lease(self, run_id: str, worker: str, count: int = 1) -> List[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+        """Lease up to `count` queued pages, as (page id, merged config, progress from earlier leases)"""
+        now = time.time()
+        with self._transaction() as db:
+            self._requeue_expired(db, run_id, now)
+            rows = db.execute("SELECT page_id, config, progress FROM pages WHERE run_id = ? AND state = ? "
+                              "ORDER BY position LIMIT ?", (run_id, QUEUED, count)).fetchall()
+            db.executemany("UPDATE pages SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                           "updated_at = ? WHERE run_id = ? AND page_id = ?",
+                           [(LEASED, worker, now + self.lease_seconds, now, run_id, row["page_id"]) for row in rows])
+            self._touch_worker(db, run_id, worker, now)
+        return [(row["page_id"], json.loads(row["config"]), json.loads(row["progress"] or "{}")) for row in rows]
+
+    def heartbeat(self, run_id: str, worker: str, page_ids: List[str]) -> List[str]:
+        """Renew the worker's leases on `page_ids`; returns those it no longer holds"""
+        now = time.time()
+        with self._transaction() as db:
+            self._touch_worker(db, run_id, worker, now)
+            lost = []
+            for pid in page_ids:
+                updated = db.execute("UPDATE pages SET lease_expires = ? WHERE run_id = ? AND page_id = ? "
+                                     "AND worker = ? AND state = ?", (now + self.lease_seconds, run_id, pid, worker, LEASED))
+                if not updated.rowcount:
+                    lost.append(pid)
+        return lost
+
+    def save_progress(self, run_id: str, pid: str, worker: str, data: Dict[str, Any]) -> bool:
+        """Merge a finished stage into the page's progress; False if the lease was lost"""
+        with self._transaction() as db:
+            row = db.execute("SELECT progress FROM pages WHERE run_id = ? AND page_id = ? AND worker = ? AND state = ?",
+                             (run_id, pid, worker, LEASED)).fetchone()
+            if row is None:
+                return False
+            progress = {**json.loads(row["progress"] or "{}"), **data}
+            db.execute("UPDATE pages SET progress = ?, updated_at = ? WHERE run_id = ? AND page_id = ?",
+                       (json.dumps(progress, ensure_ascii=False), time.time(), run_id, pid))
+        return True
+
+    def finish(self, run_id: str, pid: str, worker: str, entry: Dict[str, Any]) -> bool:
+        """Store a page's report entry (saved or failed) and release it; False if the lease was lost"""
+        now = time.time()
+        with self._transaction() as db:
+            updated = db.execute("UPDATE pages SET state = ?, entry = ?, lease_expires = NULL, updated_at = ? "
+                                 "WHERE run_id = ? AND page_id = ? AND worker = ? AND state = ?",
+                                 (SAVED if entry["status"] == "success" else FAILED,
+                                  json.dumps({**entry, "worker": worker}, ensure_ascii=False),
+                                  now, run_id, pid, worker, LEASED))
+            if updated.rowcount:
+                self._touch_worker(db, run_id, worker, now, done=1)
+        return bool(updated.rowcount)
+
+    def status(self, run_id: str) -> Dict[str, int]:
+        """Pages of a run by state"""
+        counts = dict(self._query("SELECT state, COUNT(*) FROM pages WHERE run_id = ? GROUP BY state", (run_id,)))
+        return {state: counts.get(state, 0) for state in (QUEUED, LEASED, SAVED, FAILED)}
+
+    def finished(self, run_id: str) -> bool:
+        counts = self.status(run_id)
+        return not counts[QUEUED] and not counts[LEASED]
+
+    def workers(self, run_id: str) -> List[Dict[str, Any]]:
+        """Workers that joined a run, with whether they heartbeat within the last lease period"""
+        now = time.time()
+        return [{**dict(row), "alive": now - row["heartbeat_at"] < self.lease_seconds}
+                for row in self._query("SELECT worker, started_at, heartbeat_at, pages_done FROM workers "
+                                       "WHERE run_id = ? ORDER BY started_at", (run_id,))]
+
+    def requeues(self, run_id: str) -> int:
+        """Leases lost over the run: attempts beyond each page's first"""
+        return self._query("SELECT COALESCE(SUM(MAX(attempts - 1, 0)), 0) FROM pages WHERE run_id = ? "
+                           "AND state IN (?, ?)", (run_id, SAVED, FAILED))[0][0]
+
+    def elapsed(self, run_id: str) -> float:
+        """Seconds from queueing the run to its last finished page"""
+        return self._query("SELECT COALESCE(MAX(pages.updated_at), runs.created_at) - runs.created_at FROM runs "
+                           "LEFT JOIN pages ON pages.run_id = runs.run_id AND pages.entry IS NOT NULL "
+                           "WHERE runs.run_id = ?", (run_id,))[0][0]
+
+    def results(self, run_id: str) -> List[Dict[str, Any]]:
+        """Report entries of the finished pages, in config order"""
+        return [json.loads(row["entry"]) for row in
+                self._query("SELECT entry FROM pages WHERE run_id = ? AND entry IS NOT NULL ORDER BY position", (run_id,))]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class LeaseLostError(Exception):
+    """The worker no longer holds the lease on a page"""
+
+
+class LeaseJournal:
+    """RunJournal stand-in that records a worker's progress in the lease queue, so generate_one works unchanged"""
+
+    def __init__(self, queue: LeaseQueue, run_id: str, worker: str):
+        self.queue = queue
+        self.run_id = run_id
+        self.worker = worker
+
+    def record(self, page_id: str, state: str, **data: Any):
+        if state in (SAVED, FAILED):
+            # run_worker stores the page's entry once generate_one returns it
+            return
+        if not self.queue.save_progress(self.run_id, page_id, self.worker, {"state": state, **data}):
+            logger.warning(f"Lost the lease on {page_id}; discarding its {state} record")
+
+
+def run_worker(queue: LeaseQueue, run_id: str, generator: LandingPageGenerator, worker: str,
+               concurrency: int = 4, poll_interval: float = 2.0) -> int:
+    """Lease and generate pages until the run has none left; returns the number this worker finished"""
+    journal = LeaseJournal(queue, run_id, worker)
+
+    def renew_lease(pid: str):
+        # Fence the page's store write: a worker that lost the lease leaves it to the new holder
+        if queue.heartbeat(run_id, worker, [pid]):
+            raise LeaseLostError(f"lost the lease on {pid} before saving it")
+
+    heartbeat_every = queue.lease_seconds / 4
+    last_heartbeat = time.monotonic()
+    in_flight: Dict[Future, Tuple[str, Dict[str, Any]]] = {}
+    finished = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            leased = queue.lease(run_id, worker, concurrency - len(in_flight)) if len(in_flight) < concurrency else []
+            for pid, merged, progress in leased:
+                future = pool.submit(generate_one, generator, merged, journal, pid, progress,
+                                     before_save=partial(renew_lease, pid), store_id=f"{run_id}_{pid}")
+                in_flight[future] = (pid, merged)
+            if not in_flight:
+                if queue.finished(run_id):
+                    break
+                # Everything left is leased by other workers; wait in case a lease expires
+                time.sleep(poll_interval)
+                continue
+            done, _ = wait(in_flight, timeout=min(poll_interval, heartbeat_every), return_when=FIRST_COMPLETED)
+            for future in done:
+                pid, merged = in_flight.pop(future)
+                entry = future.result()
+                if not queue.finish(run_id, pid, worker, entry):
+                    logger.warning(f"Lost the lease on {pid}; another worker's result counts instead")
+                    continue
+                finished += 1
+                label = f"{merged.get('product_name')} - {merged.get('page_type')}"
+                if entry['status'] == "success":
+                    print(f"[{pid}] ✅ {label} ({entry['word_count']} words, {entry['duration_seconds']}s)")
+                else:
+                    print(f"[{pid}] ❌ {label}: {entry['error']}")
+            if time.monotonic() - last_heartbeat >= heartbeat_every:
+                last_heartbeat = time.monotonic()
+                # A lost page keeps generating, but neither its page nor its entry is saved
+                for pid in queue.heartbeat(run_id, worker, [pid for pid, _ in in_flight.values()]):
+                    logger.warning(f"Lease on {pid} was lost; another worker owns it now")
+    return finished
+
+
+def wait_for_run(queue: LeaseQueue, run_id: str, poll_interval: float = 5.0):
+    """Print progress until no page is queued or leased, re-queueing expired leases meanwhile"""
+    total = queue.run(run_id)["total"]
+    last = None
+    while True:
+        queue.requeue_expired(run_id)
+        counts = queue.status(run_id)
+        alive = sum(1 for worker in queue.workers(run_id) if worker["alive"])
+        line = (f"[{counts[SAVED] + counts[FAILED]}/{total}] ✅ {counts[SAVED]} ❌ {counts[FAILED]} | "
+                f"🔒 {counts[LEASED]} leased | ⏳ {counts[QUEUED]} queued | 👷 {alive} workers")
+        if line != last:
+            print(line)
+            last = line
+        if not counts[QUEUED] and not counts[LEASED]:
+            return
+        time.sleep(poll_interval)
+
+
+def write_report(queue: LeaseQueue, run_id: str) -> Path:
+    """Assemble the batch report from the entries the workers stored"""
+    results = queue.results(run_id)
+    elapsed = queue.elapsed(run_id)
+    print_summary(results, elapsed)
+    workers = queue.workers(run_id)
+    print("\n👷 Pages by worker:")
+    for worker in workers:
+        print(f"   {worker['worker']}: {worker['pages_done']}")
+    requeues = queue.requeues(run_id)
+    if requeues:
+        print(f"♻️  Expired leases re-queued: {requeues}")
+    totals = stage_totals(results)
+    return save_report(results, mode="distributed", run_id=run_id, queue=str(queue.path),
+                       wall_time_seconds=round(elapsed, 2), workers=workers, requeued_leases=requeues,
+                       stage_totals=totals,
+                       cost_usd=round(sum(data.get('cost_usd', 0) for data in totals.values()), 6))
+
+
+@click.group()
+@click.option('--db', type=click.Path(dir_okay=False), default=str(QUEUE_DB), show_default=True,
+              help='Shared queue database')
+@click.option('--lease', 'lease_seconds', type=click.FloatRange(min=1), default=DEFAULT_LEASE_SECONDS, show_default=True,
+              help='Seconds a page stays leased without a heartbeat')
+@click.pass_context
+def cli(ctx, db, lease_seconds):
+    """Distributed batch generation over a shared lease-based queue"""
+    configure_logging()
+    ctx.obj = LeaseQueue(Path(db), lease_seconds)
+
+
+@cli.command()
+@click.option('--config', '-c', type=click.Path(exists=True), required=True, help='JSON batch config file')
+@click.option('--wait/--no-wait', default=False, help='Wait for the workers to finish, then write the report')
+@click.option('--poll-interval', type=click.FloatRange(min=0.1), default=5, help='Seconds between progress checks')
+@click.pass_obj
+def submit(queue, config, wait, poll_interval):
+    """Queue a batch config's pages for workers"""
+    with open(config, 'r') as f:
+        batch_config = json.load(f)
+    try:
+        pages, duplicates = expand_pages(batch_config)
+    except ValueError as e:
+        print(f"❌ Invalid batch configuration: {e}")
+        raise SystemExit(1)
+    if duplicates:
+        print(f"♊ Dropped {duplicates} duplicate page configurations")
+    if not pages:
+        print("❌ No pages defined in configuration")
+        return
+    errors = validate_pages(pages)
+    if errors:
+        print("❌ Invalid batch configuration:")
+        for error in errors:
+            print(f"   - {error}")
+        raise SystemExit(1)
+
+    run_id = queue.create_run(pages, source=str(config))
+    print(f"\n📥 Queued {len(pages)} pages as run {run_id} in {queue.path}")
+    print(f"👷 Start workers with: python lease_queue.py --db {queue.path} worker {run_id}\n")
+    if wait:
+        wait_for_run(queue, run_id, poll_interval)
+        print(f"\n📊 Detailed report saved to: {write_report(queue, run_id)}")
+
+
+@cli.command()
+@click.argument('run_id')
+@click.option('--concurrency', '-n', type=click.IntRange(min=1), default=4, help='Pages this worker generates at once')
+@click.option('--worker-id', help='Name in the queue (default: host-pid)')
+@click.option('--poll-interval', type=click.FloatRange(min=0.1), default=2, help='Seconds between queue checks when idle')
+@generator_options
+@click.pass_obj
+def worker(queue, run_id, concurrency, worker_id, poll_interval, **generator_settings):
+    """Lease and generate a run's pages until none are left (rate limits, cache and retries apply per worker)"""
+    try:
+        queue.run(run_id)
+    except KeyError as e:
+        raise click.UsageError(str(e.args[0]))
+    generator = build_generator(**generator_settings)
+
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    print(f"\n👷 Worker {worker_id} on run {run_id} | Concurrency: {concurrency}\n")
+    finished = run_worker(queue, run_id, generator, worker_id, concurrency, poll_interval)
+    print(f"\n🏁 Worker {worker_id} finished {finished} pages; the run has none left")
+
+
+@cli.command()
+@click.argument('run_id')
+@click.pass_obj
+def status(queue, run_id):
+    """Show a run's progress and workers"""
+    try:
+        total = queue.run(run_id)["total"]
+    except KeyError as e:
+        raise click.UsageError(str(e.args[0]))
+    counts = queue.status(run_id)
+    print(f"\n📋 Run {run_id}: {counts[SAVED] + counts[FAILED]}/{total} finished")
+    for state, count in counts.items():
+        print(f"   {state:<8} {count}")
+    for worker in queue.workers(run_id):
+        print(f"   {'🟢' if worker['alive'] else '⚪'} {worker['worker']}: {worker['pages_done']} pages")
+
+
+@cli.command()
+@click.argument('run_id')
+@click.option('--wait/--no-wait', default=False, help='Wait for unfinished pages first')
+@click.option('--poll-interval', type=click.FloatRange(min=0.1), default=5, help='Seconds between progress checks')
+@click.pass_obj
+def report(queue, run_id, wait, poll_interval):
+    """Write the batch report from the workers' results"""
+    try:
+        queue.run(run_id)
+    except KeyError as e:
+        raise click.UsageError(str(e.args[0]))
+    if wait:
+        wait_for_run(queue, run_id, poll_interval)
+    elif not queue.finished(run_id):
+        print(f"⚠️  Run {run_id} is not finished; reporting the pages done so far")
+    print(f"\n📊 Detailed report saved to: {write_report(queue, run_id)}")
+
+
+if __name__ == "__main__":
+    cli()
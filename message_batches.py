@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Offline batch generation through the Anthropic Message Batches API
+"""
+import json
+import logging
+import os
+import time
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+from landing_page_generator import DEFAULT_MODEL, LandingPageGenerator, PageConfig, usage_to_dict
+from metrics import estimate_cost
+from quality import quality_summary
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR = Path("generated_pages") / "message_batches"
+
+
+class MessageBatchRunner:
+    """Generates pages as two asynchronous message batches (drafts, then refinements).
+
+    Drafts that pass the generator's quality check are saved as they are and
+    left out of the refinement batch.
+
+    All progress lives in a JSON state file that is rewritten atomically after
+    every step, so a killed process can be resumed with `MessageBatchRunner.resume`
+    and continues polling the batch it had already submitted.
+    """
+
+    def __init__(self, generator: LandingPageGenerator, state: Dict[str, Any], state_path: Path,
+                 poll_interval: float = 60.0):
+        self.generator = generator
+        self.state = state
+        self.state_path = Path(state_path)
+        self.poll_interval = poll_interval
+
+    @classmethod
+    def create(cls, generator: LandingPageGenerator, configs: List[PageConfig],
+               poll_interval: float = 60.0) -> "MessageBatchRunner":
+        """Start a new run for `configs`"""
+        # The random suffix keeps runs started in the same second apart
+        run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.urandom(3).hex()}"
+        state = {
+            "run_id": run_id,
+            "created_at": datetime.now().isoformat(),
+            "stage": "initial",
+            "batches": {},
+            "pages": {f"page-{i:05d}": {"config": asdict(config)} for i, config in enumerate(configs)}
+        }
+        runner = cls(generator, state, STATE_DIR / f"{run_id}.json", poll_interval)
+        # Claim the state file so an existing run's (and its batch ids) is never overwritten
+        runner.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(runner.state_path, 'x', encoding='utf-8'):
+            pass
+        runner._save_state()
+        return runner
+
+    @classmethod
+    def resume(cls, generator: LandingPageGenerator, state_path: str,
+               poll_interval: float = 60.0) -> "MessageBatchRunner":
+        """Continue a run from its state file"""
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        return cls(generator, state, Path(state_path), poll_interval)
+
+    def _save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.state_path)
+
+    def _config(self, custom_id: str) -> PageConfig:
+        return PageConfig(**self.state["pages"][custom_id]["config"])
+
+    def run(self) -> List[Dict[str, Any]]:
+        """Drive the run to completion and return one report entry per page"""
+        if self.state["stage"] == "initial":
+            self._run_stage("initial", self._initial_requests(), "initial_copy")
+            self.state["stage"] = "refinement"
+            self._save_state()
+
+        if self.state["stage"] == "refinement":
+            self._run_stage("refinement", self._refinement_requests(), "final_copy")
+            self._save_outputs()
+            self.state["stage"] = "done"
+            self._save_state()
+
+        return [self._report_entry(page) for page in self.state["pages"].values()]
+
+    def _initial_requests(self) -> List[Dict[str, Any]]:
+        requests = []
+        for custom_id in self.state["pages"]:
+            config = self._config(custom_id)
+            relevant_patterns = self.generator.patterns.get_relevant_patterns(config)
+            pattern_block, product_prompt = self.generator.prompt_engine.build_prompt_parts(config, relevant_patterns)
+            params = self.generator._build_request(product_prompt, self.generator.stage_model(config, "initial"),
+                                                   system=pattern_block)
+            requests.append({"custom_id": custom_id, "params": params})
+        return requests
+
+    def _refinement_requests(self) -> List[Dict[str, Any]]:
+        requests = []
+        for custom_id, page in self.state["pages"].items():
+            if "error" in page or "final_copy" in page:
+                continue
+            if "initial_copy" not in page:
+                page["error"] = "missing from initial batch results"
+                continue
+            config = self._config(custom_id)
+            relevant_patterns = self.generator.patterns.get_relevant_patterns(config)
+            if self.generator.assess_copy(config, relevant_patterns, page["initial_copy"]).passed:
+                # Good enough as drafted; not worth a refinement request
+                page["final_copy"] = page["initial_copy"]
+                continue
+            prompt = self.generator.prompt_engine.build_refinement_prompt(page["initial_copy"], config)
+            params = self.generator._build_request(prompt, self.generator.stage_model(config, "refinement"))
+            requests.append({"custom_id": custom_id, "params": params})
+        return requests
+
+    def _run_stage(self, stage: str, requests: List[Dict[str, Any]], field: str):
+        """Submit (unless already submitted), wait for, and collect one batch"""
+        batches = self.generator.client.messages.batches
+        batch_id = self.state["batches"].get(stage)
+        if not batch_id:
+            if not requests:
+                return
+            batch = batches.create(requests=requests)
+            batch_id = batch.id
+            self.state["batches"][stage] = batch_id
+            self._save_state()
+            logger.info(f"Submitted {stage} batch {batch_id} with {len(requests)} requests")
+        else:
+            logger.info(f"Resuming {stage} batch {batch_id}")
+
+        batch = self._wait(batch_id)
+        logger.info(f"Batch {batch_id} ended: {batch.request_counts}")
+
+        for item in batches.results(batch_id):
+            page = self.state["pages"].get(item.custom_id)
+            if page is None:
+                continue
+            if item.result.type == "succeeded":
+                page[field] = item.result.message.content[0].text
+                page.setdefault("usage", {})[stage] = usage_to_dict(item.result.message.usage)
+                page.setdefault("models", {})[stage] = item.result.message.model
+            else:
+                error = getattr(item.result, "error", None)
+                page["error"] = f"{stage} request {item.result.type}" + (f": {error}" if error else "")
+        self._save_state()
+
+    def _wait(self, batch_id: str) -> Any:
+        batches = self.generator.client.messages.batches
+        while True:
+            batch = batches.retrieve(batch_id)
+            if batch.processing_status == "ended":
+                return batch
+            logger.info(f"Batch {batch_id} {batch.processing_status}: {batch.request_counts}")
+            time.sleep(self.poll_interval)
+
+    def _save_outputs(self):
+        for custom_id, page in self.state["pages"].items():
+            if "error" in page or "saved_at" in page or "final_copy" not in page:
+                continue
+            config = self._config(custom_id)
+            relevant_patterns = self.generator.patterns.get_relevant_patterns(config)
+            usage = page.get("usage", {})
+            # Batch results carry no timing; record tokens and the discounted cost
+            models = page.get("models", {})
+            stages = {stage: {"model": models.get(stage, DEFAULT_MODEL), **stage_usage,
+                              "cost_usd": estimate_cost(models.get(stage, DEFAULT_MODEL), stage_usage, batch=True)}
+                      for stage, stage_usage in usage.items()}
+            draft_quality = self.generator.assess_copy(config, relevant_patterns, page["initial_copy"])
+            final_quality = None
+            if "refinement" in usage:
+                final_quality = self.generator.assess_copy(config, relevant_patterns, page["final_copy"])
+            # Keyed on the page, so a save repeated after a crash replaces the stored page rather than duplicating it
+            result = self.generator.finish_page(config, relevant_patterns, page["final_copy"], usage, stages=stages,
+                                                quality=quality_summary(draft_quality, final_quality),
+                                                page_id=f"{self.state['run_id']}_{custom_id}")
+            page["word_count"] = result["word_count"]
+            page["tokens"] = result.get("usage", {}).get("total")
+            page["cost_usd"] = result["metrics"]["cost_usd"]
+            page["stages"] = result["metrics"]["stages"]
+            page["saved_at"] = result["generated_at"]
+            page["location"] = result["location"]
+            page["quality_score"] = result["quality"]["score"]
+            page["refined"] = result["quality"]["refined"]
+            page["model_profile"] = result["model_profile"]
+        self._save_state()
+
+    def _report_entry(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        config = page["config"]
+        entry = {"product": config["product_name"], "type": config["page_type"]}
+        if "saved_at" in page:
+            entry.update({
+                "status": "success",
+                "word_count": page["word_count"],
+                "tokens": page.get("tokens"),
+                "cost_usd": page.get("cost_usd"),
+                "stages": page.get("stages"),
+                "quality_score": page.get("quality_score"),
+                "refined": page.get("refined", True),
+                "model_profile": page.get("model_profile"),
+                "models": page.get("models"),
+                "location": page.get("location")
+            })
+        else:
+            entry.update({"status": "failed", "error": page.get("error", "not completed")})
+        return entry
+
+    @property
+    def batch_ids(self) -> Dict[str, str]:
+        return dict(self.state["batches"])
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Timing, token and cost instrumentation: cost estimates and pluggable metrics sinks
+"""
+import json
+import logging
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens: (input, output). Cache writes cost 1.25x input, cache reads 0.1x
+MODEL_PRICES = {
+    "claude-opus-4-1-20250805": (15.0, 75.0),
+    "claude-opus-4-20250514": (15.0, 75.0),
+    "claude-sonnet-4-20250514": (3.0, 15.0),
+    "claude-3-7-sonnet-20250219": (3.0, 15.0),
+    "claude-3-5-haiku-20241022": (0.8, 4.0),
+}
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.1
+BATCH_DISCOUNT = 0.5
+
+# Time spent in a stage, by phase
+PHASES = {"prompt_seconds": "prompt", "wait_seconds": "wait", "seconds": "api", "write_seconds": "write"}
+
+
+def estimate_cost(model: str, usage: Dict[str, int], batch: bool = False) -> Optional[float]:
+    """Cost in USD of one call's token usage, or None for a model without known prices"""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    input_price, output_price = prices
+    cost = (
+        usage.get("input_tokens", 0) * input_price
+        + usage.get("cache_creation_input_tokens", 0) * input_price * CACHE_WRITE_MULTIPLIER
+        + usage.get("cache_read_input_tokens", 0) * input_price * CACHE_READ_MULTIPLIER
+        + usage.get("output_tokens", 0) * output_price
+    ) / 1_000_000
+    return round(cost * (BATCH_DISCOUNT if batch else 1), 6)
+
+
+def page_metrics(stages: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Roll per-stage metrics up into a page's metrics"""
+    total_seconds = sum(stage.get(field, 0) or 0 for stage in stages.values() for field in PHASES)
+    costs = [stage["cost_usd"] for stage in stages.values() if stage.get("cost_usd") is not None]
+    return {
+        "stages": stages,
+        "total_seconds": round(total_seconds, 4),
+        "cost_usd": round(sum(costs), 6) if costs else None
+    }
+
+
+class MetricsSink:
+    """Receives metric events (plain dicts with an "event" key) from the generator; this base ignores them"""
+
+    def record(self, event: Dict[str, Any]):
+        pass
+
+
+class MultiSink(MetricsSink):
+    """Fans events out to several sinks"""
+
+    def __init__(self, sinks: Iterable[MetricsSink]):
+        self.sinks = list(sinks)
+
+    def record(self, event: Dict[str, Any]):
+        for sink in self.sinks:
+            sink.record(event)
+
+
+class JsonlMetricsLog(MetricsSink):
+    """Appends every event as a JSON line"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def record(self, event: Dict[str, Any]):
+        line = json.dumps({"ts": datetime.now().isoformat(), **event}, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class PrometheusMetrics(MetricsSink):
+    """Aggregates events into counters and histograms, rendered in the Prometheus text format"""
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+    HELP = {
+        "lpg_pages_total": ("counter", "Pages finished, by status"),
+        "lpg_stage_seconds": ("histogram", "Seconds per page spent in each stage and phase"),
+        "lpg_ttft_seconds": ("histogram", "Seconds until the first streamed token"),
+        "lpg_tokens_total": ("counter", "Tokens used, by stage and token type"),
+        "lpg_cost_usd_total": ("counter", "Estimated spend in USD, by model"),
+        "lpg_api_errors_total": ("counter", "Failed API calls, by error type"),
+        "lpg_api_retries_total": ("counter", "API calls retried after a transient failure, by reason"),
+        "lpg_hedges_total": ("counter", "Slow calls raced against a duplicate request, by which finished first"),
+        "lpg_circuit_opens_total": ("counter", "Times the circuit breaker opened after repeated overload errors"),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], List[float]] = {}  # bucket counts + [sum, count]
+
+    def _inc(self, name: str, labels: Dict[str, str], value: float = 1.0):
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def _observe(self, name: str, labels: Dict[str, str], value: float):
+        key = (name, tuple(sorted(labels.items())))
+        state = self._histograms.setdefault(key, [0.0] * (len(self.BUCKETS) + 2))
+        for i, bound in enumerate(self.BUCKETS):
+            if value <= bound:
+                state[i] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def record(self, event: Dict[str, Any]):
+        with self._lock:
+            if event.get("event") == "api_error":
+                self._inc("lpg_api_errors_total", {"error": event.get("error", "unknown")})
+            elif event.get("event") == "retry":
+                self._inc("lpg_api_retries_total", {"reason": event.get("reason", "unknown")})
+            elif event.get("event") == "hedge":
+                self._inc("lpg_hedges_total", {"winner": event.get("winner", "unknown")})
+            elif event.get("event") == "circuit" and event.get("state") == "open":
+                self._inc("lpg_circuit_opens_total", {})
+            elif event.get("event") == "page":
+                self._inc("lpg_pages_total", {"status": event.get("status", "unknown")})
+                for stage, data in (event.get("stages") or {}).items():
+                    self._record_stage(stage, data)
+
+    def _record_stage(self, stage: str, data: Dict[str, Any]):
+        for field, phase in PHASES.items():
+            if data.get(field) is not None and (field != "wait_seconds" or data[field]):
+                self._observe("lpg_stage_seconds", {"stage": stage, "phase": phase}, data[field])
+        if data.get("ttft") is not None:
+            self._observe("lpg_ttft_seconds", {"stage": stage}, data["ttft"])
+        for token_type in ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens"):
+            if data.get(token_type):
+                self._inc("lpg_tokens_total", {"stage": stage, "type": token_type[:-7]}, data[token_type])
+        # A stage drafted section by section may have used several models
+        for model, cost in (data.get("cost_by_model") or {data.get("model", "unknown"): data.get("cost_usd")}).items():
+            if cost:
+                self._inc("lpg_cost_usd_total", {"model": model}, cost)
+
+    @staticmethod
+    def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+        items = list(labels) + ([extra] if extra else [])
+        if not items:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+    def render(self) -> str:
+        """Current values in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in self.HELP.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for (metric, labels), value in sorted(self._counters.items()):
+                        if metric == name:
+                            lines.append(f"{name}{self._format_labels(labels)} {value:g}")
+                    continue
+                for (metric, labels), state in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(self.BUCKETS, state):
+                        lines.append(f"{name}_bucket{self._format_labels(labels, ('le', f'{bound:g}'))} {count:g}")
+                    lines.append(f"{name}_bucket{self._format_labels(labels, ('le', '+Inf'))} {state[-1]:g}")
+                    lines.append(f"{name}_sum{self._format_labels(labels)} {state[-2]:.6g}")
+                    lines.append(f"{name}_count{self._format_labels(labels)} {state[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    server: "MetricsServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("content-type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, metrics: PrometheusMetrics):
+        super().__init__(address, _MetricsHandler)
+        self.metrics = metrics
+
+
+def serve_metrics(metrics: PrometheusMetrics, port: int, host: str = "0.0.0.0") -> MetricsServer:
+    """Expose `metrics` at http://host:port/metrics from a background thread"""
+    server = MetricsServer((host, port), metrics)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Model, max_tokens and temperature per generation stage, grouped into named profiles
+"""
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OPUS = "claude-opus-4-20250514"
+SONNET = "claude-sonnet-4-20250514"
+
+# initial: a page drafted in one call; outline and section: a long page drafted section by section;
+# refinement: the whole page or its failing sections rewritten
+STAGES = ("initial", "outline", "section", "refinement")
+DEFAULT_PROFILE = "default"
+PROFILES_FILE = "model_profiles.json"
+
+# A profile sets stage settings, optionally on top of the profile it "extends", then applies each
+# rule whose "when" matches the page's config (a value, or a list of accepted values, per field)
+BUILTIN_PROFILES = {
+    "default": {
+        "stages": {
+            "initial": {"model": OPUS, "max_tokens": 8000, "temperature": 0.7},
+            "outline": {"model": OPUS, "max_tokens": 4000, "temperature": 0.7},
+            "section": {"model": OPUS, "max_tokens": 4000, "temperature": 0.7},
+            "refinement": {"model": OPUS, "max_tokens": 8000, "temperature": 0.7},
+        }
+    },
+    "fast": {
+        "extends": "default",
+        "stages": {"outline": {"model": SONNET}, "refinement": {"model": SONNET, "temperature": 0.5}},
+        "rules": [
+            {"when": {"page_type": "quiz_funnel", "length": "short"},
+             "stages": {"initial": {"model": SONNET}}},
+        ]
+    },
+}
+
+
+@dataclass(frozen=True)
+class StageModel:
+    """Request settings for one stage's API calls"""
+    model: str
+    max_tokens: int
+    temperature: float = 0.7
+
+
+def _matches(when: Dict[str, Any], config: Any) -> bool:
+    for field, wanted in when.items():
+        value = getattr(config, field, None)
+        if value not in (wanted if isinstance(wanted, list) else [wanted]):
+            return False
+    return True
+
+
+class ModelProfiles:
+    """Named model profiles, resolved per stage and page config"""
+
+    def __init__(self, profiles: Dict[str, Dict[str, Any]]):
+        self.profiles = profiles
+        for name in profiles:
+            # Resolving every stage up front surfaces bad profiles at load time
+            for stage in STAGES:
+                self._base(name, stage, ())
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "ModelProfiles":
+        """The built-in profiles, plus or overridden by those in a JSON file if it exists"""
+        profiles = dict(BUILTIN_PROFILES)
+        if path is not None and path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                try:
+                    data = json.load(f)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{path}: {e}")
+            loaded = data.get("profiles", data) if isinstance(data, dict) else None
+            if not isinstance(loaded, dict) or not all(isinstance(profile, dict) for profile in loaded.values()):
+                raise ValueError(f"{path} must map profile names to profile objects")
+            profiles.update(loaded)
+        return cls(profiles)
+
+    def names(self) -> List[str]:
+        return list(self.profiles)
+
+    def _profile(self, name: str) -> Dict[str, Any]:
+        if name not in self.profiles:
+            raise ValueError(f"Unknown model profile '{name}' (known: {', '.join(self.profiles)})")
+        return self.profiles[name]
+
+    def _base(self, name: str, stage: str, seen: Tuple[str, ...]) -> Dict[str, Any]:
+        """A profile's settings for a stage before rules, following "extends" """
+        if name in seen:
+            raise ValueError(f"Model profile '{name}' extends itself")
+        profile = self._profile(name)
+        unknown = set(profile.get("stages", {})) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Model profile '{name}' has unknown stages: {', '.join(sorted(unknown))}")
+        settings = self._base(profile["extends"], stage, seen + (name,)) if profile.get("extends") else {}
+        return {**settings, **profile.get("stages", {}).get(stage, {})}
+
+    def resolve(self, name: str, stage: str, config: Any = None) -> StageModel:
+        """Settings for `stage` of a page under profile `name`"""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage '{stage}' (known: {', '.join(STAGES)})")
+        settings = self._base(name, stage, ())
+        chain = []
+        while name:
+            chain.insert(0, self._profile(name))
+            name = chain[0].get("extends")
+        # Rules of a base profile apply first, so the extending profile's rules win
+        for profile in chain:
+            for rule in profile.get("rules", []):
+                if config is not None and _matches(rule.get("when", {}), config):
+                    settings.update(rule.get("stages", {}).get(stage, {}))
+        try:
+            return StageModel(settings["model"], int(settings["max_tokens"]), float(settings.get("temperature", 0.7)))
+        except KeyError as e:
+            raise ValueError(f"Model profile sets no {e.args[0]} for stage '{stage}'")
+
+
+_registry: Dict[Path, Tuple[Optional[float], ModelProfiles]] = {}
+_registry_lock = threading.Lock()
+
+
+def get_model_profiles(config_dir: str = "config") -> ModelProfiles:
+    """Process-wide profiles for a config directory, reloaded when its model_profiles.json changes"""
+    path = (Path(config_dir) / PROFILES_FILE).resolve()
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        mtime = None
+    with _registry_lock:
+        cached = _registry.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        if cached is not None:
+            logger.info(f"Model profiles changed on disk, reloading {path}")
+        profiles = ModelProfiles.load(path)
+        _registry[path] = (mtime, profiles)
+        return profiles
+
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Sharded, compressed store for generated pages
+"""
+import gzip
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import click
+
+from sections import json_default
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = Path("generated_pages") / "store"
+MARKDOWN_DIR = Path("generated_pages") / "markdown"
+
+
+def make_page_id(config: Dict[str, Any], generated_at: str) -> str:
+    """Readable, collision-free id for a page"""
+    slug = str(config.get("product_name", "page")).lower().replace(' ', '_')
+    stamp = datetime.fromisoformat(generated_at).strftime('%Y%m%d_%H%M%S')
+    return f"{slug}_{config.get('page_type', 'page')}_{stamp}_{uuid.uuid4().hex[:8]}"
+
+
+def render_markdown(result: Dict[str, Any]) -> str:
+    """Markdown version of a stored page"""
+    config = result["config"]
+    return (
+        f"# {config['product_name']} - {config['page_type'].replace('_', ' ').title()}\n\n"
+        f"Generated: {result['generated_at']}\n\n"
+        "---\n\n"
+        f"{result['page_content']}"
+    )
+
+
+class OutputStore:
+    """Append-only store of page results in size-capped, gzip-compressed JSONL shards.
+
+    Every page is one gzip member appended to the current shard
+    (`shard-000001.jsonl.gz`, ...), so shards stay valid gzip files that
+    `zcat` can read, while `get` decompresses just the one member at the
+    (offset, length) recorded in `index.jsonl`. A member is written and
+    fsync'd before its index line, so a crash can leave at most an
+    unreferenced member, never an index entry pointing at a partial one.
+    Writers are serialized by a lock file, so several processes can share
+    a store.
+    """
+
+    def __init__(self, root: str = str(STORE_DIR), shard_max_bytes: int = 64 * 1024 * 1024,
+                 compresslevel: int = 6):
+        self.root = Path(root)
+        self.shard_max_bytes = shard_max_bytes
+        self.compresslevel = compresslevel
+        self.index_path = self.root / "index.jsonl"
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+        self._index_size = 0  # bytes of index.jsonl already loaded
+        self._shard_number: Optional[int] = None
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _shard_path(self, number: int) -> Path:
+        return self.root / f"shard-{number:06d}.jsonl.gz"
+
+    def _current_shard(self, incoming: int) -> Path:
+        """Newest shard, or a new one if `incoming` bytes would push it past the cap"""
+        if self._shard_number is None:
+            numbers = [int(p.name[6:12]) for p in self.root.glob("shard-*.jsonl.gz")]
+            self._shard_number = max(numbers, default=1)
+        # Another process may have rolled over to a newer shard
+        while self._shard_path(self._shard_number + 1).exists():
+            self._shard_number += 1
+        path = self._shard_path(self._shard_number)
+        size = path.stat().st_size if path.exists() else 0
+        if size and size + incoming > self.shard_max_bytes:
+            self._shard_number += 1
+            path = self._shard_path(self._shard_number)
+        return path
+
+    def put(self, result: Dict[str, Any], page_id: Optional[str] = None) -> Dict[str, Any]:
+        """Append a page result and return its location"""
+        page_id = page_id or make_page_id(result["config"], result["generated_at"])
+        record = json.dumps({"id": page_id, **result}, ensure_ascii=False, default=json_default)
+        member = gzip.compress(record.encode('utf-8') + b"\n", compresslevel=self.compresslevel)
+
+        with self._lock, open(self.root / ".lock", 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            shard = self._current_shard(len(member))
+            with open(shard, 'ab') as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+
+            location = {"id": page_id, "shard": shard.name, "offset": offset, "length": len(member)}
+            with open(self.index_path, 'ab+') as f:
+                # Start on a fresh line if an earlier writer crashed mid-line
+                size = f.seek(0, os.SEEK_END)
+                prefix = b""
+                if size:
+                    f.seek(size - 1)
+                    if f.read(1) != b"\n":
+                        prefix = b"\n"
+                f.write(prefix + json.dumps(location).encode('utf-8') + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            if self._index is not None:
+                self._index[page_id] = location
+
+        logger.info(f"Stored {page_id} in {shard.name} @ {offset}")
+        return location
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        """Read index lines appended since the last load (by this or another process)"""
+        with self._lock:
+            if self._index is None:
+                self._index, self._index_size = {}, 0
+            try:
+                with open(self.index_path, 'rb') as f:
+                    f.seek(self._index_size)
+                    data = f.read()
+            except FileNotFoundError:
+                return self._index
+            # Leave a trailing partial line for the next load
+            complete = data[:data.rfind(b"\n") + 1]
+            self._index_size += len(complete)
+            for line in complete.splitlines():
+                try:
+                    location = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._index[location["id"]] = location
+            return self._index
+
+    def location(self, page_id: str) -> Optional[Dict[str, Any]]:
+        index = self._index if self._index is not None and page_id in self._index else self._load_index()
+        return index.get(page_id)
+
+    def get(self, page_id: str) -> Dict[str, Any]:
+        """Read one page result by id"""
+        location = self.location(page_id)
+        if location is None:
+            raise KeyError(page_id)
+        return self.read(location)
+
+    def read(self, location: Dict[str, Any]) -> Dict[str, Any]:
+        """Read the page at a location returned by `put`"""
+        with open(self.root / location["shard"], 'rb') as f:
+            f.seek(location["offset"])
+            member = f.read(location["length"])
+        return json.loads(gzip.decompress(member))
+
+    def ids(self) -> Iterator[str]:
+        """Ids of all stored pages, oldest first"""
+        return iter(list(self._load_index()))
+
+    def __len__(self) -> int:
+        return len(self._load_index())
+
+    def export_markdown(self, page_id: str, output_dir: str = str(MARKDOWN_DIR)) -> Path:
+        """Write one stored page as a Markdown file and return its path"""
+        path = Path(output_dir) / f"{page_id}.md"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(render_markdown(self.get(page_id)))
+        return path
+
+
+_stores: Dict[Path, OutputStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_output_store(root: str = str(STORE_DIR)) -> OutputStore:
+    """Process-wide OutputStore for `root`"""
+    key = Path(root).resolve()
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = OutputStore(root)
+        return _stores[key]
+
+
+@click.group()
+@click.option('--store', 'root', type=click.Path(file_okay=False), default=str(STORE_DIR), help='Store directory')
+@click.pass_context
+def main(ctx, root):
+    """Inspect and export pages in the output store"""
+    ctx.obj = OutputStore(root)
+
+
+@main.command('list')
+@click.pass_obj
+def list_pages(store):
+    """List stored page ids"""
+    for page_id in store.ids():
+        print(page_id)
+
+
+@main.command()
+@click.argument('page_ids', nargs=-1)
+@click.option('--all', 'export_all', is_flag=True, help='Export every stored page')
+@click.option('--output', '-o', type=click.Path(file_okay=False), default=str(MARKDOWN_DIR), help='Markdown directory')
+@click.pass_obj
+def export(store, page_ids, export_all, output):
+    """Write stored pages as Markdown files"""
+    if export_all:
+        page_ids = list(store.ids())
+    if not page_ids:
+        raise click.UsageError("Give page ids or --all")
+    for page_id in page_ids:
+        try:
+            print(f"📄 {store.export_markdown(page_id, output)}")
+        except KeyError:
+            print(f"❌ No stored page {page_id}")
+
+
+if __name__ == "__main__":
+    main()
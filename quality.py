@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Deterministic quality scoring of generated copy against the refinement checklist
+"""
+import math
+import re
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from sections import SectionIndex
+
+DEFAULT_QUALITY_THRESHOLD = 0.85
+
+# Relative weight of each check in the overall score
+CHECK_WEIGHTS = {
+    "structure": 0.30,
+    "cta_spacing": 0.20,
+    "specifics": 0.15,
+    "urgency": 0.15,
+    "guarantee": 0.10,
+    "value_stack": 0.10,
+}
+
+MAX_CTA_GAP_WORDS = 750
+NUMBERS_PER_1000_WORDS = 6
+MIN_TIMEFRAMES = 3
+# Urgency elements the draft prompt asks for at each urgency level, as (fewest, most)
+URGENCY_ELEMENTS = {"low": (1, 2), "medium": (1, 2), "high": (2, 3)}
+VALUE_MULTIPLE = 10
+
+# Sections too short to be expected to carry numbers (headlines, CTA buttons)
+MIN_SPECIFICS_WORDS = 80
+# Numbers a section rewrite asked for specifics can be counted on to add
+NUMBERS_PER_FIX = 3
+# Heading words marking the sections that should carry urgency, the guarantee and the value stack
+URGENCY_SECTIONS = {"urgency", "scarcity", "close", "closing", "deadline", "offer", "ps", "cta"}
+GUARANTEE_SECTIONS = {"guarantee", "risk", "refund"}
+VALUE_SECTIONS = {"offer", "stack", "value", "bonuses", "pricing", "price"}
+
+CTA_PATTERN = re.compile(
+    r"\b(click here|order now|buy now|add to cart|get (instant )?access|claim (your|my)|join (now|today)|"
+    r"sign up|start (now|today|your)|get started|reserve (your|my)|grab (your|my)|download (now|your)|"
+    r"yes[,!] ?i want|take the quiz|watch (the|this) (video|presentation)|enroll now)\b",
+    re.IGNORECASE
+)
+NUMBER_PATTERN = re.compile(r"\$?\d[\d,]*(\.\d+)?%?")
+TIMEFRAME_PATTERN = re.compile(
+    r"\b(\d+|one|two|three|four|five|six|seven|ten|twelve|thirty|sixty|ninety)[\s-]"
+    r"(seconds?|minutes?|hours?|days?|weeks?|months?|years?)\b",
+    re.IGNORECASE
+)
+URGENCY_PATTERN = re.compile(
+    r"\b(deadline|expires?|expiring|ends (tonight|today|soon|at|on)|limited|only \d+|spots? (left|remaining)|"
+    r"last chance|before (midnight|it'?s gone|the price)|price (goes up|increases|will increase)|countdown|"
+    r"timer|today only|while (supplies|spots) last|closing (soon|tonight)|act now|don'?t wait|hurry)\b",
+    re.IGNORECASE
+)
+GUARANTEE_PATTERN = re.compile(r"\b(guarantee[ds]?|money[- ]back|full refund|risk[- ]free|refund)\b", re.IGNORECASE)
+WORD_PATTERN = re.compile(r"\S+")
+DOLLAR_PATTERN = re.compile(r"\$\s?(\d[\d,]*(?:\.\d+)?)")
+
+
+@dataclass
+class QualityReport:
+    """Overall score (0-1) and per-check results for one piece of copy"""
+    score: float
+    threshold: Optional[float]
+    checks: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def passed(self) -> bool:
+        return self.threshold is not None and self.score >= self.threshold
+
+    @property
+    def failed_checks(self) -> List[str]:
+        return [name for name, check in self.checks.items() if check["score"] < 1.0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"score": self.score, "threshold": self.threshold, "passed": self.passed, "checks": self.checks}
+
+
+def quality_summary(draft: QualityReport, final: Optional[QualityReport] = None) -> Dict[str, Any]:
+    """What gets stored in a result: the final score, whether refinement ran, and both reports"""
+    summary = {"score": (final or draft).score, "refined": final is not None, "draft": draft.to_dict()}
+    if final is not None:
+        summary["final"] = final.to_dict()
+    return summary
+
+
+def _tokens(name: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def check_structure(sections: Mapping[str, str], page_structure: Sequence[str]) -> Dict[str, Any]:
+    """Every page_structure element should have a section whose heading names it"""
+    if not page_structure:
+        return {"score": 1.0, "detail": "no structure defined"}
+    names = [_tokens(name) for name in sections]
+    missing = [element for element in page_structure
+               if not any(_tokens(element) <= name for name in names)]
+    return {
+        "score": round(1 - len(missing) / len(page_structure), 3),
+        "missing": missing,
+        "detail": f"{len(page_structure) - len(missing)}/{len(page_structure)} sections present"
+    }
+
+
+def check_cta_spacing(text: str) -> Dict[str, Any]:
+    """A call to action should come at least every MAX_CTA_GAP_WORDS words"""
+    # Word index of each CTA, by bisecting word start offsets (re-splitting each prefix is quadratic)
+    starts = [match.start() for match in WORD_PATTERN.finditer(text)]
+    positions = [bisect_left(starts, match.start()) for match in CTA_PATTERN.finditer(text)]
+    if not positions:
+        return {"score": 0.0, "ctas": 0, "detail": "no calls to action found"}
+    # The stretch before the first CTA and between CTAs; the tail after the last one is not a gap
+    gaps = [b - a for a, b in zip([0] + positions, positions)]
+    ok = sum(1 for gap in gaps if gap <= MAX_CTA_GAP_WORDS)
+    return {
+        "score": round(ok / len(gaps), 3),
+        "ctas": len(positions),
+        "max_gap_words": max(gaps),
+        "detail": f"{len(positions)} CTAs in {len(starts)} words, longest gap {max(gaps)} words"
+    }
+
+
+def check_specifics(text: str) -> Dict[str, Any]:
+    """Concrete numbers and timeframes, scaled to page length"""
+    words = max(1, len(text.split()))
+    numbers = len(NUMBER_PATTERN.findall(text))
+    timeframes = len(TIMEFRAME_PATTERN.findall(text))
+    wanted_numbers = max(1, round(words / 1000 * NUMBERS_PER_1000_WORDS))
+    score = (min(1.0, numbers / wanted_numbers) + min(1.0, timeframes / MIN_TIMEFRAMES)) / 2
+    return {
+        "score": round(score, 3),
+        "numbers": numbers,
+        "timeframes": timeframes,
+        "wanted_numbers": wanted_numbers,
+        "detail": f"{numbers}/{wanted_numbers} numbers, {timeframes}/{MIN_TIMEFRAMES} timeframes"
+    }
+
+
+def urgency_range(urgency_level: str) -> str:
+    """The number of urgency elements to ask for, as written in prompts"""
+    fewest, most = URGENCY_ELEMENTS.get(urgency_level, URGENCY_ELEMENTS["medium"])
+    return f"{fewest}-{most}"
+
+
+def check_urgency(text: str, urgency_level: str) -> Dict[str, Any]:
+    """At least as many urgency elements as the prompt asked for at the configured level"""
+    wanted = URGENCY_ELEMENTS.get(urgency_level, URGENCY_ELEMENTS["medium"])[0]
+    found = len(URGENCY_PATTERN.findall(text))
+    return {"score": round(min(1.0, found / wanted), 3), "elements": found,
+            "detail": f"{found}/{wanted} urgency elements"}
+
+
+def check_guarantee(text: str, guarantee_type: Optional[str]) -> Dict[str, Any]:
+    if guarantee_type in (None, "no_guarantee"):
+        return {"score": 1.0, "detail": "no guarantee configured"}
+    found = bool(GUARANTEE_PATTERN.search(text))
+    return {"score": 1.0 if found else 0.0, "detail": "guarantee stated" if found else "no guarantee found"}
+
+
+def check_value_stack(text: str, price_point: float) -> Dict[str, Any]:
+    """The stacked value should reach VALUE_MULTIPLE times the price"""
+    if not price_point:
+        return {"score": 1.0, "detail": "no price configured"}
+    # The largest figure other than the price itself is taken as the stated total value
+    stacked = max((float(amount.replace(",", "")) for amount in DOLLAR_PATTERN.findall(text)
+                   if float(amount.replace(",", "")) != price_point), default=0.0)
+    score = min(1.0, stacked / (price_point * VALUE_MULTIPLE))
+    return {"score": round(score, 3), "stacked_value": stacked,
+            "detail": f"${stacked:,.0f} stacked vs ${price_point:,.0f} price"}
+
+
+def section_issues(text: str, sections: Mapping[str, str], config: Any,
+                   report: QualityReport) -> Optional[Dict[str, List[str]]]:
+    """Checklist fixes for each section that needs one, from a page's QualityReport.
+
+    Returns None when the page lacks required sections, which rewriting
+    existing sections cannot fix.
+    """
+    if report.checks["structure"]["score"] < 1.0 or not sections:
+        return None
+    issues: Dict[str, List[str]] = {}
+    names = list(sections)
+
+    def flag(targets: Sequence[str], issue: str):
+        for name in targets:
+            issues.setdefault(name, []).append(issue)
+
+    def named(keywords: set) -> List[str]:
+        # Fall back to the last section, which usually closes the sale
+        return [name for name in names if _tokens(name) & keywords] or names[-1:]
+
+    if report.checks["cta_spacing"]["score"] < 1.0:
+        # Walk the page and flag the section where the words since the last CTA pass the limit
+        since = 0
+        for name in names:
+            body = sections[name]
+            matches = list(CTA_PATTERN.finditer(body))
+            if matches:
+                since = len(body[matches[-1].end():].split())
+                continue
+            since += len(body.split())
+            if since > MAX_CTA_GAP_WORDS:
+                flag([name], "Add a clear call to action (this stretch of the page has none)")
+                since = 0
+    specifics = report.checks["specifics"]
+    if specifics["score"] < 1.0:
+        # Enough of the longest sections lacking numbers or timeframes to make up the shortfall
+        needed = max(math.ceil((specifics["wanted_numbers"] - specifics["numbers"]) / NUMBERS_PER_FIX),
+                     MIN_TIMEFRAMES - specifics["timeframes"], 1)
+        bare = [name for name in names if len(sections[name].split()) >= MIN_SPECIFICS_WORDS
+                and not (NUMBER_PATTERN.search(sections[name]) and TIMEFRAME_PATTERN.search(sections[name]))]
+        bare.sort(key=lambda name: len(sections[name]), reverse=True)
+        flag(bare[:needed], "Add specific numbers, percentages and timeframes")
+    if report.checks["urgency"]["score"] < 1.0:
+        flag(named(URGENCY_SECTIONS),
+             f"Add {config.urgency_level} urgency with specific elements (timers, limits, deadlines)")
+    if report.checks["guarantee"]["score"] < 1.0:
+        flag(named(GUARANTEE_SECTIONS), "State the guarantee and make it compelling and risk-free")
+    if report.checks["value_stack"]["score"] < 1.0:
+        flag(named(VALUE_SECTIONS),
+             f"Stack the value to {VALUE_MULTIPLE}-15x the ${config.price_point} price, with a dollar figure per item")
+    return issues
+
+
+def score_copy(text: str, config: Any, page_structure: Sequence[str], threshold: Optional[float] = None,
+               sections: Optional[Mapping[str, str]] = None) -> QualityReport:
+    """Score copy for a PageConfig against the refinement checklist"""
+    if sections is None:
+        sections = SectionIndex.scan(text)
+    checks = {
+        "structure": check_structure(sections, page_structure),
+        "cta_spacing": check_cta_spacing(text),
+        "specifics": check_specifics(text),
+        "urgency": check_urgency(text, config.urgency_level),
+        "guarantee": check_guarantee(text, config.guarantee_type),
+        "value_stack": check_value_stack(text, config.price_point),
+    }
+    score = sum(CHECK_WEIGHTS[name] * check["score"] for name, check in checks.items()) / sum(CHECK_WEIGHTS.values())
+    return QualityReport(round(score, 3), threshold, checks)
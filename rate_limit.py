@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Rate control for outgoing API requests
+"""
+import threading
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """Token bucket that paces how many requests may start per minute"""
+
+    def __init__(self, requests_per_minute: float, burst: Optional[int] = None):
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1, int(requests_per_minute // 10)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` are available (0 if they are now), without taking them"""
+        with self._lock:
+            self._refill(time.monotonic())
+            tokens = min(tokens, self.capacity)
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def take(self, tokens: float = 1.0):
+        """Take `tokens` without waiting; the balance may go negative, delaying later requests"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+
+    def sync(self, limit: Optional[float] = None, remaining: Optional[float] = None):
+        """Adopt the server's view of this budget, from its rate-limit response headers"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if limit:
+                self.rate = limit / 60.0
+            if remaining is not None:
+                self._tokens = min(self._tokens, float(remaining))
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available and return the seconds spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Retry, hedging and circuit breaking for API calls
+"""
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = "rate_limited"
+OVERLOADED = "overloaded"
+SERVER_ERROR = "server_error"
+CONNECTION = "connection"
+
+# Failures that mean the endpoint itself is struggling, as opposed to this key being over its limits
+OVERLOAD_REASONS = (OVERLOADED, SERVER_ERROR, CONNECTION)
+
+
+def failure_reason(error: Exception) -> Optional[str]:
+    """Why a call failed, if it is worth retrying; None for errors a retry will not fix"""
+    status = getattr(error, "status_code", None)
+    if status == 429:
+        return RATE_LIMITED
+    if status == 529:
+        return OVERLOADED
+    if status in (408, 409) or (status is not None and status >= 500):
+        return SERVER_ERROR
+    if status is not None:
+        return None
+    import anthropic
+    import httpx
+    # Timeouts, refused connections, and connections dropped mid-stream
+    if isinstance(error, (anthropic.APIConnectionError, httpx.TransportError)):
+        return CONNECTION
+    return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, never sooner than the server's retry-after"""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 30.0,
+                 rng: Optional[random.Random] = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+
+    def delay(self, retry: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number `retry` (1-based)"""
+        backoff = self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+        return max(backoff, retry_after) if retry_after is not None else backoff
+
+
+class LatencyTracker:
+    """Rolling quantile of recent latencies, used as the hedging threshold"""
+
+    def __init__(self, quantile: float = 0.95, window: int = 200, min_samples: int = 20):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def threshold(self) -> Optional[float]:
+        """The quantile of the window, or None until enough calls were seen"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+
+
+class CircuitBreaker:
+    """Stops calls to an endpoint that keeps failing with overload errors.
+
+    After `failure_threshold` consecutive overload failures the circuit
+    opens and callers wait instead of calling. After `reset_timeout`
+    seconds one probe call is let through (half-open). An overload failure
+    of the probe opens the circuit again; any other outcome closes it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            self.state = state
+            logger.warning(f"Circuit breaker {state}")
+
+    def wait(self) -> Tuple[float, bool]:
+        """Block until a call may go out; returns the seconds waited and whether the call is the half-open probe.
+
+        The probe's outcome must be reported with `probe=True`, or the probe
+        given up with `release_probe`, before another probe is let through.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self.state == self.OPEN and now >= self.opened_at + self.reset_timeout:
+                    self._set_state(self.HALF_OPEN)
+                if self.state == self.CLOSED:
+                    return waited, False
+                if self.state == self.HALF_OPEN and not self._probing:
+                    self._probing = True
+                    return waited, True
+                # Open, or another caller's probe is out
+                pause = max(0.05, self.opened_at + self.reset_timeout - now) if self.state == self.OPEN else 0.1
+            time.sleep(pause)
+            waited += pause
+
+    def record_success(self, probe: bool = False):
+        with self._lock:
+            self.failures = 0
+            if probe:
+                self._probing = False
+            self._set_state(self.CLOSED)
+
+    def record_failure(self, reason: Optional[str], probe: bool = False) -> bool:
+        """Count a failed call (by its failure_reason); returns True if this opened the circuit"""
+        with self._lock:
+            if probe:
+                self._probing = False
+            if reason not in OVERLOAD_REASONS:
+                if probe:
+                    # The endpoint answered without an overload error, so it has recovered
+                    self.failures = 0
+                    self._set_state(self.CLOSED)
+                return False
+            self.failures += 1
+            if self.state == self.OPEN or (self.state == self.CLOSED and self.failures < self.failure_threshold):
+                return False
+            self.opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+            return True
+
+    def release_probe(self):
+        """Give up the probe slot without an outcome (the probe call was cancelled)"""
+        with self._lock:
+            self._probing = False
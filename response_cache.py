@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for Claude API responses
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Persistent response cache keyed by a hash of the full API request.
+
+    Entries live in `<cache_dir>/<key[:2]>/<key>.json`. A hit refreshes the
+    entry's mtime, so evicting by oldest mtime gives LRU order. Entries older
+    than `max_age_days` are dropped, and the least recently used entries are
+    removed once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: str = ".cache/responses", max_bytes: int = 500 * 1024 * 1024,
+                 max_age_days: float = 30, bypass: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._size = self.evict()
+
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        """Hash a request payload (model, prompt, sampling parameters) into a cache key"""
+        canonical = json.dumps(request, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for `key`, or None on a miss or when bypassing"""
+        if self.bypass:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        path = self._path(key)
+        try:
+            stat = path.stat()
+            if self.max_age and time.time() - stat.st_mtime > self.max_age:
+                self._remove(path, stat.st_size)
+                raise FileNotFoundError(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        """Store a response atomically and evict old entries if the cache is over budget"""
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        with self._lock:
+            self.writes += 1
+            self._size += len(data)
+            over_budget = self.max_bytes and self._size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def _remove(self, path: Path, size: int):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self.evictions += 1
+            self._size -= size
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones until under `max_bytes`.
+
+        Returns the resulting cache size in bytes.
+        """
+        now = time.time()
+        evicted = 0
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if self.max_age and now - stat.st_mtime > self.max_age:
+                path.unlink(missing_ok=True)
+                evicted += 1
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if self.max_bytes and total > self.max_bytes:
+            # Shrink to 90% of the budget so we don't rescan on every write
+            target = self.max_bytes * 0.9
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                evicted += 1
+
+        with self._lock:
+            self.evictions += evicted
+            self._size = total
+        if evicted:
+            logger.info(f"Evicted {evicted} cached responses")
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for reporting"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "size_bytes": self._size,
+                "bypass": self.bypass
+            }
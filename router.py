@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Spreads API requests over several keys and models, each with its own rate limits
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from client_pool import get_client_pool
+from rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Seconds a route sits out after a 429 that carries no retry-after header
+DEFAULT_COOLDOWN = 10.0
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(request: Dict[str, Any]) -> int:
+    """Rough input token count of a messages request, charged before it is sent"""
+    chars = len(json.dumps(request.get("messages", []), ensure_ascii=False))
+    system = request.get("system") or []
+    chars += len(system) if isinstance(system, str) else sum(len(block.get("text", "")) for block in system)
+    return chars // CHARS_PER_TOKEN
+
+
+def retry_after_seconds(headers: Any) -> Optional[float]:
+    """The retry-after header in seconds, if present and parseable"""
+    value = headers.get("retry-after") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _header_number(headers: Any, name: str) -> Optional[float]:
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class Route:
+    """One API key, optionally pinned to a model, with its own requests- and tokens-per-minute budgets"""
+
+    def __init__(self, api_key: str, model: Optional[str] = None, rpm: float = 50, tpm: Optional[float] = None,
+                 name: Optional[str] = None, client: Optional[Any] = None):
+        self.api_key = api_key
+        # None sends each request with the model its stage's profile chose
+        self.model = model
+        self.name = name or f"{model or 'any model'} (key …{api_key[-4:]})"
+        self.requests = RateLimiter(rpm)
+        # A full minute of tokens may be spent at once, as the API's own bucket allows
+        self.tokens = RateLimiter(tpm, burst=int(tpm)) if tpm else None
+        # The router retries rate-limited requests on another route instead of the SDK retrying here
+        self.client = client if client is not None else get_client_pool().get(api_key).with_options(max_retries=0)
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.sent = 0
+        self.rate_limited = 0
+
+    def wait_time(self, tokens: int) -> float:
+        """Seconds until both budgets allow a request of `tokens` input tokens"""
+        wait = self.requests.wait_time()
+        if self.tokens:
+            wait = max(wait, self.tokens.wait_time(tokens))
+        return wait
+
+    def take(self, tokens: int):
+        self.requests.take()
+        if self.tokens:
+            self.tokens.take(tokens)
+
+    def sync(self, headers: Any):
+        """Update the budgets from a response's anthropic-ratelimit-* headers"""
+        self.requests.sync(_header_number(headers, "anthropic-ratelimit-requests-limit"),
+                           _header_number(headers, "anthropic-ratelimit-requests-remaining"))
+        if self.tokens:
+            self.tokens.sync(_header_number(headers, "anthropic-ratelimit-tokens-limit"),
+                             _header_number(headers, "anthropic-ratelimit-tokens-remaining"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"route": self.name, "model": self.model, "requests": self.sent, "rate_limited": self.rate_limited}
+
+
+class Router:
+    """Picks the least loaded route that has budget for each request.
+
+    Routes that return a 429 cool down for the retry-after period (or
+    `cooldown` seconds) and are skipped meanwhile. When every route is out
+    of budget or cooling down, `acquire` waits for the first to free up.
+    """
+
+    def __init__(self, routes: List[Route], cooldown: float = DEFAULT_COOLDOWN):
+        if not routes:
+            raise ValueError("Router needs at least one route")
+        self.routes = routes
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> Tuple[Route, float]:
+        """Reserve a route for a request of about `tokens` input tokens; returns it and the seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                soonest = math.inf
+                for route in sorted(self.routes, key=lambda r: (r.in_flight, r.sent)):
+                    if route.cooldown_until > now:
+                        soonest = min(soonest, route.cooldown_until - now)
+                        continue
+                    wait = route.wait_time(tokens)
+                    if wait <= 0:
+                        route.take(tokens)
+                        route.in_flight += 1
+                        route.sent += 1
+                        return route, waited
+                    soonest = min(soonest, wait)
+            time.sleep(soonest)
+            waited += soonest
+
+    def release(self, route: Route, headers: Any = None, extra_tokens: int = 0):
+        """Return a route after its request; `extra_tokens` charges usage beyond the estimate"""
+        with self._lock:
+            route.in_flight -= 1
+            if headers is not None:
+                route.sync(headers)
+            if route.tokens and extra_tokens > 0:
+                route.tokens.take(extra_tokens)
+
+    def rate_limited(self, route: Route, headers: Any = None):
+        """Return a route whose request got a 429 and cool it down"""
+        pause = retry_after_seconds(headers)
+        pause = self.cooldown if pause is None else pause
+        with self._lock:
+            route.in_flight -= 1
+            route.rate_limited += 1
+            route.cooldown_until = max(route.cooldown_until, time.monotonic() + pause)
+            if headers is not None:
+                route.sync(headers)
+        logger.warning(f"{route.name} rate limited; cooling down for {pause:.1f}s")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [route.stats() for route in self.routes]
+
+
+def load_routes(path: str, default_model: Optional[str] = None, cooldown: float = DEFAULT_COOLDOWN) -> Router:
+    """Build a Router from a JSON file listing routes.
+
+    The file holds a list (or {"routes": [...]}) of objects with "api_key"
+    or "api_key_env" (the name of an environment variable holding the key),
+    and optionally "model", "rpm", "tpm" and "name". Routes without a model
+    (and no `default_model`) use whichever model each stage's profile picks.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    entries = data.get("routes", []) if isinstance(data, dict) else data
+    routes = []
+    for i, entry in enumerate(entries, 1):
+        api_key = entry.get("api_key") or os.getenv(entry.get("api_key_env", ""), "")
+        if not api_key:
+            raise ValueError(f"Route {i}: set api_key, or api_key_env to a variable holding the key")
+        routes.append(Route(api_key, entry.get("model", default_model), rpm=entry.get("rpm", 50),
+                            tpm=entry.get("tpm"), name=entry.get("name")))
+    return Router(routes, cooldown)
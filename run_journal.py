@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Append-only journal of page states for crash-safe, resumable batch runs
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict
+
+JOURNAL_DIR = Path("generated_pages") / "runs"
+
+# Page lifecycle, in order
+STATES = ("queued", "initial_done", "refined", "saved", "failed")
+
+
+class RunJournal:
+    """Append-only JSONL log of every page's progress through a batch run.
+
+    Each record is flushed and fsync'd before `record` returns, so after a crash
+    the journal holds every stage that finished. `pages()` replays the records
+    into the latest state of each page, keeping the intermediate copy so a
+    half-done page can restart from the refinement stage.
+    """
+
+    def __init__(self, run_id: str, directory: Path = JOURNAL_DIR):
+        self.run_id = run_id
+        self.path = Path(directory) / f"{run_id}.jsonl"
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, directory: Path = JOURNAL_DIR) -> "RunJournal":
+        """Start a journal for a new run"""
+        # The random suffix keeps runs started in the same second apart
+        journal = cls(f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.urandom(3).hex()}", directory)
+        journal.path.parent.mkdir(parents=True, exist_ok=True)
+        # Claim the file atomically, so two runs can never share a journal
+        with open(journal.path, 'x', encoding='utf-8'):
+            pass
+        return journal
+
+    @classmethod
+    def open(cls, run_id: str, directory: Path = JOURNAL_DIR) -> "RunJournal":
+        """Open the journal of an earlier run for resuming"""
+        journal = cls(run_id, directory)
+        if not journal.path.exists():
+            raise FileNotFoundError(f"No journal for run {run_id} at {journal.path}")
+        # Terminate a torn final line so new records start on a line of their own
+        with open(journal.path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+        return journal
+
+    def record(self, page_id: str, state: str, **data: Any):
+        """Durably append a state change for a page"""
+        if state not in STATES:
+            raise ValueError(f"Unknown page state: {state}")
+        line = json.dumps({
+            "ts": datetime.now().isoformat(),
+            "page": page_id,
+            "state": state,
+            **data
+        }, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def pages(self) -> Dict[str, Dict[str, Any]]:
+        """Replay the journal into the latest known state and data of each page"""
+        pages: Dict[str, Dict[str, Any]] = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write
+                    continue
+                page = pages.setdefault(record.pop("page"), {})
+                if record["state"] != "failed":
+                    page.pop("error", None)
+                page.update(record)
+        return pages
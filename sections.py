@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Offset-based section index for generated pages
+
+A page is split into sections at lines starting with `###`; text before the
+first heading is the "intro" section. Sections are stored as (start, end)
+offsets into the page text and sliced out only when read.
+"""
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+INTRO = "intro"
+HEADING = "###"
+
+
+def section_name(heading: str) -> str:
+    """Turn a `### Heading` line into a section key"""
+    return heading.replace('#', '').strip().lower().replace(' ', '_')
+
+
+def section_heading(element: str) -> str:
+    """The `### Heading` line prompts ask for a page_structure element, which section_name maps back"""
+    return f"{HEADING} {element.replace('_', ' ').title()}"
+
+
+class Sections(Mapping):
+    """Read-only mapping of section name to section text, backed by the page text.
+
+    Behaves like the dict the generator used to store, but holds only offsets
+    into the page, so a stored result keeps a single copy of the copy.
+    """
+    __slots__ = ("_text", "_spans")
+
+    def __init__(self, text: str, spans: Dict[str, Tuple[int, int]]):
+        self._text = text
+        self._spans = spans
+
+    def __getitem__(self, name: str) -> str:
+        start, end = self._spans[name]
+        return self._text[start:end].strip()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._spans)
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def span(self, name: str) -> Tuple[int, int]:
+        """Offsets of a section's body in the page text"""
+        return self._spans[name]
+
+    def to_dict(self) -> Dict[str, str]:
+        return {name: self[name] for name in self._spans}
+
+    def __repr__(self) -> str:
+        return f"Sections({list(self._spans)})"
+
+
+def json_default(obj: Any) -> Any:
+    """`default` hook for json.dump so results containing Sections serialize as before"""
+    if isinstance(obj, Sections):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class SectionIndex:
+    """Builds a Sections index in one pass, optionally from streamed chunks.
+
+    `feed` accepts text as it arrives and returns the (name, text) of every
+    section closed by a heading in that chunk; `close` ends the input and
+    returns the last one. Only complete lines are scanned, so a heading split
+    across chunks is handled once its newline arrives.
+    """
+
+    def __init__(self, emit: bool = True):
+        self.emit = emit
+        self._chunks: List[str] = []
+        self._pending = ""
+        self._offset = 0  # absolute offset of self._pending
+        self._spans: Dict[str, Tuple[int, int]] = {}
+        self._name = INTRO
+        self._start: Optional[int] = 0  # None for a heading on the last line with no body
+        self._open: List[str] = []  # body text of the current section, when emitting
+        self._text: Optional[str] = None
+        self.closed = False
+
+    @classmethod
+    def scan(cls, text: str) -> Sections:
+        """Index a complete page"""
+        index = cls(emit=False)
+        index._scan(text, 0, final=True)
+        index.closed = True
+        return Sections(text, index._spans)
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Add streamed text; returns sections completed by it"""
+        if self.closed:
+            raise ValueError("SectionIndex is closed")
+        if not chunk:
+            return []
+        self._chunks.append(chunk)
+        self._pending += chunk
+        cut = self._pending.rfind("\n")
+        if cut == -1:
+            return []
+        block, self._pending = self._pending[:cut + 1], self._pending[cut + 1:]
+        completed = self._scan(block, self._offset, final=False)
+        self._offset += len(block)
+        return completed
+
+    def close(self) -> List[Tuple[str, str]]:
+        """End the input; returns the final section, if it has a body"""
+        if self.closed:
+            return []
+        block, self._pending = self._pending, ""
+        completed = self._scan(block, self._offset, final=True)
+        self._offset += len(block)
+        self.closed = True
+        return completed
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far"""
+        if self._text is None or len(self._chunks) > 1:
+            self._text = "".join(self._chunks)
+            self._chunks = [self._text]
+        return self._text
+
+    def sections(self, text: Optional[str] = None) -> Sections:
+        """Sections view over `text` (defaults to the fed text, which it must equal)"""
+        if not self.closed:
+            self.close()
+        return Sections(self.text if text is None else text, self._spans)
+
+    def _scan(self, block: str, base: int, final: bool) -> List[Tuple[str, str]]:
+        """Index the complete lines in `block`, which starts at a line start at offset `base`"""
+        completed = []
+        body_from = 0
+        hs = 0 if block.startswith(HEADING) else block.find("\n" + HEADING) + 1 or -1
+        while hs != -1:
+            # A section closed by a heading only counts if at least one line separated them
+            if self._start is not None and base + hs > self._start:
+                self._record(base + hs, block[body_from:hs], completed)
+            line_end = block.find("\n", hs)
+            if line_end == -1:
+                line_end = len(block)
+                self._start = None
+            else:
+                self._start = base + line_end + 1
+            self._name = section_name(block[hs:line_end])
+            self._open = []
+            body_from = line_end + 1
+            hs = block.find("\n" + HEADING, line_end)
+            if hs != -1:
+                hs += 1
+
+        if self.emit and body_from < len(block):
+            self._open.append(block[body_from:])
+        if final and self._start is not None:
+            self._record(base + len(block), "", completed)
+        return completed
+
+    def _record(self, end: int, tail: str, completed: List[Tuple[str, str]]):
+        self._spans[self._name] = (self._start, end)
+        if self.emit:
+            self._open.append(tail)
+            completed.append((self._name, "".join(self._open).strip()))
+            self._open = []
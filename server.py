@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Long-running HTTP generation service: synchronous and queued pages, SSE streaming, health and metrics
+
+    POST /generate           page config JSON -> result JSON, or an SSE stream with Accept: text/event-stream
+    POST /jobs               page config JSON -> 202 and the queued job
+    GET  /jobs               the caller's jobs, newest first
+    GET  /jobs/<id>          a job's status and progress
+    GET  /jobs/<id>/events   SSE stream of a job's stages and text until it finishes
+    GET  /jobs/<id>/result   a finished job's result
+    GET  /healthz            liveness, queue depth and circuit breaker state
+    GET  /metrics            Prometheus metrics
+
+Page configs use the batch config fields (see batch_config_example.json);
+`specific_benefits` is accepted for `benefits`. Callers are told apart by
+their X-Client-Id header, or their address without one.
+"""
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import click
+
+from batch_generate import build_generator, build_page_config, generator_options, validate_pages
+from jobs import DEFAULT_KEEP_FINISHED, DONE, FAILED, Job, JobLimitError, JobQueue
+from landing_page_generator import LandingPageGenerator, configure_logging, get_pattern_library
+from metrics import PrometheusMetrics
+from resilience import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+SERVER_JOBS_LOG = Path("generated_pages") / "jobs" / "server.jsonl"
+MAX_BODY_BYTES = 1_000_000
+# Seconds between SSE comments on a quiet stream, so proxies keep it open
+KEEPALIVE_SECONDS = 15.0
+
+
+class RequestError(Exception):
+    """A request the server rejects, with the HTTP status to answer it with"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_page(body: bytes):
+    """PageConfig from a request body, raising RequestError for anything unusable"""
+    try:
+        page = json.loads(body or b"null")
+    except json.JSONDecodeError as e:
+        raise RequestError(400, f"Invalid JSON: {e}")
+    if not isinstance(page, dict):
+        raise RequestError(400, "Expected a JSON object with the page config")
+    if "benefits" not in page and "specific_benefits" in page:
+        page["benefits"] = page.pop("specific_benefits")
+    errors = validate_pages([page])
+    if errors:
+        raise RequestError(422, "; ".join(error.split(": ", 1)[-1] for error in errors))
+    return build_page_config(page)
+
+
+class GenerationServer(ThreadingHTTPServer):
+    """Serves one warm generator, whose pages all run on a shared job queue"""
+    daemon_threads = True
+
+    def __init__(self, address, generator: LandingPageGenerator, queue: JobQueue,
+                 metrics: Optional[PrometheusMetrics] = None):
+        super().__init__(address, GenerationHandler)
+        self.generator = generator
+        self.queue = queue
+        self.metrics = metrics
+        self.started = time.monotonic()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def health(self) -> Dict[str, Any]:
+        breaker = self.generator.breaker
+        return {
+            "status": "ok" if breaker.state == CircuitBreaker.CLOSED else "degraded",
+            "uptime_seconds": round(time.monotonic() - self.started, 1),
+            "workers": self.queue.workers,
+            "jobs": self.queue.counts(),
+            "circuit": breaker.state,
+        }
+
+
+class GenerationHandler(BaseHTTPRequestHandler):
+    server: GenerationServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    @property
+    def owner(self) -> str:
+        return self.headers.get("x-client-id") or self.client_address[0]
+
+    def send_json(self, status: int, data: Any):
+        body = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_text(self, status: int, text: str, content_type: str = "text/plain; charset=utf-8"):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", content_type)
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get("content-length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise RequestError(413, f"Request body over {MAX_BODY_BYTES} bytes")
+        return self.rfile.read(length)
+
+    def wants_stream(self, query: str) -> bool:
+        return "text/event-stream" in self.headers.get("accept", "") or "stream=1" in query.split("&")
+
+    def find_job(self, job_id: str) -> Job:
+        job = self.server.queue.get(job_id)
+        if job is None or job.owner != self.owner:
+            raise RequestError(404, f"No job {job_id}")
+        return job
+
+    def dispatch(self, method: str):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        try:
+            if method == "GET" and parts == ["healthz"]:
+                self.send_json(200, self.server.health())
+            elif method == "GET" and parts == ["metrics"]:
+                if self.server.metrics is None:
+                    raise RequestError(404, "Metrics are disabled")
+                self.send_text(200, self.server.metrics.render(), "text/plain; version=0.0.4; charset=utf-8")
+            elif method == "POST" and parts == ["generate"]:
+                self.generate(url.query)
+            elif method == "POST" and parts == ["jobs"]:
+                job = self.submit()
+                self.send_json(202, {"job": job.to_dict(), "status_url": f"/jobs/{job.id}",
+                                     "events_url": f"/jobs/{job.id}/events", "result_url": f"/jobs/{job.id}/result"})
+            elif method == "GET" and parts == ["jobs"]:
+                self.send_json(200, {"jobs": [job.to_dict() for job in self.server.queue.jobs(self.owner)]})
+            elif method == "GET" and len(parts) == 2 and parts[0] == "jobs":
+                job = self.find_job(parts[1])
+                self.send_json(200, {**job.to_dict(), "tokens_so_far": job.tokens_so_far})
+            elif method == "GET" and len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events":
+                self.stream_job(self.find_job(parts[1]))
+            elif method == "GET" and len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result":
+                self.send_json(200, self.job_result(self.find_job(parts[1])))
+            else:
+                raise RequestError(404, f"No route for {method} {url.path}")
+        except RequestError as e:
+            # The body may be unread, so the connection cannot carry another request
+            self.close_connection = method == "POST"
+            self.send_json(e.status, {"error": str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            # The job, if any, keeps running; its result stays available under /jobs
+            logger.info(f"Client {self.owner} disconnected from {url.path}")
+        except Exception as e:
+            logger.exception(f"Request {method} {url.path} failed")
+            self.send_json(500, {"error": str(e)})
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def submit(self) -> Job:
+        config = parse_page(self.read_body())
+        try:
+            return self.server.queue.submit(self.owner, self.server.generator, config)
+        except JobLimitError as e:
+            raise RequestError(429, str(e))
+
+    def job_result(self, job: Job) -> Dict[str, Any]:
+        if job.status == FAILED:
+            raise RequestError(502, f"Generation failed: {job.error}")
+        if job.status != DONE:
+            raise RequestError(409, f"Job {job.id} is {job.status}")
+        try:
+            return self.server.queue.result(job)
+        except KeyError:
+            raise RequestError(410, f"The result of job {job.id} is no longer stored")
+
+    def generate(self, query: str):
+        """Generate a page within the request, queued like any other job"""
+        job = self.submit()
+        if self.wants_stream(query):
+            self.stream_job(job)
+            return
+        self.server.queue.wait(job)
+        self.send_json(200, {"job": job.to_dict(), "result": self.job_result(job)})
+
+    def send_event(self, event: str, data: Any):
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+                         .encode("utf-8"))
+        self.wfile.flush()
+
+    def stream_job(self, job: Job):
+        """Server-sent events: job, then stage and text as they happen, then done or error"""
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("cache-control", "no-cache")
+        # No content-length: the stream ends when the connection closes
+        self.send_header("connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        # The status line is sent, so from here on failures go to the client as error events
+        try:
+            self.send_event("job", job.to_dict())
+            for kind, value in self.server.queue.follow(job, keepalive=KEEPALIVE_SECONDS):
+                if kind == "keepalive":
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                elif kind == "stage":
+                    self.send_event("stage", {"stage": value})
+                else:
+                    self.send_event("text", {"text": value})
+            self.send_event("done", {"job": job.to_dict(), "result": self.job_result(job)})
+        except RequestError as e:
+            self.send_event("error", {"job": job.to_dict(), "error": str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            raise
+        except Exception as e:
+            logger.exception(f"Streaming job {job.id} failed")
+            self.send_event("error", {"job": job.to_dict(), "error": str(e)})
+
+
+def start_server(generator: LandingPageGenerator, queue: JobQueue, port: int = 8000, host: str = "127.0.0.1",
+                 metrics: Optional[PrometheusMetrics] = None) -> GenerationServer:
+    """Serve from a background thread; port 0 picks a free one"""
+    server = GenerationServer((host, port), generator, queue, metrics)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Serving generations on {server.url}")
+    return server
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', show_default=True, help='Interface to listen on')
+@click.option('--port', '-p', type=click.IntRange(min=0), default=8000, show_default=True, help='Port to listen on')
+@click.option('--workers', type=click.IntRange(min=1), default=8, show_default=True, help='Pages generated at once')
+@click.option('--per-client', type=click.IntRange(min=1), help='Pages one client may have queued or running (default: no cap)')
+@click.option('--jobs-log', type=click.Path(dir_okay=False), default=str(SERVER_JOBS_LOG), show_default=True,
+              help='Append-only job log, replayed on restart')
+@click.option('--keep-jobs', type=click.IntRange(min=0), default=DEFAULT_KEEP_FINISHED, show_default=True,
+              help='Finished jobs kept for status and result requests; older ones are forgotten')
+@generator_options
+def serve(host, port, workers, per_client, jobs_log, keep_jobs, **generator_settings):
+    """Serve landing page generation over HTTP"""
+    configure_logging()
+    metrics = PrometheusMetrics()
+    generator = build_generator(metrics=metrics, **generator_settings)
+    router = generator.router
+    rpm = 0 if router else generator_settings["rpm"]
+    # Load the pattern library now rather than on the first request
+    get_pattern_library(generator.config_dir)
+    queue = JobQueue(workers=workers, per_user=per_client, log_path=Path(jobs_log), keep_finished=keep_jobs)
+
+    server = GenerationServer((host, port), generator, queue, metrics)
+    print(f"\n🚀 Landing page server on {server.url}")
+    print(f"⚡ Workers: {workers} | Per client: {per_client or 'no cap'} | "
+          f"{f'Routing over {len(router.routes)} keys/models' if router else f'Rate limit: {rpm:g} requests/min' if rpm else 'Rate limit: off'}")
+    print(f"📈 Metrics: {server.url}/metrics | ❤️  Health: {server.url}/healthz\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down, waiting for running pages...")
+    finally:
+        server.server_close()
+        queue.shutdown()
+
+
+if __name__ == "__main__":
+    serve()